@@ -1,25 +1,28 @@
-# import RPi.GPIO as GPIO
-# from dht11 import DHT11
-import time
-import random
 import paho.mqtt.client as mqtt
 import json
 import logging
+from scheduler import get_default_scheduler
+from hal import DHT11
 
 class DHT11Sensor:
-    def __init__(self, client: mqtt.Client, topic: str):
+    def __init__(self, client: mqtt.Client, topic: str, telemetry=None, scheduler=None):
         """
         Initialize the DHT11 sensor with an MQTT client and topic.
         
         Args:
             client (mqtt.Client): MQTT client for publishing sensor data.
             topic (str): MQTT topic to publish sensor data to.
+            telemetry (TelemetryPublisher): Shared batching publisher. If None, each reading is published directly.
+            scheduler (Scheduler): Scheduler running the periodic readings. Defaults to the shared scheduler.
         """
         self.client = client
         self.topic = topic  # Store the MQTT topic
+        self.telemetry = telemetry
+        self.scheduler = scheduler or get_default_scheduler()
+        self.pin = None
         self.sensor = None
         self.logger = logging.getLogger(__name__)
-        self.monitoring_active = False  # Flag to control monitoring loop
+        self.job = None  # Scheduled monitoring job
 
     def setup(self, pin):
         """
@@ -29,7 +32,8 @@ class DHT11Sensor:
             pin (int): GPIO pin number where the DHT11 sensor is connected.
         """
         try:
-            # self.sensor = DHT11(pin=pin)
+            self.pin = pin
+            self.sensor = DHT11(pin=pin)
             self.logger.info(f"DHT11 sensor setup on pin {pin}")
         except Exception as e:
             self.logger.error(f"Failed to setup DHT11 sensor on pin {pin}: {e}")
@@ -37,37 +41,42 @@ class DHT11Sensor:
 
     def read_data(self, interval=2, duration=10):
         """
-        Read data from the DHT11 sensor and publish it to MQTT.
+        Schedule periodic DHT11 readings and publish them to MQTT. Returns immediately;
+        a monitoring job already running on this sensor is replaced.
         
         Args:
             interval (int): Time interval (in seconds) between readings. Default is 2 seconds.
             duration (int): Total duration (in seconds) to monitor the sensor. Default is 10 seconds.
+
+        Returns:
+            Job: The scheduled monitoring job.
         """
-        # if not self.sensor:
-        #     self.logger.error("DHT11 sensor not setup. Call setup() first.")
-        #     return
+        if not self.sensor:
+            self.logger.error("DHT11 sensor not setup. Call setup() first.")
+            return None
 
-        self.monitoring_active = True
-        start_time = time.time()
+        if self.job is not None:
+            self.job.cancel()
+        self.job = self.scheduler.every(interval, self.sample, duration=duration,
+                                        name=f"DHT11-{self.pin}", on_done=self._monitoring_done)
+        return self.job
 
-        while self.monitoring_active and (time.time() - start_time < duration):
-            try:
-                humidity = round(random.uniform(70, 90), 2)
-                temperature = round(random.uniform(20, 35), 2)
+    def sample(self):
+        """
+        Take one DHT11 reading and publish it.
+        """
+        try:
+            result = self.sensor.read()
+            if result.is_valid():
+                humidity = round(result.humidity, 2)
+                temperature = round(result.temperature, 2)
                 self.publish_sensor_data(temperature, humidity)
-                # result = self.sensor.read()
-                # if result.is_valid():
-                #     humidity = round(random.uniform(70, 90), 2)
-                #     temperature = round(random.uniform(20, 35), 2)
-                #     humidity = round(result.humidity, 2)
-                #     temperature = round(result.temperature, 2)
-                #     self.publish_sensor_data(temperature, humidity)
-                # else:
-                #     self.logger.warning(f"Invalid DHT11 sensor reading. Error code: {result.error_code}")
-            except Exception as e:
-                self.logger.error(f"Error reading DHT11 sensor: {e}")
-            time.sleep(interval)
+            else:
+                self.logger.warning(f"Invalid DHT11 sensor reading. Error code: {result.error_code}")
+        except Exception as e:
+            self.logger.error(f"Error reading DHT11 sensor: {e}")
 
+    def _monitoring_done(self, job):
         self.logger.info("DHT11 sensor monitoring completed.")
 
     def publish_sensor_data(self, temperature, humidity):
@@ -83,6 +92,10 @@ class DHT11Sensor:
                 "temperature": temperature,
                 "humidity": humidity
             }
+            if self.telemetry is not None:
+                self.telemetry.submit("DHT11", payload, key=self.pin)
+                self.logger.debug(f"Queued DHT11 reading: Temperature: {temperature} °C, Humidity: {humidity} %")
+                return
             self.client.publish(self.topic, json.dumps(payload))  # Use self.topic
             self.logger.info(f"Published to {self.topic}: Temperature: {temperature} °C, Humidity: {humidity} %")
         except Exception as e:
@@ -90,7 +103,8 @@ class DHT11Sensor:
 
     def stop_monitoring(self):
         """
-        Stop the monitoring loop for the DHT11 sensor.
+        Stop the monitoring job for the DHT11 sensor.
         """
-        self.monitoring_active = False
+        if self.job is not None:
+            self.job.cancel()
         self.logger.info("DHT11 sensor monitoring stopped.")
\ No newline at end of file
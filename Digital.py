@@ -1,4 +1,4 @@
-import RPi.GPIO as GPIO
+from hal import GPIO
 import json
 import logging
 
@@ -37,6 +37,40 @@ class DigitalIO:
         except Exception as e:
             self.logger.error(f"Failed to control {component} on pin {pin}: {e}")
 
+    def switch_many(self, commands):
+        """
+        Apply several digital writes together, rolling back if any write fails.
+
+        Args:
+            commands (list): List of (component, data) tuples, where data holds 'pin' and 'state'.
+
+        Raises:
+            ValueError: If any command is invalid; no pin is touched in that case.
+        """
+        writes = []
+        for component, data in commands:
+            pin = data.get('pin')
+            state = data.get('state')
+            if component not in ['led', 'relay', 'buzzer'] or pin is None or state is None:
+                raise ValueError(f"Invalid data for {component}: {data}")
+            writes.append((pin, GPIO.HIGH if state == "ON" else GPIO.LOW))
+
+        # Configure every pin before the first write so the outputs change back-to-back
+        for pin, _ in writes:
+            GPIO.setup(pin, GPIO.OUT)
+        previous = {pin: GPIO.input(pin) for pin, _ in writes}
+
+        applied = []
+        try:
+            for pin, level in writes:
+                GPIO.output(pin, level)
+                applied.append(pin)
+        except Exception:
+            for pin in reversed(applied):
+                GPIO.output(pin, previous[pin])
+            raise
+        self.logger.info(f"Applied {len(writes)} digital writes: {writes}")
+
     def cleanup(self):
         """
         Clean up GPIO resources.
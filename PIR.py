@@ -1,23 +1,24 @@
-import threading
-import time
-import RPi.GPIO as GPIO
+from hal import GPIO
 import json
 import logging
+from edges import get_default_edge_monitor
 
 class PIRSensor:
-    def __init__(self, client, topic):
+    def __init__(self, client, topic, telemetry=None, edges=None):
         """
         Initialize the PIR sensor with an MQTT client and topic.
         
         Args:
             client: MQTT client for publishing sensor data.
             topic: MQTT topic to publish sensor data to.
+            telemetry (TelemetryPublisher): Shared batching publisher. If None, each state change is published directly.
+            edges (EdgeMonitor): Edge detection backend. Defaults to the shared edge monitor.
         """
         self.client = client
         self.topic = topic
+        self.telemetry = telemetry
+        self.edges = edges or get_default_edge_monitor()
         self.pin = None
-        self.monitor_thread = None
-        self.stop_thread = False
         self.logger = logging.getLogger(__name__)
 
     def setup(self, pin):
@@ -38,67 +39,68 @@ class PIRSensor:
 
     def monitor(self, interval=1, duration=10):
         """
-        Monitor the PIR sensor and publish data for the given duration.
+        Publish PIR state changes for the given duration. Returns immediately; changes are
+        delivered by edge detection, so even pulses shorter than the interval are reported.
+        A monitoring session already running on this sensor is replaced.
         
         Args:
-            interval (int): Time interval (in seconds) between readings. Default is 1 second.
+            interval (int): Reporting interval, included in the direct MQTT message. Default is 1 second.
             duration (int): Total duration (in seconds) to monitor the sensor. Default is 10 seconds.
+
+        Returns:
+            EdgeWatch: The edge watch on the sensor pin.
         """
-        if self.monitor_thread is not None and self.monitor_thread.is_alive():
-            self.stop_thread = True  # Stop the existing monitoring thread
-            self.monitor_thread.join()  # Wait for the thread to finish
+        def on_edge(pin, level, ts):
+            self.publish_state(level, interval, duration)
 
-        self.stop_thread = False
-        self.monitor_thread = threading.Thread(target=self.run, args=(interval, duration))
-        self.monitor_thread.start()
+        # PIR output is driven, not a mechanical contact, so no debounce window is needed
+        watch = self.edges.watch(self.pin, on_edge, debounce_ms=0, duration=duration, on_done=self._monitoring_done)
+        self.publish_state(watch.level, interval, duration)  # Initial state
         self.logger.info(f"PIR sensor monitoring started on pin {self.pin}")
+        return watch
 
-    def run(self, interval, duration):
+    def stop_monitoring(self):
         """
-        Internal method to monitor the PIR sensor and publish data.
-        
-        Args:
-            interval (int): Time interval (in seconds) between readings.
-            duration (int): Total duration (in seconds) to monitor the sensor.
+        Stop monitoring the PIR sensor.
         """
-        start_time = time.time()
-        last_state = None
+        self.edges.unwatch(self.pin)
 
-        while not self.stop_thread and (time.time() - start_time) < duration:
-            try:
-                motion_detected = GPIO.input(self.pin) == GPIO.HIGH
-
-                # Publish message only if there is a change in state
-                if motion_detected != last_state:
-                    last_state = motion_detected
-                    message = "Motion Detected" if motion_detected else "No Motion Detected"
-
-                    # Prepare and publish the MQTT message
-                    payload = {
-                        "component": "PIR_SENSOR",
-                        "data": {
-                            "pin": self.pin,
-                            "message": message,
-                            "interval": interval,
-                            "duration": duration
-                        }
-                    }
-                    self.client.publish(self.topic, json.dumps(payload))
-                    self.logger.info(f"Published: {message} on pin {self.pin}")
+    def _monitoring_done(self, pin):
+        self.logger.info("PIR sensor monitoring completed.")
 
-                time.sleep(interval)  # Wait for the specified interval before checking again
-            except Exception as e:
-                self.logger.error(f"Error monitoring PIR sensor: {e}")
-                break
+    def publish_state(self, motion_detected, interval, duration):
+        """
+        Publish a PIR state change.
+        
+        Args:
+            motion_detected (bool): True if motion is detected.
+            interval (int): Monitoring interval, included in the direct MQTT message.
+            duration (int): Monitoring duration, included in the direct MQTT message.
+        """
+        message = "Motion Detected" if motion_detected else "No Motion Detected"
+        if self.telemetry is not None:
+            self.telemetry.submit("PIR_SENSOR", {"motion": motion_detected}, key=self.pin)
+            self.logger.debug(f"Queued: {message} on pin {self.pin}")
+            return
 
-        self.logger.info("PIR sensor monitoring completed.")
+        # Prepare and publish the MQTT message
+        payload = {
+            "component": "PIR_SENSOR",
+            "data": {
+                "pin": self.pin,
+                "message": message,
+                "interval": interval,
+                "duration": duration
+            }
+        }
+        self.client.publish(self.topic, json.dumps(payload))
+        self.logger.info(f"Published: {message} on pin {self.pin}")
 
     def cleanup(self):
         """
-        Clean up resources and stop the monitoring thread.
+        Clean up resources and stop monitoring.
         """
-        self.stop_thread = True
-        if self.monitor_thread is not None and self.monitor_thread.is_alive():
-            self.monitor_thread.join()  # Wait for the thread to finish
+        if self.pin is not None:
+            self.edges.unwatch(self.pin)
         GPIO.cleanup(self.pin)
         self.logger.info("PIR sensor cleanup completed.")
\ No newline at end of file
@@ -1,4 +1,4 @@
-import RPi.GPIO as GPIO
+from hal import GPIO
 import json
 import logging
 
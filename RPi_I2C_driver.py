@@ -13,13 +13,13 @@ Made available under GNU GENERAL PUBLIC LICENSE
 """
 #
 #
-import smbus
+from hal import SMBus
 from time import *
 
 class i2c_device:
    def __init__(self, addr, port=1):
       self.addr = addr
-      self.bus = smbus.SMBus(port)
+      self.bus = SMBus(port)
 
 # Write a single command
    def write_cmd(self, cmd):
@@ -0,0 +1,290 @@
+import json
+import math
+import statistics
+import threading
+import logging
+from collections import deque
+
+
+def _missing(value):
+    return value is None or isinstance(value, float) and math.isnan(value)
+
+
+class ZScoreDetector:
+    def __init__(self, threshold=4.0, alpha=0.05, warmup=20):
+        """
+        Flag values far from an exponentially weighted mean, in units of the weighted standard deviation.
+
+        Args:
+            threshold (float): Absolute z-score above which a value is anomalous.
+            alpha (float): Weight of the newest value in the running mean and variance.
+            warmup (int): Values seen before anything is flagged.
+        """
+        self.threshold = threshold
+        self.alpha = alpha
+        self.warmup = warmup
+        self.mean = None
+        self.var = 0.0
+        self.count = 0
+
+    def update(self, ts, value):
+        if _missing(value):
+            return None
+        self.count += 1
+        if self.mean is None:
+            self.mean = value
+            return None
+        deviation = value - self.mean
+        score = deviation / math.sqrt(self.var) if self.var > 0 else 0.0
+        anomalous = self.count > self.warmup and abs(score) > self.threshold
+        self.mean += self.alpha * deviation
+        self.var = (1 - self.alpha) * (self.var + self.alpha * deviation * deviation)
+        return {"score": round(score, 2)} if anomalous else None
+
+
+class MADDetector:
+    def __init__(self, threshold=5.0, window=31):
+        """
+        Flag values far from the median of recent values, scaled by the median absolute deviation.
+        Robust to the outliers it is looking for, unlike a mean and standard deviation.
+
+        Args:
+            threshold (float): Modified z-score above which a value is anomalous.
+            window (int): Recent values the median is taken over.
+        """
+        self.threshold = threshold
+        self.window = deque(maxlen=window)
+
+    def update(self, ts, value):
+        if _missing(value):
+            return None
+        anomalous = None
+        if len(self.window) == self.window.maxlen:
+            median = statistics.median(self.window)
+            mad = statistics.median(abs(v - median) for v in self.window)
+            if mad > 0:
+                score = 0.6745 * (value - median) / mad
+                if abs(score) > self.threshold:
+                    anomalous = {"score": round(score, 2), "median": median}
+        self.window.append(value)
+        return anomalous
+
+
+class RateDetector:
+    def __init__(self, max_rate):
+        """
+        Flag changes faster than physically plausible (e.g. a sudden temperature jump).
+
+        Args:
+            max_rate (float): Largest allowed change per second.
+        """
+        self.max_rate = max_rate
+        self.last = None
+
+    def update(self, ts, value):
+        if _missing(value):
+            return None
+        last, self.last = self.last, (ts, value)
+        if last is None or ts <= last[0]:
+            return None
+        rate = (value - last[1]) / (ts - last[0])
+        return {"rate": round(rate, 3)} if abs(rate) > self.max_rate else None
+
+
+class StuckDetector:
+    def __init__(self, samples=30, tolerance=0.0):
+        """
+        Flag a value that stops changing (a stuck-at sensor or a frozen driver).
+
+        Args:
+            samples (int): Consecutive unchanged values that count as stuck.
+            tolerance (float): Largest change still counted as unchanged.
+        """
+        self.samples = samples
+        self.tolerance = tolerance
+        self.reference = None
+        self.count = 0
+
+    def update(self, ts, value):
+        if _missing(value):
+            return None
+        if self.reference is not None and abs(value - self.reference) <= self.tolerance:
+            self.count += 1
+        else:
+            self.reference, self.count = value, 1
+        return {"repeated": self.count} if self.count >= self.samples else None
+
+
+class SaturationDetector:
+    def __init__(self, low=None, high=None, samples=1):
+        """
+        Flag values pinned at the edge of the measurable range.
+
+        Args:
+            low (float): Values at or below this are saturated.
+            high (float): Values at or above this are saturated.
+            samples (int): Consecutive saturated values before flagging.
+        """
+        self.low = low
+        self.high = high
+        self.samples = samples
+        self.count = 0
+
+    def update(self, ts, value):
+        if _missing(value):
+            return None
+        if self.low is not None and value <= self.low:
+            limit = self.low
+        elif self.high is not None and value >= self.high:
+            limit = self.high
+        else:
+            limit = None
+        self.count = self.count + 1 if limit is not None else 0
+        return {"limit": limit} if self.count >= self.samples else None
+
+
+class DropoutDetector:
+    def __init__(self, samples=3):
+        """
+        Flag a run of missing readings (e.g. ultrasonic bursts without enough valid echoes).
+
+        Args:
+            samples (int): Consecutive missing values before flagging.
+        """
+        self.samples = samples
+        self.count = 0
+
+    def update(self, ts, value):
+        self.count = self.count + 1 if _missing(value) else 0
+        return {"missing": self.count} if self.count >= self.samples else None
+
+
+DETECTORS = {
+    "zscore": ZScoreDetector,
+    "mad": MADDetector,
+    "rate": RateDetector,
+    "stuck": StuckDetector,
+    "saturation": SaturationDetector,
+    "dropout": DropoutDetector,
+}
+
+
+def build_detector(rule):
+    """
+    Build a detector from a config rule.
+
+    Args:
+        rule (dict): {'type': ..., **detector arguments}.
+
+    Returns:
+        A detector with an update(ts, value) method returning details when the value is anomalous, else None.
+    """
+    rule = dict(rule)
+    kind = rule.pop("type")
+    detector = DETECTORS.get(kind)
+    if detector is None:
+        raise ValueError(f"Unknown anomaly detector type: {kind}")
+    return detector(**rule)
+
+
+class AnomalyMonitor:
+    def __init__(self, client, topic, config=None):
+        """
+        Run streaming detectors over sensor samples and publish anomalies right away on a priority
+        topic, so regular telemetry can stay batched on long intervals without slowing fault reaction.
+
+        An alert is published when a detector starts flagging a stream and a 'cleared' message when it stops,
+        not for every anomalous sample.
+
+        Args:
+            client: Client with a publish(topic, payload, qos) method.
+            topic (str): Alert topic.
+            config (dict): Component name to {field: [detector rules]}.
+        """
+        self.client = client
+        self.topic = topic
+        self.config = config or {}
+        self.streams = {}  # (component, key) -> {field: [[name, detector, active], ...]}
+        self.lock = threading.Lock()
+        self.stats = {}  # component -> {"samples", "alerts"}
+        self.logger = logging.getLogger(__name__)
+
+    def _stream(self, component, key):
+        stream = self.streams.get((component, key))
+        if stream is None:
+            stream = self.streams[(component, key)] = {
+                field: [[rule["type"], build_detector(rule), False] for rule in rules]
+                for field, rules in self.config[component].items()
+            }
+        return stream
+
+    def process(self, component, key, data, ts):
+        """
+        Feed one sample to its stream's detectors.
+
+        Args:
+            component (str): Component that produced the sample.
+            key: Sensor instance key (usually its pin).
+            data (dict): Field name to value mapping.
+            ts (float): Sample timestamp (epoch seconds).
+
+        Returns:
+            int: Number of alerts published.
+        """
+        if component not in self.config:
+            return 0
+        alerts = []
+        with self.lock:
+            stats = self.stats.setdefault(component, {"samples": 0, "alerts": 0})
+            stats["samples"] += 1
+            for field, detectors in self._stream(component, key).items():
+                if field not in data:
+                    continue
+                value = data[field]
+                if isinstance(value, bool):
+                    value = int(value)
+                for entry in detectors:
+                    name, detector, active = entry
+                    detail = detector.update(ts, value)
+                    if (detail is not None) == active:
+                        continue
+                    entry[2] = detail is not None
+                    alerts.append({"component": component, "key": key, "field": field, "detector": name,
+                                   "event": "anomaly" if detail is not None else "cleared",
+                                   "value": value, "ts": ts, **(detail or {})})
+            stats["alerts"] += sum(1 for alert in alerts if alert["event"] == "anomaly")
+        for alert in alerts:
+            self._publish(alert)
+        return len(alerts)
+
+    def _publish(self, alert):
+        level = logging.WARNING if alert["event"] == "anomaly" else logging.INFO
+        self.logger.log(level, f"{alert['component']} {alert['key']} {alert['field']}: {alert['detector']} "
+                               f"{alert['event']} (value {alert['value']})")
+        try:
+            self.client.publish(self.topic, json.dumps(alert), qos=1)
+        except Exception as e:
+            self.logger.error(f"Failed to publish anomaly alert: {e}")
+
+    def active(self):
+        """
+        List the detectors currently flagging a stream.
+
+        Returns:
+            list: (component, key, field, detector) tuples.
+        """
+        with self.lock:
+            return [(component, key, field, name)
+                    for (component, key), stream in self.streams.items()
+                    for field, detectors in stream.items()
+                    for name, _, active in detectors if active]
+
+    def report(self):
+        """
+        Return per-component sample and alert counts.
+
+        Returns:
+            dict: Component to samples checked and anomalies raised.
+        """
+        with self.lock:
+            return {component: dict(stats) for component, stats in self.stats.items()}
@@ -0,0 +1,169 @@
+import json
+import time
+import logging
+from schemas import ValidationError
+
+BATCH_COMPONENT = "batch"  # Pseudo-component used to route batch envelopes through the dispatcher
+
+
+def as_batch(data):
+    """
+    Normalize a decoded payload into a batch envelope if it is one.
+
+    Accepts either a JSON array of commands or an object with a 'batch' array.
+
+    Args:
+        data: Decoded JSON payload.
+
+    Returns:
+        dict: Envelope with 'component', 'id', 'atomic' and 'commands' keys, or None for single commands.
+    """
+    if isinstance(data, list):
+        return {"component": BATCH_COMPONENT, "id": None, "atomic": False, "commands": data}
+    if isinstance(data, dict) and isinstance(data.get("batch"), list):
+        return {
+            "component": BATCH_COMPONENT,
+            "id": data.get("id"),
+            "atomic": bool(data.get("atomic", False)),
+            "commands": data["batch"],
+        }
+    return None
+
+
+class BatchExecutor:
+    def __init__(self, handlers, dispatcher, publisher, ack_topic, config=None, atomic_writer=None, validator=None):
+        """
+        Initialize the batch executor.
+
+        Args:
+            handlers (dict): Mapping of component name to handler (MESSAGE_HANDLERS).
+            dispatcher (CommandDispatcher): Dispatcher for deferred (long-running) components.
+            publisher: Client used to publish the batch acknowledgement.
+            ack_topic (str): Topic the acknowledgement is published to.
+            config (dict): Batch configuration ('max_commands', 'deferred_components', 'atomic_components').
+            atomic_writer (callable): Applies a list of commands for atomic components all-or-nothing.
+            validator (CommandValidator): Schema validator applied to every command before it runs.
+        """
+        config = config or {}
+        self.handlers = handlers
+        self.dispatcher = dispatcher
+        self.publisher = publisher
+        self.ack_topic = ack_topic
+        self.max_commands = config.get("max_commands", 64)
+        self.deferred = set(config.get("deferred_components", []))
+        self.atomic_components = set(config.get("atomic_components", []))
+        self.atomic_writer = atomic_writer
+        self.validator = validator
+        self.logger = logging.getLogger(__name__)
+
+    def validate(self, command):
+        """
+        Check that a batch entry can be dispatched and normalize it.
+
+        Args:
+            command (dict): One command from the batch.
+
+        Returns:
+            tuple: (normalized command, error description or None).
+        """
+        if not isinstance(command, dict):
+            return command, "command is not an object"
+        component = command.get("component")
+        if not component:
+            return command, "no component specified"
+        if component not in self.handlers:
+            return command, f"no handler for component {component}"
+        if self.validator is not None:
+            try:
+                return self.validator.validate(command), None
+            except ValidationError as e:
+                return command, str(e)
+        if not isinstance(command.get("data", {}), dict):
+            return command, "data is not an object"
+        return command, None
+
+    def run(self, envelope):
+        """
+        Run every command of a batch in order and publish one acknowledgement.
+
+        Args:
+            envelope (dict): Batch envelope produced by as_batch().
+        """
+        start = time.perf_counter()
+        commands = envelope.get("commands", [])
+        atomic = envelope.get("atomic", False)
+        results = [None] * len(commands)
+
+        if len(commands) > self.max_commands:
+            self.logger.error(f"Batch of {len(commands)} commands exceeds limit of {self.max_commands}")
+            results = [{"status": "rejected", "error": "batch too large"} for _ in commands]
+            self._acknowledge(envelope, results, start)
+            return
+
+        checked = [self.validate(command) for command in commands]
+        commands = [command for command, _ in checked]
+        errors = [error for _, error in checked]
+        if atomic and any(errors):
+            # All-or-nothing: one bad command rejects the whole batch before anything runs
+            for i, error in enumerate(errors):
+                results[i] = {"status": "error", "error": error} if error else {"status": "skipped"}
+            self._acknowledge(envelope, results, start)
+            return
+
+        staged = []  # Indexes of atomic GPIO writes, applied together at the end
+        inline = {command["component"] for command, error in zip(commands, errors)
+                  if not error and (self._staged(command, atomic) or command["component"] not in self.deferred)}
+        # Commands run here bypass their component pools: let the pools finish what was submitted
+        # before the batch, and keep newer commands waiting until the batch has been applied
+        with self.dispatcher.hold(inline):
+            for i, command in enumerate(commands):
+                if errors[i]:
+                    results[i] = {"status": "error", "error": errors[i]}
+                    continue
+                component = command["component"]
+                if self._staged(command, atomic):
+                    staged.append(i)
+                elif component in self.deferred:
+                    accepted = self.dispatcher.submit(command)
+                    results[i] = {"status": "queued" if accepted else "rejected"}
+                else:
+                    results[i] = self._run_inline(command)
+
+            if staged:
+                try:
+                    self.atomic_writer([commands[i] for i in staged])
+                    status = {"status": "ok"}
+                except Exception as e:
+                    self.logger.error(f"Atomic GPIO apply failed, batch writes rolled back: {e}")
+                    status = {"status": "error", "error": str(e)}
+                for i in staged:
+                    results[i] = status
+
+        self._acknowledge(envelope, results, start)
+
+    def _staged(self, command, atomic):
+        return atomic and self.atomic_writer is not None and command["component"] in self.atomic_components
+
+    def _run_inline(self, command):
+        try:
+            self.handlers[command["component"]](command)
+            return {"status": "ok"}
+        except Exception as e:
+            self.logger.error(f"Error handling batched {command['component']} command: {e}")
+            return {"status": "error", "error": str(e)}
+
+    def _acknowledge(self, envelope, results, start):
+        failed = sum(1 for result in results if result["status"] in ("error", "rejected"))
+        ack = {
+            "ack": "batch",
+            "id": envelope.get("id"),
+            "count": len(results),
+            "failed": failed,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+            "results": results,
+        }
+        try:
+            self.publisher.publish(self.ack_topic, json.dumps(ack))
+            self.logger.info(f"Batch {envelope.get('id')} done: {len(results) - failed}/{len(results)} succeeded")
+        except Exception as e:
+            self.logger.error(f"Failed to publish batch acknowledgement: {e}")
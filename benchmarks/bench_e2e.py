@@ -0,0 +1,417 @@
+"""
+End-to-end benchmark of main_v2: commands go from an MQTT client through a local broker stand-in
+(benchmarks/broker.py) to main_v2's on_message -> dispatcher -> handler path and out to the
+simulated GPIO, and telemetry comes back the same way. Reports:
+
+  - command-to-GPIO-write latency (p50/p99) per component class, from the publish call to the
+    output/PWM write logged by the simulator
+  - the highest command rate sustained before the backlog (messages in flight plus commands queued
+    in the dispatcher) grows, from a stepped rate sweep
+  - telemetry samples and messages per second per sensor class, as received by a subscriber
+
+The load is the command mix of test.py's publisher, adapted to the current command schemas and with
+pins moved so no two components share one. Sensors, PIR and button are backed by the simulator's
+device models. Runs on the simulated HAL backend only.
+
+Run from the repository root:
+    python benchmarks/bench_e2e.py [--latency-rate 20] [--rates 25,50,100,200,400,800,1600] [--step 5]
+
+Results are saved as JSON (default benchmarks/results/e2e-<commit>.json) for comparison across versions:
+    python benchmarks/bench_e2e.py --compare benchmarks/results/e2e-<older commit>.json
+"""
+import argparse
+import bisect
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("IIOT_HAL", "sim")  # GPIO writes are only observable through the simulator's log
+
+import paho.mqtt.client as mqtt  # noqa: E402
+import config  # noqa: E402
+from broker import Broker  # noqa: E402
+from hal import GPIO, SIMULATED, recorder  # noqa: E402
+from simulator import UltrasonicModel, RCModel, WaveformModel, DHT11Model, SimDHT11  # noqa: E402
+
+LCD_MESSAGES = ["Hello, World!", "Temperature: 25°C", "Motion Detected!", "System Active"]
+SERVO_DUTY = {0: 2.5, 90: 7.5, 180: 12.5}  # Pwm.set_servo_angle
+
+
+def command_mix():
+    # test.py's publisher loop, one command per component
+    return [
+        {"component": "light", "data": {"pins": [12, 11, 13], "color": [random.randint(0, 100) for _ in range(3)]}},
+        {"component": "Ultrasonic sensor", "data": {"trig_pin": 15, "echo_pin": 14, "interval": random.randint(1, 10),
+                                                    "duration": random.randint(10, 30)}},
+        {"component": "stepper_motor", "data": {"pins": [16, 19, 20, 21],
+                                                "direction": random.choice(["clockwise", "counterclockwise"]),
+                                                "steps": random.randint(100, 500), "delay": random.randint(1, 10)}},
+        {"component": "led", "data": {"pin": 18, "state": random.choice(["ON", "OFF"])}},
+        {"component": "buzzer", "data": {"pin": 22, "state": random.choice(["ON", "OFF"])}},
+        {"component": "relay", "data": {"pin": 26, "state": random.choice(["ON", "OFF"])}},
+        {"component": "servo", "data": {"pin": 24, "angle": random.choice(list(SERVO_DUTY))}},
+        {"component": "DHT11", "data": {"pin": 23, "interval": random.randint(2, 10), "duration": random.randint(5, 15)}},
+        {"component": "PIR_SENSOR", "data": {"pin": 27, "interval": random.randint(1, 5), "duration": random.randint(20, 40)}},
+        {"component": "Button", "data": {"pin": 17, "duration": random.randint(5, 15)}},
+        {"component": "LCD", "data": {"message": random.choice(LCD_MESSAGES)}},
+        {"component": "Keypad", "data": {"pin": 2, "duration": random.randint(5, 15)}},
+        {"component": "LDR Sensor", "data": {"ldr_pin": 25, "light_pin": 10, "threshold": random.randint(1000, 10000)}},
+    ]
+
+
+def expected_write(command):
+    """
+    The GPIO write a command should cause, for latency matching.
+
+    Returns:
+        tuple: (class, op, pin, value), or None for commands without a single identifying write.
+    """
+    component, data = command["component"], command["data"]
+    if component in ("led", "relay", "buzzer"):
+        return "digital", "gpio.output", data["pin"], 1 if data["state"] == "ON" else 0
+    if component == "servo":
+        return "servo", "gpio.pwm_duty", data["pin"], SERVO_DUTY[data["angle"]]
+    if component == "light":
+        return "light", "gpio.pwm_duty", data["pins"][0], data["color"][0]
+    return None
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def version():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+class Load:
+    def __init__(self, client, topic):
+        """
+        Publishes the command mix at a fixed rate and remembers when each identifiable write was requested.
+        """
+        self.client = client
+        self.topic = topic
+        self.sent = 0
+        self.requests = defaultdict(list)  # (op, pin) -> [(publish_ns, value, class)], in publish order
+        self.lock = threading.Lock()
+
+    def run(self, rate, seconds, stop=None):
+        mix = []
+        interval_ns = int(1e9 / rate)
+        start = time.perf_counter_ns()
+        end = start + int(seconds * 1e9)
+        deadline = start
+        while deadline < end and not (stop and stop.is_set()):
+            if not mix:
+                mix = command_mix()
+            command = mix.pop(0)
+            write = expected_write(command)
+            payload = json.dumps(command)
+            now = time.perf_counter_ns()
+            if write is not None:
+                with self.lock:
+                    self.requests[(write[1], write[2])].append((now, write[3], write[0]))
+            self.client.publish(self.topic, payload)
+            self.sent += 1
+            deadline += interval_ns
+            delay = (deadline - time.perf_counter_ns()) / 1e9
+            if delay > 0:
+                time.sleep(delay)
+
+    def latencies(self, since_ns=0):
+        """
+        Match each logged write to the newest command for its pin and value published before it.
+        Commands replaced by a newer one before they ran (coalesced) have no write of their own.
+
+        Returns:
+            dict: Class to a list of latencies in milliseconds.
+        """
+        result = defaultdict(list)
+        with self.lock:
+            requests = {key: list(entries) for key, entries in self.requests.items()}
+        times = {key: [entry[0] for entry in entries] for key, entries in requests.items()}
+        for t_ns, op, args in recorder.ops():
+            if t_ns < since_ns or not args or (op, args[0]) not in requests:
+                continue
+            entries = requests[(op, args[0])]
+            i = bisect.bisect_right(times[(op, args[0])], t_ns) - 1
+            while i >= 0 and entries[i][1] != args[1]:
+                i -= 1
+            if i >= 0 and entries[i][0] >= since_ns:
+                result[entries[i][2]].append((t_ns - entries[i][0]) / 1e6)
+        return result
+
+
+class Telemetry:
+    def __init__(self, codec, topics):
+        """
+        Counts what a subscriber receives: samples per component on the telemetry topic, and alerts.
+        """
+        self.codec = codec
+        self.topics = topics
+        self.samples = defaultdict(int)
+        self.messages = defaultdict(int)
+        self.bytes = 0
+        self.alerts = 0
+        self.lock = threading.Lock()
+
+    def on_message(self, client, userdata, message):
+        if message.topic == self.topics.alerts:
+            with self.lock:
+                self.alerts += 1
+            return
+        if message.topic != self.topics.telemetry:
+            return
+        try:
+            batch = self.codec.decode(message.payload)
+        except ValueError:
+            return
+        with self.lock:
+            self.bytes += len(message.payload)
+            for stream in batch.get("streams", []):
+                self.samples[stream["component"]] += len(stream["samples"])
+                self.messages[stream["component"]] += 1
+
+    def report(self, seconds):
+        with self.lock:
+            return {
+                "seconds": round(seconds, 2),
+                "bytes_per_s": round(self.bytes / seconds, 1),
+                "alerts": self.alerts,
+                "components": {
+                    component: {"samples": count, "samples_per_s": round(count / seconds, 2),
+                                "batches_per_s": round(self.messages[component] / seconds, 2)}
+                    for component, count in sorted(self.samples.items())
+                },
+            }
+
+
+def backlog(device, load, received):
+    # Commands published but not yet taken by a worker: in the broker/socket, or queued in the dispatcher
+    pending = sum(pool.queue.qsize() for pool in device.dispatcher.pools.values())
+    return load.sent - received[0] + pending
+
+
+def wait_drained(device, load, received, timeout=15.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if backlog(device, load, received) <= 0:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def sweep(device, load, received, rates, seconds):
+    steps = []
+    best = 0
+    for rate in rates:
+        before = device.dispatcher.stats()
+        samples = []
+        stop = threading.Event()
+
+        def sample():
+            while not stop.wait(0.1):
+                samples.append(backlog(device, load, received))
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        sent = load.sent
+        since = time.perf_counter_ns()
+        start = time.perf_counter()
+        load.run(rate, seconds)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        sampler.join()
+        wait_drained(device, load, received)
+        latency = summarize_latency(load.latencies(since)).get("all", {})
+        after = device.dispatcher.stats()
+        rejected = sum(after[c]["rejected"] - before[c]["rejected"] for c in after)
+
+        # The backlog grows if the last quarter of the step sits clearly above the first quarter
+        quarter = max(1, len(samples) // 4)
+        head = sum(samples[:quarter]) / quarter
+        tail = sum(samples[-quarter:]) / quarter
+        growth = tail - head
+        achieved = (load.sent - sent) / elapsed
+        sustained = rejected == 0 and growth <= max(5, 0.05 * rate * seconds) and achieved >= 0.95 * rate
+        steps.append({"rate": rate, "achieved": round(achieved, 1), "backlog_start": round(head, 1),
+                      "backlog_end": round(tail, 1), "backlog_max": max(samples, default=0),
+                      "rejected": rejected, "p50_ms": latency.get("p50_ms"), "p99_ms": latency.get("p99_ms"),
+                      "sustained": sustained})
+        print(f"  {rate:>6} cmd/s  sent {achieved:>8.1f}/s  backlog {head:>7.1f} -> {tail:>7.1f}  "
+              f"rejected {rejected:>5}  p99 {latency.get('p99_ms', 0):>8.2f} ms  {'ok' if sustained else 'GROWING'}")
+        if not sustained:
+            break
+        best = rate
+    return {"max_sustained_cmd_s": best, "step_seconds": seconds, "steps": steps}
+
+
+def attach_devices():
+    # Sensor hardware the mix starts sessions on
+    UltrasonicModel(GPIO, 15, 14, distance_cm=lambda: 80 + 40 * random.random(), noise_cm=0.5)
+    RCModel(GPIO, 25, charge_us=lambda: random.uniform(2000, 8000))
+    SimDHT11.attach(23, DHT11Model(temperature=lambda: random.uniform(20, 35), humidity=lambda: random.uniform(70, 90)))
+    return [
+        WaveformModel(GPIO, 27, [(1, 0.5), (0, 1.5)]).start(),  # PIR: half-second motion pulses
+        WaveformModel(GPIO, 17, [(0, 0.1), (1, 0.9)]).start(),  # Button (pulled up): a press every second
+    ]
+
+
+def print_latency(latency):
+    print(f"\n{'class':<10} {'writes':>7} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, stats in latency.items():
+        print(f"{name:<10} {stats['count']:>7} {stats['p50_ms']:>9.3f} {stats['p99_ms']:>9.3f} {stats['max_ms']:>9.3f}")
+
+
+def summarize_latency(latencies):
+    result = {}
+    everything = [value for values in latencies.values() for value in values]
+    for name, values in sorted(latencies.items()) + [("all", everything)]:
+        if values:
+            result[name] = {"count": len(values), "p50_ms": round(percentile(values, 0.50), 3),
+                            "p99_ms": round(percentile(values, 0.99), 3), "max_ms": round(max(values), 3)}
+    return result
+
+
+def compare(current, path):
+    with open(path) as f:
+        previous = json.load(f)
+    print(f"\ncompared with {previous['version']} ({previous['timestamp']})")
+    for name, stats in current["latency"].items():
+        old = previous["latency"].get(name)
+        if old:
+            print(f"  {name:<10} p50 {old['p50_ms']:.3f} -> {stats['p50_ms']:.3f} ms   "
+                  f"p99 {old['p99_ms']:.3f} -> {stats['p99_ms']:.3f} ms")
+    print(f"  max sustained {previous['throughput']['max_sustained_cmd_s']} -> "
+          f"{current['throughput']['max_sustained_cmd_s']} cmd/s")
+    for component, stats in current["telemetry"]["components"].items():
+        old = previous["telemetry"]["components"].get(component)
+        if old:
+            print(f"  {component:<20} {old['samples_per_s']} -> {stats['samples_per_s']} samples/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-rate", type=float, default=20, help="Command rate of the latency run (cmd/s)")
+    parser.add_argument("--latency-seconds", type=float, default=10)
+    parser.add_argument("--rates", default="25,50,100,200,400,800,1600,3200",
+                        help="Comma-separated command rates of the sweep (cmd/s)")
+    parser.add_argument("--step", type=float, default=5, help="Seconds per sweep step")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", help="Result file (default benchmarks/results/e2e-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    parser.add_argument("--log-level", default="ERROR", help="Log level of main_v2 during the run")
+    args = parser.parse_args()
+    if not SIMULATED:
+        sys.exit("bench_e2e needs the simulated HAL backend (IIOT_HAL=sim)")
+    random.seed(args.seed)
+    # Resolved before moving to the scratch directory
+    save = os.path.abspath(args.save) if args.save else None
+    previous = os.path.abspath(args.compare) if args.compare else None
+
+    broker = Broker().start()
+    config.MQTT_CONFIG.update(broker="127.0.0.1", port=broker.port, reconnect_min_delay=1, reconnect_max_delay=1)
+    workdir = tempfile.TemporaryDirectory(prefix="bench_e2e_")
+    os.chdir(workdir.name)  # Offline buffer segments and the time-series database land here
+
+    import main_v2 as device  # noqa: E402 - builds the device on the patched broker config
+    logging.getLogger().setLevel(args.log_level)
+    models = attach_devices()
+
+    received = [0]
+    on_message = device.on_message
+
+    def counting_on_message(client, userdata, message):
+        received[0] += 1
+        on_message(client, userdata, message)
+
+    device.start()
+    device.client.on_message = counting_on_message
+
+    telemetry = Telemetry(device.codecs["telemetry"], device.topics)
+    cloud = mqtt.Client()
+    cloud.on_message = telemetry.on_message
+    cloud.connect("127.0.0.1", broker.port)
+    cloud.subscribe([(device.topics.telemetry, 0), (device.topics.alerts, 0)])
+    cloud.loop_start()
+
+    deadline = time.monotonic() + 10
+    while not any(device.topics.cmd in s.subscriptions for s in list(broker.sessions)):
+        if time.monotonic() > deadline:
+            sys.exit("main_v2 did not subscribe to the command topic")
+        time.sleep(0.05)
+    load = Load(cloud, device.topics.cmd)
+
+    print(f"\nmain_v2 at {version()} on the simulated HAL, broker stand-in on port {broker.port}")
+    print(f"latency run: {args.latency_rate} cmd/s for {args.latency_seconds} s")
+    started = time.perf_counter()
+    since = time.perf_counter_ns()
+    load.run(args.latency_rate, args.latency_seconds)
+    wait_drained(device, load, received)
+    time.sleep(0.5)  # Let the last handlers write
+    latency = summarize_latency(load.latencies(since))
+    print_latency(latency)
+
+    print(f"\nrate sweep, {args.step} s per step")
+    throughput = sweep(device, load, received, [float(rate) for rate in args.rates.split(",")], args.step)
+    print(f"max sustained: {throughput['max_sustained_cmd_s']} cmd/s")
+
+    wait_drained(device, load, received)
+    elapsed = time.perf_counter() - started
+    telemetry_report = telemetry.report(elapsed)
+    print(f"\ntelemetry over {elapsed:.1f} s ({telemetry_report['bytes_per_s']} bytes/s, "
+          f"{telemetry_report['alerts']} alerts)")
+    for component, stats in telemetry_report["components"].items():
+        print(f"  {component:<20} {stats['samples']:>7} samples  {stats['samples_per_s']:>8.2f}/s  "
+              f"{stats['batches_per_s']:>6.2f} batches/s")
+
+    cloud.loop_stop()
+    cloud.disconnect()
+    for model in models:
+        model.stop()
+    device.stop()
+    broker.stop()
+
+    result = {
+        "version": version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "args": vars(args),
+        "latency": latency,
+        "throughput": throughput,
+        "telemetry": telemetry_report,
+        "dispatch": device.dispatcher.stats(),
+        "gpio_ops": dict(recorder.counts("gpio.")),
+    }
+    path = save or os.path.join(ROOT, "benchmarks", "results", f"e2e-{result['version']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nresults saved to {path}")
+    if previous:
+        compare(result, previous)
+    os.chdir(ROOT)
+    workdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
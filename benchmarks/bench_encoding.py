@@ -0,0 +1,90 @@
+"""
+Compare telemetry encodings: encode cost and bytes on the wire.
+
+Run from the repository root:
+    python benchmarks/bench_encoding.py [--samples 20] [--iterations 2000]
+
+Codecs whose optional package (cbor2, msgpack) is not installed are skipped.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from encoding import CODECS, get_codec  # noqa: E402
+
+
+def legacy_messages(samples):
+    # One JSON document per reading, as published before batching
+    messages = []
+    for i in range(samples):
+        messages.append({"temperature": round(random.uniform(20, 35), 2),
+                         "humidity": round(random.uniform(70, 90), 2)})
+        messages.append({"component": "Ultrasonic sensor",
+                         "data": {"distance": round(random.uniform(10, 200), 2), "valid": 5, "pings": 5,
+                                  "spread": round(random.uniform(0, 3), 2)}})
+        messages.append({"component": "PIR_SENSOR",
+                         "data": {"pin": 21, "message": "Motion Detected", "interval": 1, "duration": 10}})
+    return messages
+
+
+def telemetry_batch(samples):
+    now = time.time()
+    return {"streams": [
+        {"component": "DHT11", "key": 4, "fields": ["ts", "temperature", "humidity"],
+         "samples": [[round(now + i, 3), round(random.uniform(20, 35), 2), round(random.uniform(70, 90), 2)]
+                     for i in range(samples)]},
+        {"component": "Ultrasonic sensor", "key": 23, "fields": ["ts", "distance", "valid", "spread"],
+         "samples": [[round(now + i, 3), round(random.uniform(10, 200), 2), 5, round(random.uniform(0, 3), 2)]
+                     for i in range(samples)]},
+        {"component": "PIR_SENSOR", "key": 21, "fields": ["ts", "motion"],
+         "samples": [[round(now + i, 3), i % 2 == 0] for i in range(samples)]},
+    ]}
+
+
+def bench(encode, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        payload = encode()
+    elapsed = time.perf_counter() - start
+    return elapsed / iterations * 1e6, payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=20, help="samples per sensor stream")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    random.seed(1)
+    batch = telemetry_batch(args.samples)
+    legacy = legacy_messages(args.samples)
+    readings = 3 * args.samples
+
+    rows = []
+    us, payloads = bench(lambda: [json.dumps(m) for m in legacy], args.iterations)
+    rows.append(("legacy json (1 msg/reading)", us, sum(len(p) for p in payloads), len(payloads)))
+
+    for name in CODECS:
+        try:
+            codec = get_codec(name)
+        except ImportError as e:
+            print(f"skipping {name}: {e}")
+            continue
+        us, payload = bench(lambda: codec.encode(batch), args.iterations)
+        decoded = codec.decode(payload)
+        assert len(decoded["streams"]) == len(batch["streams"]), f"{name} round trip failed"
+        rows.append((f"{name} batch", us, len(payload), 1))
+
+    print(f"\n{readings} readings ({args.samples} per stream, 3 streams), {args.iterations} iterations\n")
+    print(f"{'encoding':<30} {'encode us':>10} {'us/reading':>11} {'bytes':>8} {'bytes/reading':>14} {'messages':>9}")
+    for name, us, size, messages in rows:
+        print(f"{name:<30} {us:>10.1f} {us / readings:>11.2f} {size:>8} {size / readings:>14.1f} {messages:>9}")
+
+
+if __name__ == "__main__":
+    main()
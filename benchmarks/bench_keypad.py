@@ -0,0 +1,69 @@
+"""
+Compare keypad scanning: the original keypad.getKey() against KeypadScanner.scan().
+Reports scans per second and GPIO calls per scan, idle and with a key held.
+
+Run from the repository root:
+    python benchmarks/bench_keypad.py [--scans 2000]
+
+On a Raspberry Pi the real RPi.GPIO is used (the keypad must be idle for the idle run; GPIO calls are
+only counted by the simulator). Elsewhere, or with IIOT_HAL=sim, the simulated HAL backend and its
+key matrix model stand in for it.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hal import GPIO, SIMULATED, recorder  # noqa: E402
+from simulator import KeypadModel  # noqa: E402
+from keypad import keypad  # noqa: E402
+from keypad_scanner import KeypadScanner, KEYMAP_4X4  # noqa: E402
+
+ROWS = [2, 3, 4, 5]
+COLUMNS = [6, 7, 8, 9]
+
+
+def bench(scan, scans):
+    recorder.reset()
+    start = time.perf_counter()
+    for _ in range(scans):
+        scan()
+    elapsed = time.perf_counter() - start
+    calls = recorder.counts("gpio.")
+    per_scan = {name[5:]: round(count / scans, 1) for name, count in sorted(calls.items())}
+    return scans / elapsed, per_scan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scans", type=int, default=2000)
+    args = parser.parse_args()
+
+    legacy = keypad(row=ROWS, column=COLUMNS)
+    scanner = KeypadScanner(ROWS, COLUMNS)
+
+    cases = [("idle", None)]
+    if SIMULATED:
+        matrix = KeypadModel(GPIO, ROWS, COLUMNS, KEYMAP_4X4)
+        cases.append(("key 5 held", 5))
+
+    print(f"\n{'simulated' if SIMULATED else 'RPi.GPIO'} matrix, {args.scans} scans per run\n")
+    print(f"{'scanner':<16} {'case':<12} {'scans/s':>10}  GPIO calls per scan")
+    for case, key in cases:
+        if key is not None:
+            matrix.press(key)
+        for name, scan in (("keypad.getKey", legacy.getKey), ("KeypadScanner", scanner.scan)):
+            if scan == scanner.scan:
+                scanner.configure()  # getKey leaves the shared pins reconfigured; set up once before the run
+            rate, per_scan = bench(scan, args.scans)
+            total = sum(per_scan.values())
+            print(f"{name:<16} {case:<12} {rate:>10.0f}  {total:.1f} {per_scan}")
+        if key is not None:
+            matrix.release(key)
+    print(f"\nscanner stats: {scanner.report()}")
+
+
+if __name__ == "__main__":
+    main()
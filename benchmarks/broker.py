@@ -0,0 +1,275 @@
+"""
+Minimal in-process MQTT 3.1.1 broker for benchmarks: enough of the protocol for paho clients on
+localhost to connect, subscribe and exchange messages, with nothing between them but a socket.
+
+Supported: CONNECT (with will), SUBSCRIBE/UNSUBSCRIBE with + and # wildcards, PUBLISH at QoS 0, 1
+and 2, retained messages, PINGREQ and DISCONNECT. Not supported: authentication (any username is
+accepted), persistent sessions and redelivery; deliveries go out at the lower of the publish and
+subscription QoS, capped at 1.
+
+    broker = Broker().start()
+    ... connect clients to 127.0.0.1:broker.port ...
+    broker.stop()
+"""
+import socket
+import struct
+import threading
+import logging
+
+CONNECT, CONNACK, PUBLISH, PUBACK, PUBREC, PUBREL, PUBCOMP = 1, 2, 3, 4, 5, 6, 7
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK, PINGREQ, PINGRESP, DISCONNECT = 8, 9, 10, 11, 12, 13, 14
+
+
+def topic_matches(pattern, topic):
+    """
+    Check a topic against a subscription filter with MQTT wildcards.
+
+    Args:
+        pattern (str): Filter, e.g. 'a/+/telemetry' or 'a/#'.
+        topic (str): Concrete topic name.
+
+    Returns:
+        bool: True if the topic matches.
+    """
+    levels = topic.split("/")
+    parts = pattern.split("/")
+    for i, part in enumerate(parts):
+        if part == "#":
+            return True
+        if i >= len(levels) or part not in ("+", levels[i]):
+            return False
+    return len(parts) == len(levels)
+
+
+def _encode_length(length):
+    encoded = bytearray()
+    while True:
+        byte, length = length % 128, length // 128
+        encoded.append(byte | 0x80 if length else byte)
+        if not length:
+            return bytes(encoded)
+
+
+def _string(data, offset):
+    length = struct.unpack_from("!H", data, offset)[0]
+    return data[offset + 2:offset + 2 + length], offset + 2 + length
+
+
+def _packet(kind, flags, body):
+    return bytes([kind << 4 | flags]) + _encode_length(len(body)) + body
+
+
+class _Session:
+    def __init__(self, broker, sock):
+        self.broker = broker
+        self.sock = sock
+        self.send_lock = threading.Lock()
+        self.subscriptions = {}  # Filter -> granted QoS
+        self.will = None  # (topic, payload, qos, retain)
+        self.client_id = None
+        self.next_id = 0
+
+    def send(self, packet):
+        with self.send_lock:
+            self.sock.sendall(packet)
+
+    def deliver(self, topic, payload, qos, retain=False):
+        body = struct.pack("!H", len(topic)) + topic
+        if qos:
+            self.next_id = self.next_id % 65535 + 1
+            body += struct.pack("!H", self.next_id)
+        self.send(_packet(PUBLISH, qos << 1 | int(retain), body + payload))
+
+    def _read(self, count):
+        data = bytearray()
+        while len(data) < count:
+            chunk = self.sock.recv(count - len(data))
+            if not chunk:
+                raise ConnectionError("client closed the connection")
+            data += chunk
+        return bytes(data)
+
+    def _read_packet(self):
+        header = self._read(1)[0]
+        length, shift = 0, 0
+        while True:
+            byte = self._read(1)[0]
+            length |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                break
+        return header >> 4, header & 0x0F, self._read(length) if length else b""
+
+    def run(self):
+        clean = False
+        try:
+            while True:
+                kind, flags, body = self._read_packet()
+                if kind == CONNECT:
+                    self._connect(body)
+                elif kind == PUBLISH:
+                    self._publish(flags, body)
+                elif kind == PUBREL:
+                    self.send(_packet(PUBCOMP, 0, body[:2]))
+                elif kind == SUBSCRIBE:
+                    self._subscribe(body)
+                elif kind == UNSUBSCRIBE:
+                    self._unsubscribe(body)
+                elif kind == PINGREQ:
+                    self.send(_packet(PINGRESP, 0, b""))
+                elif kind == DISCONNECT:
+                    clean = True
+                    return
+                # PUBACK, PUBREC and PUBCOMP from subscribers need no action: nothing is redelivered
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.broker._remove(self)
+            if not clean and self.will is not None:
+                self.broker.route(*self.will)
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+
+    def _connect(self, body):
+        _, offset = _string(body, 0)  # Protocol name
+        flags = body[offset + 1]
+        offset += 4  # Level, flags, keep-alive
+        client_id, offset = _string(body, offset)
+        self.client_id = client_id.decode("utf-8", "replace")
+        if flags & 0x04:
+            will_topic, offset = _string(body, offset)
+            will_payload, offset = _string(body, offset)
+            self.will = (will_topic, will_payload, (flags >> 3) & 0x03, bool(flags & 0x20))
+        self.send(_packet(CONNACK, 0, b"\x00\x00"))
+
+    def _publish(self, flags, body):
+        qos, retain = (flags >> 1) & 0x03, bool(flags & 0x01)
+        topic, offset = _string(body, 0)
+        if qos:
+            packet_id = body[offset:offset + 2]
+            offset += 2
+        self.broker.route(topic, body[offset:], qos, retain)
+        if qos == 1:
+            self.send(_packet(PUBACK, 0, packet_id))
+        elif qos == 2:
+            self.send(_packet(PUBREC, 0, packet_id))
+
+    def _subscribe(self, body):
+        packet_id, offset = body[:2], 2
+        granted = []
+        filters = []
+        while offset < len(body):
+            topic_filter, offset = _string(body, offset)
+            qos = min(body[offset] & 0x03, 1)
+            offset += 1
+            self.subscriptions[topic_filter.decode()] = qos
+            filters.append(topic_filter.decode())
+            granted.append(qos)
+        self.send(_packet(SUBACK, 0, packet_id + bytes(granted)))
+        for topic, (payload, qos) in self.broker.retained_for(filters):
+            self.deliver(topic.encode(), payload, min(qos, self.subscriptions[self._filter_for(filters, topic)]),
+                         retain=True)
+
+    @staticmethod
+    def _filter_for(filters, topic):
+        return next(f for f in filters if topic_matches(f, topic))
+
+    def _unsubscribe(self, body):
+        packet_id, offset = body[:2], 2
+        while offset < len(body):
+            topic_filter, offset = _string(body, offset)
+            self.subscriptions.pop(topic_filter.decode(), None)
+        self.send(_packet(UNSUBACK, 0, packet_id))
+
+
+class Broker:
+    def __init__(self, host="127.0.0.1", port=0):
+        """
+        Args:
+            host (str): Interface to listen on.
+            port (int): TCP port; 0 picks a free one (read it back from .port after start()).
+        """
+        self.host = host
+        self.port = port
+        self.sessions = []
+        self.retained = {}  # Topic -> (payload, qos)
+        self.lock = threading.Lock()
+        self.server = None
+        self.thread = None
+        self.stats = {"connections": 0, "received": 0, "delivered": 0, "bytes": 0}
+        self.logger = logging.getLogger(__name__)
+
+    def start(self):
+        self.server = socket.create_server((self.host, self.port))
+        self.port = self.server.getsockname()[1]
+        self.thread = threading.Thread(target=self._accept, name="bench-broker", daemon=True)
+        self.thread.start()
+        self.logger.info(f"Broker listening on {self.host}:{self.port}")
+        return self
+
+    def _accept(self):
+        while True:
+            try:
+                sock, _ = self.server.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            session = _Session(self, sock)
+            with self.lock:
+                self.sessions.append(session)
+                self.stats["connections"] += 1
+            threading.Thread(target=session.run, name="bench-broker-session", daemon=True).start()
+
+    def _remove(self, session):
+        with self.lock:
+            if session in self.sessions:
+                self.sessions.remove(session)
+
+    def route(self, topic, payload, qos, retain):
+        """
+        Deliver a message to every matching subscription.
+
+        Args:
+            topic (bytes): Topic name.
+            payload (bytes): Message payload.
+            qos (int): Publish QoS.
+            retain (bool): Keep the message for future subscribers (an empty payload clears it).
+        """
+        name = topic.decode("utf-8", "replace")
+        with self.lock:
+            self.stats["received"] += 1
+            self.stats["bytes"] += len(payload)
+            if retain:
+                if payload:
+                    self.retained[name] = (payload, qos)
+                else:
+                    self.retained.pop(name, None)
+            targets = []
+            for session in self.sessions:
+                granted = [qos for pattern, qos in list(session.subscriptions.items()) if topic_matches(pattern, name)]
+                if granted:
+                    targets.append((session, max(granted)))
+            self.stats["delivered"] += len(targets)
+        for session, granted in targets:
+            try:
+                session.deliver(topic, payload, min(qos, granted))
+            except OSError:
+                pass
+
+    def retained_for(self, filters):
+        with self.lock:
+            return [(topic, message) for topic, message in self.retained.items()
+                    if any(topic_matches(f, topic) for f in filters)]
+
+    def stop(self):
+        if self.server is not None:
+            self.server.close()
+        with self.lock:
+            sessions = list(self.sessions)
+        for session in sessions:
+            try:
+                session.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
@@ -8,7 +8,117 @@ MQTT_CONFIG = {
     # "topic": "a/sampleAsset_1718789748945"
     "username": "Raspberry pi _1699360504847",
     "password": "oemJ7BcQ_0GBGtEJu8Zk9h6znwtx6V8O",
-    "topic": "a/raspberry_1699360539765"
+    "topic": "a/raspberry_1699360539765",
+    # Reconnect backoff (seconds), handled by paho's network loop
+    "reconnect_min_delay": 1,
+    "reconnect_max_delay": 60,
+}
+
+# Subtopics under MQTT_CONFIG["topic"]: commands in, sensor readings and device status out
+TOPIC_CONFIG = {
+    "cmd": "cmd",
+    "telemetry": "telemetry",
+    "status": "status",
+    "schema": "schema",
+    "alerts": "alerts",
+    "metrics": "metrics",
+}
+
+# Payload encoding per subtopic: "json", "cbor" (needs cbor2), "msgpack" (needs msgpack)
+# or "struct" (fixed binary layout, telemetry only). A retained descriptor for each topic
+# is published to <base>/schema/<subtopic>.
+ENCODING_CONFIG = {
+    "cmd": "json",
+    "telemetry": "json",
+}
+
+# Store-and-forward for telemetry published while the broker is unreachable
+OFFLINE_BUFFER_CONFIG = {
+    "directory": "offline_buffer",
+    "max_bytes": 16 * 1024 * 1024,   # Total on-disk size of the buffer
+    "segment_bytes": 1024 * 1024,    # Size of each append-only segment file
+    "drop_policy": "oldest",         # "oldest" discards old segments when full, "newest" refuses new data
+    "drain_rate": 50,                # Max messages per second replayed after reconnecting
+}
+
+# Shared telemetry publisher: samples from all sensors are batched into one message per flush
+TELEMETRY_CONFIG = {
+    "max_batch": 50,   # Flush when this many samples are pending
+    "max_age": 1.0,    # Flush when the oldest pending sample is this old (seconds)
+    "immediate_components": ["Button", "Keypad", "PIR_SENSOR"],  # Edge events are flushed right away
+}
+
+# Local per-sensor history: a fixed-size NumPy ring buffer per stream (requires numpy)
+HISTORY_CONFIG = {
+    "capacity": 600,   # Samples kept per stream
+    "alpha": 0.2,      # EWMA smoothing factor
+    "components": ["DHT11", "Ultrasonic sensor", "PIR_SENSOR", "LDR Sensor"],
+}
+
+# Local time-series store (SQLite, WAL mode) queried with the "history" command
+STORE_CONFIG = {
+    "path": "data/timeseries.db",
+    "batch_size": 200,               # Rows inserted per transaction
+    "flush_interval": 5.0,           # Max seconds a reading waits before being inserted
+    "max_age": 7 * 24 * 3600,        # Retention by age (seconds)
+    "max_bytes": 64 * 1024 * 1024,   # Retention by size; the oldest rows are deleted beyond it
+    "prune_interval": 300,           # Seconds between retention passes
+    "max_points": 5000,              # Max buckets returned by one history query
+    "components": ["DHT11", "Ultrasonic sensor", "PIR_SENSOR", "LDR Sensor", "Button"],
+}
+
+# On-device anomaly detection, published immediately on the alerts topic. Per component: field -> detectors
+#   {"type": "zscore", "threshold": z, "alpha": a, "warmup": n}   far from the weighted running mean
+#   {"type": "mad", "threshold": z, "window": n}                 far from the recent median (robust)
+#   {"type": "rate", "max_rate": r}                              changes faster than r units per second
+#   {"type": "stuck", "samples": n, "tolerance": t}              unchanged for n samples
+#   {"type": "saturation", "low": l, "high": h, "samples": n}    pinned at the range limits
+#   {"type": "dropout", "samples": n}                            n missing readings in a row
+ANOMALY_CONFIG = {
+    "DHT11": {
+        "temperature": [{"type": "rate", "max_rate": 1.0}, {"type": "zscore", "threshold": 5.0},
+                        {"type": "stuck", "samples": 300}],
+        "humidity": [{"type": "mad", "threshold": 6.0, "window": 31}, {"type": "stuck", "samples": 300}],
+    },
+    "Ultrasonic sensor": {
+        "distance": [{"type": "dropout", "samples": 3}, {"type": "mad", "threshold": 6.0, "window": 21}],
+    },
+    "LDR Sensor": {
+        "charge_us": [{"type": "saturation", "low": 50, "high": 50000, "samples": 5}],
+    },
+}
+
+# Components published as window statistics ('<component> summary' with <field>_mean/min/max/std/ewma)
+# instead of raw samples: component -> window in seconds
+SUMMARY_CONFIG = {
+    "LDR Sensor": 60,
+    # "DHT11": 60,
+}
+
+# Report-by-exception filters applied before telemetry is queued. Per component:
+#   fields: field -> {"type": "deadband", "absolute": x, "percent": p, "hysteresis": h}
+#                 or {"type": "swinging_door", "deviation": d}
+#                 or {"type": "carry"} (never triggers a report, sent along with reported samples)
+#           fields without a rule are reported whenever they change
+#   max_silence: heartbeat, report a sample after this many seconds without one
+# Components not listed here are not filtered.
+FILTER_CONFIG = {
+    "DHT11": {
+        "fields": {
+            "temperature": {"type": "deadband", "absolute": 0.5, "hysteresis": 0.2},
+            "humidity": {"type": "deadband", "percent": 2, "hysteresis": 0.5},
+        },
+        "max_silence": 300,
+    },
+    "Ultrasonic sensor": {
+        "fields": {
+            "distance": {"type": "swinging_door", "deviation": 2.0},
+            "valid": {"type": "carry"},
+            "spread": {"type": "carry"},
+        },
+        "max_silence": 60,
+    },
+    "PIR_SENSOR": {"max_silence": 300},
 }
 
 GPIO_CONFIG = {
@@ -16,4 +126,86 @@ GPIO_CONFIG = {
     "relay_pin": 27,
     "buzzer_pin": 22,
     # Add other GPIO pins here
-}
\ No newline at end of file
+}
+
+# Stepper motion engine: moves ramp up from start_speed to the commanded speed and back down
+STEPPER_CONFIG = {
+    "start_speed": 200,      # Steps per second the motor reliably starts and stops at without a ramp
+    "max_speed": 1000,       # Commanded speeds (1000 / delay ms) are capped here
+    "accel": 2000,           # Steps per second squared
+    "profile": "trapezoid",  # "trapezoid", "scurve" (jerk-limited) or "none"
+    "spin": 0.0,             # Seconds busy-waited before each step (e.g. 0.0002 for sub-millisecond accuracy, at a CPU cost)
+}
+
+# Metrics snapshots on the metrics subtopic, optionally also written for node_exporter's textfile collector
+METRICS_CONFIG = {
+    "interval": 60,     # Seconds between snapshots
+    "textfile": None,   # e.g. "/var/lib/node_exporter/textfile_collector/iiot.prom"
+}
+
+# Shared scheduler for periodic sensor sampling: one timer thread plus a fixed worker pool
+SCHEDULER_CONFIG = {
+    "workers": 4,       # Samples from different sensors run in parallel up to this many at a time
+    "policy": "skip",   # Ticks the timer fell behind on: "skip" (drop), "catch_up" (run back to back) or "resync"
+    "spin": 0.0,        # Seconds busy-waited before each deadline for sub-millisecond accuracy
+}
+
+# Ultrasonic ranging: each sample is a burst of pings, outliers rejected and the rest aggregated
+ULTRASONIC_CONFIG = {
+    "max_range_cm": 400,      # Sets the per-ping echo timeout
+    "pings": 5,               # Pings per sample
+    "ping_gap": 0.06,         # Seconds between pings so earlier echoes die out
+    "aggregate": "median",    # "median" or "trimmed_mean"
+    "trim": 0.2,              # Fraction trimmed from each end for "trimmed_mean"
+    "outlier_k": 3.0,         # Reject pings beyond k scaled MADs from the median
+    "min_valid": 3,           # Valid pings required to publish a sample
+}
+
+# LDR RC-timing measurement
+LDR_CONFIG = {
+    "max_charge_ms": 50,   # Readings are capped here (full darkness)
+    "discharge_ms": 10,    # Capacitor discharge time before each reading
+    # [charge time in us, light level 0.0 dark .. 1.0 bright]; recalibrate per sensor with LDRSensor.calibrate()
+    "calibration": [[200, 1.0], [50000, 0.0]],
+}
+
+# Matrix keypad scanner
+KEYPAD_CONFIG = {
+    "rows": [2, 3, 4, 5],
+    "columns": [6, 7, 8, 9],
+    "scan_hz": 100,         # Scans per second
+    "debounce_scans": 3,    # Scans a key must hold a new state before it is reported (30 ms at 100 Hz)
+}
+
+# GPIO edge detection for PIR and buttons
+EDGE_CONFIG = {
+    "debounce_ms": 50,  # Edges closer together than this are treated as contact bounce
+}
+
+# Command dispatch: per-component worker pools between on_message and the handlers.
+# policy: what to do with a command for a busy component ("queue", "reject" or "preempt")
+# coalesce: data fields keying idempotent state commands; a newer pending command for the same
+#           key replaces the older one, so only the final state of a burst is applied
+DISPATCH_CONFIG = {
+    "default": {"workers": 1, "queue_size": 16, "policy": "queue"},
+    "components": {
+        "led": {"coalesce": ["pin"]},
+        "relay": {"coalesce": ["pin"]},
+        "buzzer": {"coalesce": ["pin"]},
+        "light": {"coalesce": ["pins"]},
+        "servo": {"coalesce": ["pin"]},
+        "LCD": {"coalesce": []},
+        "stepper_motor": {"policy": "preempt"},
+        "Keypad": {"policy": "preempt"},
+    },
+}
+
+# Batch envelopes ([...] or {"batch": [...], "id": ..., "atomic": true}) received on the cmd topic
+BATCH_CONFIG = {
+    "max_commands": 64,
+    # Long-running commands are handed to their component pool instead of holding up the batch
+    "deferred_components": ["stepper_motor", "DHT11", "Ultrasonic sensor", "PIR_SENSOR",
+                            "LDR Sensor", "Button", "Keypad"],
+    # GPIO writes applied all-or-nothing when a batch is marked atomic
+    "atomic_components": ["led", "relay", "buzzer"],
+}
@@ -0,0 +1,306 @@
+import queue
+import threading
+import logging
+from contextlib import contextmanager, ExitStack
+
+# Policies for a command arriving while its component is busy
+POLICY_QUEUE = "queue"      # Wait behind the running command
+POLICY_REJECT = "reject"    # Drop the new command
+POLICY_PREEMPT = "preempt"  # Cancel the running command and run the new one
+
+_STOP = object()  # Sentinel used to shut a worker down
+
+
+class ComponentWorkerPool:
+    def __init__(self, component, handler, workers=1, queue_size=16, policy=POLICY_QUEUE, cancel=None,
+                 coalesce=None):
+        """
+        Initialize a bounded worker pool serving one component.
+
+        Args:
+            component (str): Component name served by this pool.
+            handler (callable): Handler called with the decoded command.
+            workers (int): Maximum number of worker threads.
+            queue_size (int): Maximum number of pending commands.
+            policy (str): Busy policy ('queue', 'reject' or 'preempt').
+            cancel (callable): Hook called to stop the running command on preemption.
+            coalesce (list): Data fields identifying a state target (e.g. ['pin']). When set, a pending
+                command for the same target is replaced by the newer one (latest wins).
+        """
+        if policy not in (POLICY_QUEUE, POLICY_REJECT, POLICY_PREEMPT):
+            raise ValueError(f"Unknown dispatch policy for {component}: {policy}")
+        self.component = component
+        self.handler = handler
+        self.max_workers = max(1, workers)
+        self.policy = policy
+        self.cancel = cancel
+        self.coalesce = coalesce
+        self.pending = {}  # Coalescing key -> (ticket, [newest command]) not yet picked up by a worker
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.threads = []
+        self.busy = 0
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.ticket = 0  # Sequence number of the last queued command
+        self.outstanding = set()  # Tickets queued or running
+        self.barrier = None  # While held: commands with a later ticket wait for the hold to end
+        self.holds = 0
+        self.stats = {"accepted": 0, "rejected": 0, "preempted": 0, "coalesced": 0, "completed": 0, "failed": 0}
+        self.logger = logging.getLogger(__name__)
+
+    def submit(self, data):
+        """
+        Hand a command to the pool according to its busy policy.
+
+        Args:
+            data (dict): Decoded command.
+
+        Returns:
+            bool: True if the command was accepted.
+        """
+        cancel = None
+        with self.lock:
+            saturated = self.busy >= self.max_workers
+            if saturated and self.policy == POLICY_REJECT:
+                return self._reject(data, "component busy")
+            if saturated and self.policy == POLICY_PREEMPT:
+                self._preempt()
+                cancel = self.cancel
+            accepted = self._enqueue(data)
+        # Outside the lock: the hook may block (e.g. join a thread) or call back into the pool
+        if cancel is not None:
+            try:
+                cancel()
+            except Exception as e:
+                self.logger.error(f"Failed to cancel running {self.component} command: {e}")
+        return accepted
+
+    def _enqueue(self, data):
+        key = self._coalesce_key(data)
+        entry = self.pending.get(key) if key is not None else None
+        if entry is not None and (self.barrier is None or entry[0] > self.barrier):
+            # Only the final state matters: overwrite the queued command in place,
+            # but never one queued before a hold with one that arrived during it
+            entry[1][0] = data
+            self.stats["accepted"] += 1
+            self.stats["coalesced"] += 1
+            return True
+        box = [data]
+        try:
+            self.queue.put_nowait((self.ticket + 1, key, box))
+        except queue.Full:
+            return self._reject(data, "queue full")
+        self.ticket += 1
+        self.outstanding.add(self.ticket)
+        if key is not None:
+            self.pending[key] = (self.ticket, box)
+        self.stats["accepted"] += 1
+        self._ensure_worker()
+        return True
+
+    def _coalesce_key(self, data):
+        if self.coalesce is None:
+            return None
+        params = data.get('data', {})
+        key = []
+        for field in self.coalesce:
+            value = params.get(field)
+            key.append(tuple(value) if isinstance(value, list) else value)
+        return tuple(key)
+
+    def _reject(self, data, reason):
+        self.stats["rejected"] += 1
+        self.logger.warning(f"Rejected {self.component} command ({reason}): {data}")
+        return False
+
+    def _preempt(self):
+        # Drop anything still waiting; submit() then asks the running command to stop
+        dropped = 0
+        while True:
+            try:
+                ticket, _, _ = self.queue.get_nowait()
+                self.queue.task_done()
+                self.outstanding.discard(ticket)
+                dropped += 1
+            except queue.Empty:
+                break
+        self.pending.clear()
+        self.changed.notify_all()
+        self.stats["preempted"] += 1
+        self.logger.info(f"Preempting running {self.component} command ({dropped} pending dropped)")
+
+    def _ensure_worker(self):
+        idle = len(self.threads) - self.busy
+        if idle < self.queue.qsize() and len(self.threads) < self.max_workers:
+            thread = threading.Thread(
+                target=self._run,
+                name=f"{self.component}-worker-{len(self.threads)}",
+                daemon=True,
+            )
+            self.threads.append(thread)
+            thread.start()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                self.queue.task_done()
+                return
+            ticket, key, box = item
+            with self.lock:
+                # Commands that arrived after a hold started wait until it is released
+                while self.barrier is not None and ticket > self.barrier:
+                    self.changed.wait()
+                if key is not None and self.pending.get(key, (None,))[0] == ticket:
+                    del self.pending[key]
+                data = box[0]
+                self.busy += 1
+            outcome = "failed"
+            try:
+                self.handler(data)
+                outcome = "completed"
+            except Exception as e:
+                self.logger.error(f"Error handling {self.component} command: {e}")
+            finally:
+                with self.lock:
+                    self.busy -= 1
+                    self.stats[outcome] += 1
+                    self.outstanding.discard(ticket)
+                    self.changed.notify_all()
+                self.queue.task_done()
+
+    @contextmanager
+    def hold(self):
+        """
+        Wait for the commands already submitted to finish, then hold back newer ones until the block exits.
+        Lets a batch apply its writes in order with single commands for the same component.
+        """
+        with self.lock:
+            if not self.holds:
+                self.barrier = self.ticket
+            self.holds += 1
+            barrier = self.barrier
+            while any(ticket <= barrier for ticket in self.outstanding):
+                self.changed.wait()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.holds -= 1
+                if not self.holds:
+                    self.barrier = None
+                    self.changed.notify_all()
+
+    def shutdown(self, timeout=None):
+        """
+        Stop all worker threads once pending commands are handled.
+
+        Args:
+            timeout (float): Maximum time (in seconds) to wait for each worker.
+        """
+        for _ in self.threads:
+            try:
+                self.queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                self.logger.warning(f"{self.component} queue still full, not waiting for its workers")
+                return
+        for thread in self.threads:
+            thread.join(timeout)
+
+
+class CommandDispatcher:
+    def __init__(self, handlers, config=None, cancel_hooks=None):
+        """
+        Initialize the dispatcher with per-component worker pools.
+
+        Args:
+            handlers (dict): Mapping of component name to handler.
+            config (dict): Dispatch configuration with 'default' and 'components' sections.
+            cancel_hooks (dict): Mapping of component name to a cancel hook used for preemption.
+        """
+        config = config or {}
+        self.defaults = config.get("default", {})
+        self.overrides = config.get("components", {})
+        self.logger = logging.getLogger(__name__)
+        self.pools = {}
+        cancel_hooks = cancel_hooks or {}
+        for component, handler in handlers.items():
+            self.add_component(component, handler, cancel_hooks.get(component))
+
+    def add_component(self, component, handler, cancel=None):
+        """
+        Create the worker pool for a component.
+
+        Args:
+            component (str): Component name.
+            handler (callable): Handler called with the decoded command.
+            cancel (callable): Hook used to stop the running command on preemption.
+        """
+        settings = {**self.defaults, **self.overrides.get(component, {})}
+        self.pools[component] = ComponentWorkerPool(
+            component,
+            handler,
+            workers=settings.get("workers", 1),
+            queue_size=settings.get("queue_size", 16),
+            policy=settings.get("policy", POLICY_QUEUE),
+            cancel=cancel,
+            coalesce=settings.get("coalesce"),
+        )
+
+    def submit(self, data):
+        """
+        Route a decoded command to its component pool without blocking.
+
+        Args:
+            data (dict): Decoded command containing a 'component' key.
+
+        Returns:
+            bool: True if the command was accepted.
+        """
+        component = data.get('component')
+        if not component:
+            self.logger.error("No component specified in message")
+            return False
+
+        pool = self.pools.get(component)
+        if pool is None:
+            self.logger.error(f"No handler found for component: {component}")
+            return False
+        return pool.submit(data)
+
+    @contextmanager
+    def hold(self, components):
+        """
+        Hold several component pools (see ComponentWorkerPool.hold) for the duration of the block.
+
+        Args:
+            components (iterable): Component names; unknown ones are ignored.
+        """
+        with ExitStack() as stack:
+            for component in sorted(set(components)):
+                pool = self.pools.get(component)
+                if pool is not None:
+                    stack.enter_context(pool.hold())
+            yield
+
+    def stats(self):
+        """
+        Return per-component dispatch counters.
+
+        Returns:
+            dict: Counters and queue depth keyed by component.
+        """
+        return {
+            component: {**pool.stats, "pending": pool.queue.qsize(), "busy": pool.busy}
+            for component, pool in self.pools.items()
+        }
+
+    def shutdown(self, timeout=None):
+        """
+        Stop all component pools.
+
+        Args:
+            timeout (float): Maximum time (in seconds) to wait for each worker.
+        """
+        for pool in self.pools.values():
+            pool.shutdown(timeout)
@@ -0,0 +1,295 @@
+import threading
+import time
+from hal import GPIO
+import logging
+from scheduler import get_default_scheduler
+
+# Which level changes are passed to a watch's callback
+EDGES = ("rising", "falling", "both")
+
+
+class EdgeWatch:
+    def __init__(self, monitor, pin, callback, edge, debounce, stats, on_done=None):
+        """
+        State of one watched pin. Create watches with EdgeMonitor.watch().
+
+        Args:
+            monitor (EdgeMonitor): Monitor delivering the edges.
+            pin (int): GPIO pin number.
+            callback (callable): Called as callback(pin, level, ts) for each accepted edge.
+            edge (str): 'rising', 'falling' or 'both'.
+            debounce (float): Minimum time (in seconds) between accepted edges.
+            stats (dict): Counters for the pin, kept by the monitor across watches.
+            on_done (callable): Called with the pin once the watch is removed.
+        """
+        self.monitor = monitor
+        self.pin = pin
+        self.callback = callback
+        self.edge = edge
+        self.debounce = debounce
+        self.callbacks = [lambda watch: on_done(watch.pin)] if on_done is not None else []
+        self.expires = None  # Monotonic time the watch is removed, None if it has no duration
+        self.removed = False
+        self.level = None  # Last accepted level (True = high)
+        self.last_edge = float("-inf")
+        self.settle_job = None  # Re-read scheduled after bounces inside the debounce window
+        self.expiry_job = None
+        self.lock = threading.Lock()
+        self.stats = stats
+
+    def cancel(self):
+        """
+        Remove the watch.
+        """
+        self.monitor.unwatch(self.pin, self)
+
+    def extend(self, seconds):
+        """
+        Move the watch's expiry later (or earlier, for negative seconds).
+
+        Args:
+            seconds (float): Time to add to the remaining duration.
+        """
+        self.monitor.extend(self, seconds)
+
+    def reschedule(self, interval):
+        """
+        Edges are delivered as they happen; there is no sampling interval to change.
+        """
+
+    def remaining(self):
+        """
+        Return the time left before the watch is removed.
+
+        Returns:
+            float: Seconds until expiry, or None if the watch has no duration.
+        """
+        if self.expires is None:
+            return None
+        return max(0.0, self.expires - time.monotonic())
+
+    def is_active(self):
+        """
+        Check whether the watch is still delivering edges.
+
+        Returns:
+            bool: True until the watch is removed.
+        """
+        return not self.removed
+
+    def add_done_callback(self, fn):
+        """
+        Call fn with the watch once it has been removed. Called right away if it already has.
+
+        Args:
+            fn (callable): Called with the watch.
+        """
+        with self.lock:
+            if not self.removed:
+                self.callbacks.append(fn)
+                return
+        fn(self)
+
+
+class EdgeMonitor:
+    def __init__(self, scheduler=None, debounce_ms=50):
+        """
+        Deliver GPIO level changes through RPi.GPIO edge detection instead of polling.
+
+        RPi.GPIO waits on all registered pins from a single event thread, so idle pins cost no CPU
+        and a short pulse is not missed between polls. Debouncing is done in software from edge
+        timestamps; if a pin bounces inside the window it is re-read once the window has passed,
+        so the final level is never lost.
+
+        Args:
+            scheduler (Scheduler): Scheduler for settle re-reads and watch expiry. Defaults to the shared scheduler.
+            debounce_ms (float): Default debounce window in milliseconds.
+        """
+        self.scheduler = scheduler or get_default_scheduler()
+        self.debounce_ms = debounce_ms
+        self.watches = {}
+        self.stats = {}  # pin -> counters, kept after the watch is removed
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def watch(self, pin, callback, edge="both", debounce_ms=None, pull=None, duration=None, on_done=None):
+        """
+        Start delivering edges on a pin. A watch already on the pin is replaced.
+
+        Args:
+            pin (int): GPIO pin number.
+            callback (callable): Called as callback(pin, level, ts) with the new level (True = high)
+                and the monotonic time the edge was seen. Runs on the GPIO event thread, so keep it short.
+            edge (str): 'rising', 'falling' or 'both'.
+            debounce_ms (float): Debounce window in milliseconds. Defaults to the monitor's setting.
+            pull: GPIO.PUD_UP or GPIO.PUD_DOWN to set up the pin as an input, or None if it is already set up.
+            duration (float): Remove the watch after this many seconds. None watches until unwatch().
+            on_done (callable): Called with the pin once the watch is removed.
+
+        Returns:
+            EdgeWatch: The new watch.
+        """
+        if edge not in EDGES:
+            raise ValueError(f"Unknown edge type: {edge}")
+        self.unwatch(pin)
+        debounce = (self.debounce_ms if debounce_ms is None else debounce_ms) / 1000.0
+        with self.lock:
+            stats = self.stats.setdefault(
+                pin, {"edges": 0, "bounced": 0, "events": 0, "latency_total": 0.0, "latency_max": 0.0})
+        watch = EdgeWatch(self, pin, callback, edge, debounce, stats, on_done)
+        if pull is not None:
+            GPIO.setup(pin, GPIO.IN, pull_up_down=pull)
+        watch.level = GPIO.input(pin) == GPIO.HIGH
+        with self.lock:
+            self.watches[pin] = watch
+        # Always listen for both edges so the tracked level stays correct; the edge filter applies to callbacks
+        GPIO.add_event_detect(pin, GPIO.BOTH, callback=self._on_edge)
+        if duration is not None:
+            self._expire_at(watch, time.monotonic() + duration)
+        self.logger.debug(f"Watching {edge} edges on pin {pin} (debounce {debounce * 1000:.0f} ms)")
+        return watch
+
+    def _expire_at(self, watch, expires):
+        if watch.expiry_job is not None:
+            watch.expiry_job.cancel()
+        watch.expires = expires
+        watch.expiry_job = self.scheduler.after(max(0.0, expires - time.monotonic()),
+                                                lambda: self.unwatch(watch.pin, watch), name=f"edge-expiry-{watch.pin}")
+
+    def extend(self, watch, seconds):
+        """
+        Change how long a watch has left.
+
+        Args:
+            watch (EdgeWatch): Watch to change.
+            seconds (float): Time to add to the remaining duration.
+        """
+        if watch.expires is not None and watch.is_active():
+            self._expire_at(watch, watch.expires + seconds)
+
+    def unwatch(self, pin, watch=None):
+        """
+        Stop delivering edges on a pin.
+
+        Args:
+            pin (int): GPIO pin number.
+            watch (EdgeWatch): Only remove the pin's watch if it is still this one.
+        """
+        with self.lock:
+            current = self.watches.get(pin)
+            if current is None or (watch is not None and current is not watch):
+                return
+            watch = self.watches.pop(pin)
+        try:
+            GPIO.remove_event_detect(pin)
+        except Exception as e:
+            self.logger.error(f"Failed to remove edge detection on pin {pin}: {e}")
+        for job in (watch.settle_job, watch.expiry_job):
+            if job is not None:
+                job.cancel()
+        with watch.lock:
+            watch.removed = True
+            callbacks = list(watch.callbacks)
+        self.logger.debug(f"Stopped watching pin {pin}")
+        for callback in callbacks:
+            try:
+                callback(watch)
+            except Exception as e:
+                self.logger.error(f"Error finishing edge watch on pin {pin}: {e}")
+
+    def _on_edge(self, pin):
+        # Runs on the RPi.GPIO event thread
+        now = time.monotonic()
+        with self.lock:
+            watch = self.watches.get(pin)
+        if watch is None:
+            return
+        with watch.lock:
+            watch.stats["edges"] += 1
+            if now - watch.last_edge < watch.debounce:
+                watch.stats["bounced"] += 1
+                if watch.settle_job is None:
+                    delay = watch.last_edge + watch.debounce - now
+                    watch.settle_job = self.scheduler.after(delay, lambda: self._settle(watch), name=f"edge-settle-{pin}")
+                return
+        self._accept(watch, now, edge_seen=True)
+
+    def _settle(self, watch):
+        with watch.lock:
+            watch.settle_job = None
+        self._accept(watch, time.monotonic(), edge_seen=False)
+
+    def _accept(self, watch, ts, edge_seen):
+        with watch.lock:
+            level = GPIO.input(watch.pin) == GPIO.HIGH
+            if level != watch.level:
+                levels = [level]
+            elif edge_seen:
+                # A pulse shorter than the callback delay: the pin is already back, report both transitions
+                levels = [not level, level]
+            else:
+                return  # Bounced back to the level already reported
+            watch.level = level
+            watch.last_edge = ts
+        for level in levels:
+            if watch.edge == "rising" and not level or watch.edge == "falling" and level:
+                continue
+            try:
+                watch.callback(watch.pin, level, ts)
+            except Exception as e:
+                self.logger.error(f"Error handling edge on pin {watch.pin}: {e}")
+                continue
+            latency = time.monotonic() - ts
+            with watch.lock:
+                watch.stats["events"] += 1
+                watch.stats["latency_total"] += latency
+                watch.stats["latency_max"] = max(watch.stats["latency_max"], latency)
+
+    def report(self):
+        """
+        Return edge counts and edge-to-handled latency per watched pin.
+
+        Returns:
+            dict: Pin to edges seen, edges rejected as bounce, events delivered,
+            and mean and max latency in milliseconds.
+        """
+        with self.lock:
+            snapshot = {pin: dict(stats) for pin, stats in self.stats.items()}
+        report = {}
+        for pin, stats in snapshot.items():
+            events = stats["events"]
+            report[pin] = {
+                "edges": stats["edges"],
+                "bounced": stats["bounced"],
+                "events": events,
+                "mean_ms": round(stats["latency_total"] / events * 1000, 3) if events else 0.0,
+                "max_ms": round(stats["latency_max"] * 1000, 3),
+            }
+        return report
+
+    def close(self):
+        """
+        Remove all watches.
+        """
+        with self.lock:
+            pins = list(self.watches)
+        for pin in pins:
+            self.unwatch(pin)
+
+
+_default_monitor = None
+_default_lock = threading.Lock()
+
+
+def get_default_edge_monitor():
+    """
+    Return the process-wide edge monitor, creating it on first use.
+
+    Returns:
+        EdgeMonitor: Shared monitor used when a sensor is not given one.
+    """
+    global _default_monitor
+    with _default_lock:
+        if _default_monitor is None:
+            _default_monitor = EdgeMonitor()
+        return _default_monitor
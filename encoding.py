@@ -0,0 +1,226 @@
+import json
+import struct
+import logging
+
+try:
+    import orjson  # Optional faster JSON backend
+except ImportError:
+    orjson = None
+
+try:
+    import cbor2  # Optional CBOR backend
+except ImportError:
+    cbor2 = None
+
+try:
+    import msgpack  # Optional MessagePack backend
+except ImportError:
+    msgpack = None
+
+# Fixed layouts for the struct codec, keyed by schema id.
+# Fields map to struct codes: 'd' float64, 'f' float32, '?' bool, 'B' uint8, 'h' int16, '<n>s' fixed-size string.
+STRUCT_SCHEMAS = {
+    1: {"component": "DHT11", "fields": ["ts", "temperature", "humidity"], "format": "dff"},
+    2: {"component": "Ultrasonic sensor", "fields": ["ts", "distance", "valid", "spread"], "format": "dfBf"},
+    3: {"component": "PIR_SENSOR", "fields": ["ts", "motion"], "format": "d?"},
+    4: {"component": "Button", "fields": ["ts", "pressed"], "format": "d?"},
+    5: {"component": "Keypad", "fields": ["ts", "key"], "format": "d4s"},
+}
+
+
+class JsonCodec:
+    name = "json"
+
+    def encode(self, obj):
+        if orjson is not None:
+            return orjson.dumps(obj)
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+    def decode(self, payload):
+        if orjson is not None:
+            return orjson.loads(payload)
+        return json.loads(payload)
+
+    def describe(self):
+        return {"encoding": self.name}
+
+
+class CborCodec:
+    name = "cbor"
+
+    def __init__(self):
+        if cbor2 is None:
+            raise ImportError("CBOR encoding requires the 'cbor2' package")
+
+    def encode(self, obj):
+        return cbor2.dumps(obj)
+
+    def decode(self, payload):
+        return cbor2.loads(payload)
+
+    def describe(self):
+        return {"encoding": self.name}
+
+
+class MsgpackCodec:
+    name = "msgpack"
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImportError("MessagePack encoding requires the 'msgpack' package")
+
+    def encode(self, obj):
+        return msgpack.packb(obj, use_bin_type=True)
+
+    def decode(self, payload):
+        return msgpack.unpackb(payload, raw=False)
+
+    def describe(self):
+        return {"encoding": self.name}
+
+
+class StructCodec:
+    """
+    Fixed binary layout for telemetry batches ({"streams": [...]}).
+
+    Message: b'T', version (u8), stream count (u16), then per stream:
+    schema id (u16), key (i32, -1 for none), sample count (u16) and the packed rows.
+    Streams without a registered schema use schema id 0 followed by a u32 length and a JSON body.
+    """
+
+    name = "struct"
+    VERSION = 1
+    _HEADER = struct.Struct("<cBH")
+    _STREAM = struct.Struct("<HiH")
+    _LENGTH = struct.Struct("<I")
+
+    def __init__(self, schemas=None):
+        self.schemas = schemas or STRUCT_SCHEMAS
+        self.rows = {schema_id: struct.Struct("<" + schema["format"]) for schema_id, schema in self.schemas.items()}
+        self.ids = {(schema["component"], tuple(schema["fields"])): schema_id
+                    for schema_id, schema in self.schemas.items()}
+        self.strings = {schema_id: [i for i, code in enumerate(_codes(schema["format"])) if code.endswith("s")]
+                        for schema_id, schema in self.schemas.items()}
+        self.json = JsonCodec()
+
+    def encode(self, obj):
+        streams = obj["streams"]
+        parts = [self._HEADER.pack(b"T", self.VERSION, len(streams))]
+        for stream in streams:
+            schema_id = self.ids.get((stream["component"], tuple(stream["fields"])))
+            key = stream.get("key")
+            if schema_id is None or not (key is None or isinstance(key, int)):
+                body = self.json.encode(stream)
+                parts.append(self._STREAM.pack(0, -1, 0) + self._LENGTH.pack(len(body)) + body)
+                continue
+            try:
+                parts.append(self._pack_stream(schema_id, key, stream["samples"]))
+            except struct.error:
+                # Values that don't fit the layout (e.g. a missing reading) fall back to JSON
+                body = self.json.encode(stream)
+                parts.append(self._STREAM.pack(0, -1, 0) + self._LENGTH.pack(len(body)) + body)
+        return b"".join(parts)
+
+    def _pack_stream(self, schema_id, key, samples):
+        row = self.rows[schema_id]
+        strings = self.strings[schema_id]
+        parts = [self._STREAM.pack(schema_id, -1 if key is None else key, len(samples))]
+        for sample in samples:
+            if strings:
+                sample = list(sample)
+                for i in strings:
+                    sample[i] = str(sample[i]).encode("utf-8")
+            parts.append(row.pack(*sample))
+        return b"".join(parts)
+
+    def decode(self, payload):
+        view = memoryview(payload)
+        magic, version, count = self._HEADER.unpack_from(view, 0)
+        if magic != b"T" or version != self.VERSION:
+            raise ValueError("Not a struct-encoded telemetry batch")
+        offset = self._HEADER.size
+        streams = []
+        for _ in range(count):
+            schema_id, key, samples = self._STREAM.unpack_from(view, offset)
+            offset += self._STREAM.size
+            if schema_id == 0:
+                (length,) = self._LENGTH.unpack_from(view, offset)
+                offset += self._LENGTH.size
+                streams.append(self.json.decode(bytes(view[offset:offset + length])))
+                offset += length
+                continue
+            schema, row, strings = self.schemas[schema_id], self.rows[schema_id], self.strings[schema_id]
+            rows = []
+            for _ in range(samples):
+                sample = list(row.unpack_from(view, offset))
+                offset += row.size
+                for i in strings:
+                    sample[i] = sample[i].rstrip(b"\0").decode("utf-8")
+                rows.append(sample)
+            streams.append({"component": schema["component"], "key": None if key == -1 else key,
+                            "fields": list(schema["fields"]), "samples": rows})
+        return {"streams": streams}
+
+    def describe(self):
+        return {
+            "encoding": self.name,
+            "version": self.VERSION,
+            "layout": "header <cBH (b'T', version, streams); stream <HiH (schema id, key, samples); rows per schema",
+            "schemas": {str(schema_id): schema for schema_id, schema in self.schemas.items()},
+        }
+
+
+def _codes(fmt):
+    # Split a struct format into one code per field (e.g. 'd4s?' -> ['d', '4s', '?'])
+    codes, digits = [], ""
+    for char in fmt:
+        if char.isdigit():
+            digits += char
+        else:
+            codes.append(digits + char)
+            digits = ""
+    return codes
+
+
+CODECS = {
+    "json": JsonCodec,
+    "cbor": CborCodec,
+    "msgpack": MsgpackCodec,
+    "struct": StructCodec,
+}
+
+
+def get_codec(name):
+    """
+    Create a codec by name.
+
+    Args:
+        name (str): 'json', 'cbor', 'msgpack' or 'struct'.
+
+    Returns:
+        Codec instance with encode(), decode() and describe() methods.
+
+    Raises:
+        ValueError: If the codec name is unknown.
+        ImportError: If the codec's optional package is not installed.
+    """
+    codec = CODECS.get(name)
+    if codec is None:
+        raise ValueError(f"Unknown encoding: {name}")
+    return codec()
+
+
+def publish_descriptors(client, topics, codecs):
+    """
+    Publish a retained descriptor per topic so receivers can discover its encoding and schema.
+
+    Args:
+        client: Client with a publish(topic, payload, retain) method.
+        topics (TopicLayout): Topic layout of this asset.
+        codecs (dict): Subtopic name ('cmd', 'telemetry', ...) to codec.
+    """
+    logger = logging.getLogger(__name__)
+    for name, codec in codecs.items():
+        descriptor = dict(codec.describe(), topic=getattr(topics, name))
+        client.publish(f"{topics.schema}/{name}", json.dumps(descriptor), retain=True)
+        logger.debug(f"Published {codec.name} descriptor for {name} topic")
@@ -0,0 +1,238 @@
+import logging
+
+# Decisions returned by a field filter for a new sample
+SKIP = 0
+EMIT_CURRENT = 1
+EMIT_PREVIOUS = 2
+
+
+class ChangeFilter:
+    """Report a field whenever its value changes (used for fields without a configured filter)."""
+
+    def __init__(self):
+        self.last = None
+        self.started = False
+
+    def check(self, ts, value):
+        return EMIT_CURRENT if not self.started or value != self.last else SKIP
+
+    def observe(self, ts, value):
+        pass
+
+    def commit(self, ts, value):
+        self.last = value
+        self.started = True
+
+
+class CarryFilter:
+    """Never trigger a report; the field is sent along whenever another field is reported (e.g. quality data)."""
+
+    def check(self, ts, value):
+        return SKIP
+
+    def observe(self, ts, value):
+        pass
+
+    def commit(self, ts, value):
+        pass
+
+
+class DeadbandFilter:
+    def __init__(self, absolute=None, percent=None, hysteresis=0.0):
+        """
+        Report-by-exception filter with absolute and/or percent deadbands.
+
+        Args:
+            absolute (float): Minimum absolute change to report.
+            percent (float): Minimum change as a percentage of the last reported value.
+            hysteresis (float): Extra change required when the value reverses direction.
+        """
+        self.absolute = absolute or 0.0
+        self.percent = percent or 0.0
+        self.hysteresis = hysteresis
+        self.last = None
+        self.direction = 0  # Sign of the last reported change
+
+    def check(self, ts, value):
+        if self.last is None:
+            return EMIT_CURRENT
+        change = value - self.last
+        band = max(self.absolute, abs(self.last) * self.percent / 100.0)
+        if self.direction and change * self.direction < 0:
+            band += self.hysteresis  # Reversal must clear the deadband plus hysteresis
+        return EMIT_CURRENT if abs(change) > band else SKIP
+
+    def observe(self, ts, value):
+        pass
+
+    def commit(self, ts, value):
+        if self.last is not None and value != self.last:
+            self.direction = 1 if value > self.last else -1
+        self.last = value
+
+
+class SwingingDoorFilter:
+    def __init__(self, deviation):
+        """
+        Swinging-door trending compression: keep only the points needed to rebuild the signal
+        by linear interpolation within +/- deviation.
+
+        Args:
+            deviation (float): Maximum allowed interpolation error.
+        """
+        self.deviation = deviation
+        self.anchor = None  # (ts, value) of the last reported point
+        self.upper = float("inf")  # Smallest upper door slope seen since the anchor
+        self.lower = float("-inf")  # Largest lower door slope seen since the anchor
+
+    def _slopes(self, ts, value):
+        dt = ts - self.anchor[0]
+        if dt <= 0:
+            return None
+        return ((value + self.deviation - self.anchor[1]) / dt,
+                (value - self.deviation - self.anchor[1]) / dt)
+
+    def check(self, ts, value):
+        if self.anchor is None:
+            return EMIT_CURRENT
+        slopes = self._slopes(ts, value)
+        if slopes is None:
+            return SKIP
+        upper, lower = min(self.upper, slopes[0]), max(self.lower, slopes[1])
+        # Doors opened: the previous point is the last one the line through the anchor can reach
+        return EMIT_PREVIOUS if lower > upper else SKIP
+
+    def observe(self, ts, value):
+        slopes = self._slopes(ts, value)
+        if slopes is not None:
+            self.upper = min(self.upper, slopes[0])
+            self.lower = max(self.lower, slopes[1])
+
+    def commit(self, ts, value):
+        self.anchor = (ts, value)
+        self.upper = float("inf")
+        self.lower = float("-inf")
+
+
+def build_field_filter(rule):
+    """
+    Create a field filter from its configuration.
+
+    Args:
+        rule (dict): Filter settings with a 'type' of 'deadband', 'swinging_door' or 'carry'.
+
+    Returns:
+        Field filter instance.
+    """
+    kind = rule.get("type", "deadband")
+    if kind == "deadband":
+        return DeadbandFilter(rule.get("absolute"), rule.get("percent"), rule.get("hysteresis", 0.0))
+    if kind == "swinging_door":
+        return SwingingDoorFilter(rule["deviation"])
+    if kind == "carry":
+        return CarryFilter()
+    raise ValueError(f"Unknown filter type: {kind}")
+
+
+class StreamFilter:
+    def __init__(self, fields, rules=None, max_silence=None):
+        """
+        Filter a multi-field sensor stream. A sample is reported if any field's filter asks for it.
+
+        Args:
+            fields (tuple): Field names, in sample order.
+            rules (dict): Field name to filter settings. Fields without a rule are reported on change.
+            max_silence (float): Heartbeat: report a sample if nothing was reported for this long (seconds).
+        """
+        rules = rules or {}
+        self.filters = [build_field_filter(rules[name]) if name in rules else ChangeFilter() for name in fields]
+        self.max_silence = max_silence
+        self.previous = None  # (ts, values) of the last sample seen
+        self.last_emit = None
+
+    def process(self, ts, values):
+        """
+        Offer a new sample and return the samples that should be reported.
+
+        Args:
+            ts (float): Sample timestamp in seconds.
+            values (tuple): Field values, in the order of the stream's fields.
+
+        Returns:
+            list: (ts, values) tuples to report, oldest first.
+        """
+        decisions = [f.check(ts, v) for f, v in zip(self.filters, values)]
+        emit_current = EMIT_CURRENT in decisions or (
+            self.max_silence is not None and self.last_emit is not None and ts - self.last_emit >= self.max_silence
+        )
+        emitted = []
+        if EMIT_PREVIOUS in decisions and self.previous is not None:
+            emitted.append(self.previous)
+            self._commit(*self.previous)
+        if emit_current:
+            emitted.append((ts, values))
+            self._commit(ts, values)
+        else:
+            for f, v in zip(self.filters, values):
+                f.observe(ts, v)
+        self.previous = (ts, values)
+        return emitted
+
+    def _commit(self, ts, values):
+        for f, v in zip(self.filters, values):
+            f.commit(ts, v)
+        self.last_emit = ts
+
+
+class FilterBank:
+    def __init__(self, config=None):
+        """
+        Hold one StreamFilter per (component, key) stream, built from per-component settings.
+
+        Args:
+            config (dict): Component name to {'fields': {field: rule}, 'max_silence': seconds}.
+        """
+        self.config = config or {}
+        self.streams = {}
+        self.stats = {}  # component -> [samples offered, samples reported]
+        self.logger = logging.getLogger(__name__)
+
+    def process(self, component, key, fields, ts, values):
+        """
+        Filter one sample of a stream.
+
+        Args:
+            component (str): Component that produced the sample.
+            key: Sensor instance key (usually its pin).
+            fields (tuple): Field names.
+            ts (float): Sample timestamp in seconds.
+            values (tuple): Field values.
+
+        Returns:
+            list: (ts, values) tuples to report.
+        """
+        settings = self.config.get(component)
+        if settings is None:
+            return [(ts, values)]
+        stream = self.streams.get((component, key, fields))
+        if stream is None:
+            stream = self.streams[(component, key, fields)] = StreamFilter(
+                fields, settings.get("fields"), settings.get("max_silence"))
+        emitted = stream.process(ts, values)
+        counts = self.stats.setdefault(component, [0, 0])
+        counts[0] += 1
+        counts[1] += len(emitted)
+        return emitted
+
+    def report(self):
+        """
+        Return how much traffic each component's filter let through.
+
+        Returns:
+            dict: Offered and reported sample counts and the reported fraction per component.
+        """
+        return {
+            component: {"offered": offered, "reported": reported,
+                        "ratio": round(reported / offered, 3) if offered else 0.0}
+            for component, (offered, reported) in self.stats.items()
+        }
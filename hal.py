@@ -0,0 +1,135 @@
+"""
+Hardware abstraction layer. Modules import GPIO, SMBus and DHT11 from here instead of RPi.GPIO, smbus and dht11:
+
+    from hal import GPIO
+
+The backend is chosen with the IIOT_HAL environment variable:
+    rpi   the real RPi.GPIO, smbus and dht11 modules (fails if they are missing)
+    sim   the simulator in simulator.py, which records every operation in hal.recorder
+    auto  (default) the real modules when they can be imported, otherwise the simulator
+
+Hardware operations are counted per operation in the default metrics registry (hw_ops_total):
+calls to the real modules by a thin counting wrapper, simulated ones from hal.recorder.
+"""
+import os
+import types
+import logging
+from simulator import OpRecorder, SimGPIO, SimSMBus, HD44780, SimDHT11, DHT11Model
+from metrics import get_default_registry
+
+BACKEND = os.environ.get("IIOT_HAL", "auto")
+if BACKEND not in ("rpi", "sim", "auto"):
+    raise ValueError(f"Unknown IIOT_HAL backend: {BACKEND}")
+
+# Operation log of the simulated backends (stays empty on real hardware)
+recorder = OpRecorder()
+
+GPIO = None
+SMBus = None
+DHT11 = None
+if BACKEND != "sim":
+    try:
+        import RPi.GPIO as GPIO
+    except (ImportError, RuntimeError):  # RuntimeError: RPi.GPIO installed but not running on a Pi
+        if BACKEND == "rpi":
+            raise
+    try:
+        from smbus import SMBus
+    except ImportError:
+        if BACKEND == "rpi":
+            raise
+    try:
+        from dht11 import DHT11
+    except (ImportError, RuntimeError):  # The dht11 package imports RPi.GPIO
+        if BACKEND == "rpi":
+            raise
+
+# Operations counted on the real backends, named like the simulator's recorder entries
+GPIO_OPS = {"setmode": "gpio.setmode", "setwarnings": "gpio.setwarnings", "setup": "gpio.setup",
+            "output": "gpio.output", "input": "gpio.input", "cleanup": "gpio.cleanup", "PWM": "gpio.pwm",
+            "add_event_detect": "gpio.add_event_detect", "remove_event_detect": "gpio.remove_event_detect",
+            "wait_for_edge": "gpio.wait_for_edge"}
+PWM_OPS = {"start": "gpio.pwm_start", "ChangeDutyCycle": "gpio.pwm_duty", "ChangeFrequency": "gpio.pwm_frequency",
+           "stop": "gpio.pwm_stop"}
+I2C_OPS = {name: f"i2c.{name}" for name in ("write_byte", "write_byte_data", "write_block_data", "read_byte",
+                                            "read_byte_data", "read_block_data")}
+DHT11_OPS = {"read": "dht11.read"}
+_counters = {}  # Operation name -> Counter
+
+
+def _counted(fn, op, wrap=None):
+    counter = _counters.get(op)
+    if counter is None:
+        counter = _counters[op] = get_default_registry().counter("hw_ops_total", "GPIO, I2C and DHT11 operations", op=op)
+
+    def call(*args, **kwargs):
+        counter.inc()
+        result = fn(*args, **kwargs)
+        return wrap(result) if wrap is not None else result
+    return call
+
+
+class _Counted:
+    def __init__(self, target, ops, wraps=None):
+        """
+        Pass attribute access through to a hardware module or object, counting calls to the listed operations.
+
+        Args:
+            target: RPi.GPIO, a PWM channel or an SMBus instance.
+            ops (dict): Method name to operation name.
+            wraps (dict): Method name to a function applied to its result (e.g. to count a PWM channel's calls).
+        """
+        self._target = target
+        self._cache = isinstance(target, types.ModuleType)  # Module constants never change, so cache them
+        for name, op in ops.items():
+            fn = getattr(target, name, None)
+            if fn is not None:
+                setattr(self, name, _counted(fn, op, (wraps or {}).get(name)))
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if self._cache:
+            setattr(self, name, value)
+        return value
+
+
+SIMULATED = GPIO is None
+I2C_SIMULATED = SMBus is None
+DHT11_SIMULATED = DHT11 is None
+if GPIO is None:
+    GPIO = SimGPIO(recorder)
+else:
+    GPIO = _Counted(GPIO, GPIO_OPS, {"PWM": lambda channel: _Counted(channel, PWM_OPS)})
+if SMBus is None:
+    SimSMBus.recorder = recorder
+    SMBus = SimSMBus
+    # A character LCD answers at lcd.LCD's default address, so the display can be driven without hardware
+    SimSMBus.attach(0x27, HD44780())
+else:
+    _SMBus = SMBus
+
+    def SMBus(*args, **kwargs):
+        return _Counted(_SMBus(*args, **kwargs), I2C_OPS)
+if DHT11 is None:
+    SimDHT11.recorder = recorder
+    DHT11 = SimDHT11
+    # Any pin without its own model answers with room conditions, so DHT11 sessions report without hardware
+    SimDHT11.default = DHT11Model(temperature=25.0, humidity=60.0, noise=1.0)
+else:
+    _DHT11 = DHT11
+
+    def DHT11(*args, **kwargs):
+        return _Counted(_DHT11(*args, **kwargs), DHT11_OPS)
+
+if SIMULATED:
+    logging.getLogger(__name__).info(f"Using simulated GPIO and I2C (IIOT_HAL={BACKEND})")
+
+
+def _simulated_ops():
+    return [("hw_ops_total", "counter", {"op": op}, count) for op, count in recorder.counts().items()
+            if op.startswith("gpio.") and SIMULATED or op.startswith("i2c.") and I2C_SIMULATED
+            or op.startswith("dht11.") and DHT11_SIMULATED]
+
+
+if SIMULATED or I2C_SIMULATED or DHT11_SIMULATED:
+    get_default_registry().add_collector(_simulated_ops, {"hw_ops_total": "GPIO, I2C and DHT11 operations"})
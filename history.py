@@ -0,0 +1,288 @@
+import math
+import threading
+import time
+import logging
+from scheduler import get_default_scheduler
+
+try:
+    import numpy as np  # Optional; needed for the history buffers
+except ImportError:
+    np = None
+
+# Statistics computed per field over a window
+STATS = ("mean", "min", "max", "std", "ewma")
+
+
+class RingBuffer:
+    def __init__(self, fields, capacity=600, alpha=0.2):
+        """
+        Fixed-size ring of recent samples for one sensor stream, preallocated as a NumPy array
+        with one row per sample: [ts, field values...]. The oldest sample is overwritten when full.
+
+        Args:
+            fields (tuple): Numeric field names.
+            capacity (int): Number of samples kept.
+            alpha (float): EWMA smoothing factor (weight of the newest sample).
+        """
+        if np is None:
+            raise ImportError("History buffers require the 'numpy' package")
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        self.alpha = alpha
+        self.data = np.full((capacity, 1 + len(self.fields)), np.nan)
+        self.head = 0  # Row the next sample is written to
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def append(self, ts, values):
+        """
+        Add a sample, overwriting the oldest one when full.
+
+        Args:
+            ts (float): Sample timestamp (epoch seconds).
+            values (iterable): One value per field; None is stored as NaN.
+        """
+        with self.lock:
+            row = self.data[self.head]
+            row[0] = ts
+            row[1:] = [np.nan if value is None else value for value in values]
+            self.head = (self.head + 1) % self.capacity
+            self.size = min(self.size + 1, self.capacity)
+
+    def _ordered(self):
+        # Oldest first; a copy, so callers can use it without holding the lock
+        if self.size < self.capacity:
+            return self.data[:self.size].copy()
+        return np.concatenate((self.data[self.head:], self.data[:self.head]))
+
+    def latest(self, count=None):
+        """
+        Return the most recent samples, oldest first.
+
+        Args:
+            count (int): Number of samples. None returns all of them.
+
+        Returns:
+            numpy.ndarray: Array of shape (n, 1 + len(fields)), timestamps in column 0.
+        """
+        with self.lock:
+            rows = self._ordered()
+        return rows if count is None else rows[-count:]
+
+    def window(self, seconds, now=None):
+        """
+        Return the samples from the last few seconds, oldest first.
+
+        Args:
+            seconds (float): Window length.
+            now (float): End of the window (epoch seconds). Defaults to now.
+
+        Returns:
+            numpy.ndarray: Array of shape (n, 1 + len(fields)).
+        """
+        with self.lock:
+            rows = self._ordered()
+        start = (time.time() if now is None else now) - seconds
+        return rows[np.searchsorted(rows[:, 0], start):]
+
+    def stats(self, seconds=None, count=None):
+        """
+        Compute mean, min, max, standard deviation and EWMA of every field over a window.
+
+        Args:
+            seconds (float): Only use samples from the last this many seconds.
+            count (int): Only use the last this many samples. Used when seconds is None; None uses all.
+
+        Returns:
+            dict: Field name to {'count', 'mean', 'min', 'max', 'std', 'ewma'}; statistics are None
+            for fields without samples in the window.
+        """
+        rows = self.window(seconds) if seconds is not None else self.latest(count)
+        return summarize(rows[:, 1:], self.fields, self.alpha)
+
+
+def summarize(values, fields, alpha):
+    """
+    Vectorized window statistics over a (samples x fields) array that may contain NaN gaps.
+
+    Args:
+        values (numpy.ndarray): Samples, oldest first.
+        fields (tuple): Column names.
+        alpha (float): EWMA smoothing factor.
+
+    Returns:
+        dict: Field name to {'count', 'mean', 'min', 'max', 'std', 'ewma'}.
+    """
+    valid = ~np.isnan(values)
+    counts = valid.sum(axis=0)
+    n = len(values)
+    result = {field: {"count": int(count), **dict.fromkeys(STATS)} for field, count in zip(fields, counts)}
+    if not counts.any():
+        return result
+
+    filled = np.where(valid, values, 0.0)
+    safe = np.maximum(counts, 1)
+    mean = filled.sum(axis=0) / safe
+    std = np.sqrt((np.where(valid, values - mean, 0.0) ** 2).sum(axis=0) / safe)
+    low = np.where(valid, values, np.inf).min(axis=0)
+    high = np.where(valid, values, -np.inf).max(axis=0)
+
+    # EWMA seeded with the first sample: weights alpha * (1 - alpha)^age, the oldest sample keeping (1 - alpha)^(n-1).
+    # Gaps are skipped by renormalizing over the weights of the samples present.
+    weights = alpha * (1 - alpha) ** np.arange(n - 1, -1, -1, dtype=float)
+    weights[0] = (1 - alpha) ** (n - 1)
+    present = valid * weights[:, None]
+    ewma = (filled * present).sum(axis=0) / np.maximum(present.sum(axis=0), np.finfo(float).tiny)
+
+    for i, field in enumerate(fields):
+        if counts[i]:
+            result[field].update(mean=float(mean[i]), min=float(low[i]), max=float(high[i]),
+                                 std=float(std[i]), ewma=float(ewma[i]))
+    return result
+
+
+def _numeric(value):
+    return isinstance(value, (int, float)) and not (isinstance(value, float) and math.isnan(value))
+
+
+class HistoryStore:
+    def __init__(self, capacity=600, alpha=0.2, components=None):
+        """
+        One RingBuffer per sensor stream, created on the first sample, so local consumers can read
+        recent history and window statistics with bounded memory.
+
+        Args:
+            capacity (int): Samples kept per stream.
+            alpha (float): EWMA smoothing factor.
+            components (iterable): Components to keep history for. None keeps every component.
+        """
+        if np is None:
+            raise ImportError("History buffers require the 'numpy' package")
+        self.capacity = capacity
+        self.alpha = alpha
+        self.components = set(components) if components is not None else None
+        self.buffers = {}  # (component, key) -> RingBuffer
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def record(self, component, key, data, ts=None):
+        """
+        Add a sample to its stream's buffer. Non-numeric fields are ignored; booleans are stored as 0/1.
+
+        Args:
+            component (str): Component that produced the sample.
+            key: Sensor instance key (usually its pin).
+            data (dict): Field name to value mapping.
+            ts (float): Sample timestamp (epoch seconds). Defaults to now.
+        """
+        if self.components is not None and component not in self.components:
+            return
+        buffer = self.buffers.get((component, key))
+        if buffer is None:
+            # None is a missed reading of a numeric field, so it does not exclude the field
+            fields = tuple(field for field, value in data.items() if value is None or _numeric(value))
+            if not fields:
+                return
+            with self.lock:
+                buffer = self.buffers.setdefault((component, key), RingBuffer(fields, self.capacity, self.alpha))
+        values = [data.get(field) for field in buffer.fields]
+        buffer.append(time.time() if ts is None else ts, [value if _numeric(value) else None for value in values])
+
+    def get(self, component, key=None):
+        """
+        Return a stream's buffer.
+
+        Args:
+            component (str): Component name.
+            key: Sensor instance key.
+
+        Returns:
+            RingBuffer: The buffer, or None if the stream has no samples yet.
+        """
+        return self.buffers.get((component, key))
+
+    def streams(self, component=None):
+        """
+        List the streams with history.
+
+        Args:
+            component (str): Only list this component's streams.
+
+        Returns:
+            list: (component, key) tuples.
+        """
+        with self.lock:
+            return [stream for stream in self.buffers if component is None or stream[0] == component]
+
+    def report(self):
+        """
+        Return buffer fill and memory use.
+
+        Returns:
+            dict: Stream count, samples held and bytes allocated.
+        """
+        with self.lock:
+            buffers = list(self.buffers.values())
+        return {
+            "streams": len(buffers),
+            "samples": sum(buffer.size for buffer in buffers),
+            "bytes": sum(buffer.data.nbytes for buffer in buffers),
+        }
+
+
+class SummaryPublisher:
+    def __init__(self, history, telemetry, windows, scheduler=None):
+        """
+        Publish window statistics in place of raw samples. Each window, every stream of a summarized
+        component is reduced to one sample with '<field>_<stat>' values, submitted as '<component> summary'.
+
+        Args:
+            history (HistoryStore): Source of the samples.
+            telemetry (TelemetryPublisher): Publisher the summaries are submitted to.
+            windows (dict): Component name to window length in seconds.
+            scheduler (Scheduler): Scheduler running the windows. Defaults to the shared scheduler.
+        """
+        self.history = history
+        self.telemetry = telemetry
+        self.windows = dict(windows)
+        self.scheduler = scheduler or get_default_scheduler()
+        self.jobs = []
+        self.logger = logging.getLogger(__name__)
+
+    def start(self):
+        """
+        Start one summary job per component.
+        """
+        for component, window in self.windows.items():
+            job = self.scheduler.every(window, lambda c=component, w=window: self.publish(c, w),
+                                       name=f"summary-{component}")
+            self.jobs.append(job)
+
+    def publish(self, component, window):
+        """
+        Submit the statistics of the last window for each of a component's streams.
+
+        Args:
+            component (str): Component name.
+            window (float): Window length in seconds.
+        """
+        now = time.time()
+        for _, key in self.history.streams(component):
+            buffer = self.history.get(component, key)
+            rows = buffer.window(window, now)
+            if not len(rows):
+                continue
+            summary = {"count": len(rows)}
+            for field, stats in summarize(rows[:, 1:], buffer.fields, buffer.alpha).items():
+                for stat in STATS:
+                    value = stats[stat]
+                    summary[f"{field}_{stat}"] = round(value, 3) if value is not None else None
+            self.telemetry.submit(f"{component} summary", summary, key=key, ts=round(now, 3))
+
+    def stop(self):
+        """
+        Cancel the summary jobs.
+        """
+        for job in self.jobs:
+            job.cancel()
+        self.jobs = []
@@ -88,11 +88,11 @@
 # if __name__ == "__main__":
 #     main()
 
-import RPi.GPIO as GPIO
-import time
+from hal import GPIO
 import json
 import logging
-from keypad import keypad  # Import the keypad class to detect key presses
+from keypad_scanner import KeypadScanner
+from edges import get_default_edge_monitor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -107,62 +107,68 @@ ROW_PINS = [2, 3, 4, 5]  # Replace with your GPIO pin numbers
 COL_PINS = [6, 7, 8, 9]  # Replace with your GPIO pin numbers
 
 # Function to handle button logic
-def handle_button(client, topic, pin, duration):
+def handle_button(client, topic, pin, duration, telemetry=None, edges=None):
     """
-    Handle button presses and publish events to MQTT.
+    Watch a button and publish press/release events to MQTT. Returns immediately;
+    events are delivered by edge detection.
     
     Args:
         client (mqtt.Client): MQTT client for publishing events.
         topic (str): MQTT topic to publish events to.
         pin (int): GPIO pin number for the button.
         duration (int): Duration (in seconds) to monitor the button.
+        telemetry (TelemetryPublisher): Shared publisher for events. If None, events are published directly.
+        edges (EdgeMonitor): Edge detection backend. Defaults to the shared edge monitor.
+
+    Returns:
+        EdgeWatch: The edge watch on the button pin, or None if the button could not be set up.
     """
+    def on_edge(pin, level, ts):
+        # Pulled up: low is pressed, high is released
+        publish_message(client, topic, pin, not level, telemetry)
+
     try:
-        GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)  # Setup the button pin
-        last_state = GPIO.input(pin)
+        watch = (edges or get_default_edge_monitor()).watch(pin, on_edge, pull=GPIO.PUD_UP, duration=duration)
         logger.info(f"Listening for button presses on pin {pin} for {duration} seconds")
-
-        start_time = time.time()
-        while time.time() - start_time < duration:
-            current_state = GPIO.input(pin)
-            if current_state == GPIO.LOW and last_state == GPIO.HIGH:  # Button pressed
-                publish_message(client, topic, pin, True)  # Send pressed event
-                time.sleep(0.2)  # Debounce delay
-            elif current_state == GPIO.HIGH and last_state == GPIO.LOW:  # Button released
-                publish_message(client, topic, pin, False)  # Send released event
-                time.sleep(0.2)  # Debounce delay
-            last_state = current_state
-            time.sleep(0.1)  # Polling delay
+        return watch
     except Exception as e:
         logger.error(f"Failed to handle button on pin {pin}: {e}")
+        return None
 
 # Function to handle keypad logic
-def handle_keypad(client, topic, duration):
+def handle_keypad(client, topic, duration, telemetry=None, scanner=None):
     """
-    Handle keypad presses and publish events to MQTT.
+    Scan the keypad and publish keypress events to MQTT for the given duration.
+    Blocks while consuming the scanner's event queue; scanner.stop() ends it early.
     
     Args:
         client (mqtt.Client): MQTT client for publishing events.
         topic (str): MQTT topic to publish events to.
         duration (int): Duration (in seconds) to monitor the keypad.
+        telemetry (TelemetryPublisher): Shared publisher for events. If None, events are published directly.
+        scanner (KeypadScanner): Keypad scanner to use. Defaults to one on ROW_PINS/COL_PINS.
+
+    Returns:
+        int: Number of key presses published.
     """
+    published = 0
     try:
-        kp = keypad(ROW_PINS, COL_PINS)  # Initialize Keypad with row and column pins
+        scanner = scanner or KeypadScanner(ROW_PINS, COL_PINS)
+        scanner.start(duration)
         logger.info(f"Handling keypad for {duration} seconds")
-
-        start_time = time.time()
-        while time.time() - start_time < duration:
-            key = kp.getKey()  # Get the pressed key
-
-            if key is not None:  # If a key was pressed
-                logger.info(f"Key pressed: {key}")
-                publish_key_event(client, topic, key)  # Publish the keypress event
-                time.sleep(0.2)  # Debounce delay
-            time.sleep(0.1)  # Polling delay
+        while True:
+            event = scanner.events.get()
+            if event is None:  # Scanning finished or was stopped
+                break
+            if event["event"] == "press":
+                logger.info(f"Key pressed: {event['key']}")
+                publish_key_event(client, topic, event["key"], telemetry)  # Publish the keypress event
+                published += 1
     except Exception as e:
         logger.error(f"Failed to handle keypad: {e}")
+    return published
 
-def publish_message(client, topic, pin, pressed_state):
+def publish_message(client, topic, pin, pressed_state, telemetry=None):
     """
     Publish button press/release events to MQTT.
     
@@ -171,8 +177,12 @@ def publish_message(client, topic, pin, pressed_state):
         topic (str): MQTT topic to publish events to.
         pin (int): GPIO pin number for the button.
         pressed_state (bool): True if pressed, False if released.
+        telemetry (TelemetryPublisher): Shared publisher for events. If None, the event is published directly.
     """
     try:
+        if telemetry is not None:
+            telemetry.submit("Button", {"pressed": pressed_state}, key=pin)
+            return
         payload = {
             "component": "Button",
             "data": {
@@ -185,7 +195,7 @@ def publish_message(client, topic, pin, pressed_state):
     except Exception as e:
         logger.error(f"Failed to publish button event: {e}")
 
-def publish_key_event(client, topic, key):
+def publish_key_event(client, topic, key, telemetry=None):
     """
     Publish keypad keypress events to MQTT.
     
@@ -193,8 +203,12 @@ def publish_key_event(client, topic, key):
         client (mqtt.Client): MQTT client for publishing events.
         topic (str): MQTT topic to publish events to.
         key (str): The key that was pressed.
+        telemetry (TelemetryPublisher): Shared publisher for events. If None, the event is published directly.
     """
     try:
+        if telemetry is not None:
+            telemetry.submit("Keypad", {"key": key})
+            return
         payload = {
             "component": "Keypad",
             "data": {
@@ -1,4 +1,4 @@
-import RPi.GPIO as GPIO
+from hal import GPIO
  
 class keypad():
     def __init__(self, columnCount = 4, row=[2, 3, 4, 5], column=[6, 7, 8, 9]):
@@ -0,0 +1,218 @@
+import queue
+import threading
+import time
+from hal import GPIO
+import logging
+from scheduler import get_default_scheduler
+
+# Default 4x4 matrix layout
+KEYMAP_4X4 = [
+    [1, 2, 3, "A"],
+    [4, 5, 6, "B"],
+    [7, 8, 9, "C"],
+    ["*", 0, "#", "D"],
+]
+
+# Per-key debounce states
+RELEASED = 0
+PRESS_PENDING = 1
+PRESSED = 2
+RELEASE_PENDING = 3
+
+
+class KeypadScanner:
+    def __init__(self, rows, columns, keymap=None, scan_hz=100, debounce_scans=3, queue_size=64, scheduler=None):
+        """
+        Matrix keypad scanner. Pins are configured once: rows are pulled-up inputs and columns are outputs
+        held low while idle, so an idle scan is one read per row. Only when a row reads low are the
+        column outputs cycled, and only the rows that read low are scanned.
+
+        Args:
+            rows (list): Row GPIO pins.
+            columns (list): Column GPIO pins.
+            keymap (list): Key labels, one list per row. Defaults to the 4x4 layout.
+            scan_hz (float): Scans per second.
+            debounce_scans (int): Consecutive scans a key must hold a new state before it is reported.
+            queue_size (int): Maximum pending events; the oldest are dropped when full.
+            scheduler (Scheduler): Scheduler running the scans. Defaults to the shared scheduler.
+        """
+        self.rows = list(rows)
+        self.columns = list(columns)
+        self.keymap = keymap or KEYMAP_4X4
+        self.scan_interval = 1.0 / scan_hz
+        self.debounce_scans = debounce_scans
+        self.scheduler = scheduler or get_default_scheduler()
+        self.events = queue.Queue(maxsize=queue_size)
+        self.states = [[RELEASED] * len(self.columns) for _ in self.rows]
+        self.counts = [[0] * len(self.columns) for _ in self.rows]
+        self.unsettled = 0  # Keys not in RELEASED; the full matrix is scanned while any exist
+        self.configured = False
+        self.job = None
+        self.lock = threading.Lock()
+        self.stats = {"scans": 0, "full_scans": 0, "ghosted": 0, "dropped": 0}
+        self.logger = logging.getLogger(__name__)
+
+    def configure(self):
+        """
+        Set up the pins once: rows as pulled-up inputs, columns as outputs driven low.
+        """
+        GPIO.setmode(GPIO.BCM)
+        for row in self.rows:
+            GPIO.setup(row, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+        for column in self.columns:
+            GPIO.setup(column, GPIO.OUT, initial=GPIO.LOW)
+        self.configured = True
+
+    def start(self, duration=None):
+        """
+        Start scanning at the configured rate. A scan session already running is replaced.
+
+        Args:
+            duration (float): Stop after this many seconds. None scans until stop().
+
+        Returns:
+            Job: The scheduled scan job.
+        """
+        if not self.configured:
+            self.configure()
+        previous, self.job = self.job, None
+        if previous is not None:
+            previous.cancel()
+        while not self.events.empty():
+            self.events.get_nowait()  # Events left over from an earlier session
+        self.job = self.scheduler.every(self.scan_interval, self.scan, duration=duration,
+                                        name="keypad-scan", on_done=self._scanning_done)
+        return self.job
+
+    def stop(self):
+        """
+        Stop scanning. Consumers waiting on the event queue receive None.
+        """
+        if self.job is not None:
+            self.job.cancel()
+
+    def _scanning_done(self, job):
+        if job is self.job:
+            self._put(None)  # Wake consumers
+
+    def read_matrix(self):
+        """
+        Read which keys are closed.
+
+        Returns:
+            list: One list of booleans per row, True where the key is pressed, or None if the
+            keypad is idle and no key is waiting to settle.
+        """
+        # Columns are held low, so a pressed key pulls its row low; rows that stay high have no key down
+        active_rows = [i for i, row in enumerate(self.rows) if GPIO.input(row) == GPIO.LOW]
+        if not active_rows and not self.unsettled:
+            return None
+        pressed = [[False] * len(self.columns) for _ in self.rows]
+        if not active_rows:
+            return pressed  # Everything released; let pending keys settle
+        self.stats["full_scans"] += 1
+        # Walk the single low column across the matrix, reading only the active rows
+        for column in self.columns[1:]:
+            GPIO.output(column, GPIO.HIGH)
+        for j, column in enumerate(self.columns):
+            if j:
+                GPIO.output(self.columns[j - 1], GPIO.HIGH)
+                GPIO.output(column, GPIO.LOW)
+            for i in active_rows:
+                if GPIO.input(self.rows[i]) == GPIO.LOW:
+                    pressed[i][j] = True
+        for column in self.columns[:-1]:
+            GPIO.output(column, GPIO.LOW)
+        return pressed
+
+    def _ghosted(self, pressed):
+        # Without diodes, three keys on the corners of a rectangle make the fourth corner read pressed.
+        # Any two rows sharing two or more pressed columns are ambiguous.
+        row_sets = [frozenset(j for j, down in enumerate(row) if down) for row in pressed]
+        for a in range(len(row_sets)):
+            for b in range(a + 1, len(row_sets)):
+                if len(row_sets[a] & row_sets[b]) >= 2:
+                    return True
+        return False
+
+    def scan(self):
+        """
+        Run one scan and advance every key's debounce state machine, queueing press and release events.
+        """
+        with self.lock:
+            self.stats["scans"] += 1
+            pressed = self.read_matrix()
+            if pressed is None:
+                return
+            if self._ghosted(pressed):
+                self.stats["ghosted"] += 1
+                return  # Hold all key states until the ambiguous combination is released
+            now = time.monotonic()
+            for i, row in enumerate(pressed):
+                for j, down in enumerate(row):
+                    self._step(i, j, down, now)
+
+    def _step(self, i, j, down, now):
+        state = self.states[i][j]
+        if state == RELEASED:
+            if down:
+                self.states[i][j], self.counts[i][j] = PRESS_PENDING, 1
+                self.unsettled += 1
+                self._settle_if_stable(i, j, PRESSED, "press", now)
+        elif state == PRESS_PENDING:
+            if not down:
+                self.states[i][j] = RELEASED
+                self.unsettled -= 1
+            else:
+                self.counts[i][j] += 1
+                self._settle_if_stable(i, j, PRESSED, "press", now)
+        elif state == PRESSED:
+            if not down:
+                self.states[i][j], self.counts[i][j] = RELEASE_PENDING, 1
+                self._settle_if_stable(i, j, RELEASED, "release", now)
+        elif state == RELEASE_PENDING:
+            if down:
+                self.states[i][j] = PRESSED
+            else:
+                self.counts[i][j] += 1
+                self._settle_if_stable(i, j, RELEASED, "release", now)
+
+    def _settle_if_stable(self, i, j, target, event, now):
+        if self.counts[i][j] < self.debounce_scans:
+            return
+        self.states[i][j] = target
+        if target == RELEASED:
+            self.unsettled -= 1
+        self._put({"key": self.keymap[i][j], "event": event, "ts": now})
+
+    def _put(self, event):
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            try:
+                self.events.get_nowait()  # Drop the oldest event
+                self.stats["dropped"] += 1
+            except queue.Empty:
+                pass
+            self.events.put_nowait(event)
+
+    def pressed_keys(self):
+        """
+        Return the keys currently held down (debounced).
+
+        Returns:
+            list: Key labels.
+        """
+        with self.lock:
+            return [self.keymap[i][j] for i, row in enumerate(self.states)
+                    for j, state in enumerate(row) if state in (PRESSED, RELEASE_PENDING)]
+
+    def report(self):
+        """
+        Return scan statistics.
+
+        Returns:
+            dict: Scans run, scans that cycled the columns, scans skipped as ghosted and events dropped.
+        """
+        with self.lock:
+            return dict(self.stats)
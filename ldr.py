@@ -1,32 +1,55 @@
+import math
+import threading
 import time
-import RPi.GPIO as GPIO
+from hal import GPIO
 import logging
+from scheduler import get_default_scheduler
 
 class LDRSensor:
-    def __init__(self):
+    def __init__(self, scheduler=None, max_charge_ms=50, discharge_ms=10, calibration=None, telemetry=None):
         """
         Initialize the LDR sensor.
+
+        Args:
+            scheduler (Scheduler): Scheduler running the periodic readings. Defaults to the shared scheduler.
+            max_charge_ms (int): Longest charge time measured; darker readings are capped here.
+            discharge_ms (float): Time (in milliseconds) the capacitor is shorted before each reading.
+            calibration (list): [charge_us, level] points mapping charge time to a light level
+                (0.0 dark to 1.0 bright). Defaults to a two-point log curve over the measurable range.
+            telemetry (TelemetryPublisher): Publisher the readings are submitted to (kept in history,
+                checked for anomalies, and published raw or as window summaries).
         """
         self.ldr_pin = None
         self.light_pin = None
-        self.ldr_threshold = 1000  # Default threshold
+        self.ldr_threshold = 1000  # Default threshold (charge time in microseconds)
+        self.hysteresis = 0.1
+        self.light_on = False
+        self.max_charge_ms = max_charge_ms
+        self.discharge_ms = discharge_ms
+        self.set_calibration(calibration or [[200, 1.0], [max_charge_ms * 1000, 0.0]])
+        self.stats = {"samples": 0, "timeouts": 0, "total_ns": 0, "max_ns": 0}
+        self.scheduler = scheduler or get_default_scheduler()
+        self.job = None  # Scheduled light control job
+        self.telemetry = telemetry
         self.logger = logging.getLogger(__name__)
         GPIO.setmode(GPIO.BCM)  # Use BCM pin numbering
         GPIO.setwarnings(False)  # Disable GPIO warnings
 
-    def setup(self, ldr_pin, light_pin, threshold):
+    def setup(self, ldr_pin, light_pin, threshold=1000, hysteresis=0.1):
         """
         Set up the LDR sensor and light pin.
         
         Args:
             ldr_pin (int): GPIO pin number for the LDR sensor.
             light_pin (int): GPIO pin number for the light (e.g., LED).
-            threshold (int): Threshold value for light control.
+            threshold (int): Charge time (in microseconds) below which the light is switched on.
+            hysteresis (float): Fraction of the threshold the reading must move past before the light switches back.
         """
         try:
             self.ldr_pin = ldr_pin
             self.light_pin = light_pin
             self.ldr_threshold = threshold
+            self.hysteresis = hysteresis
             GPIO.setup(self.light_pin, GPIO.OUT)
             self.logger.info(f"LDR setup with LDR_PIN: {self.ldr_pin}, LIGHT_PIN: {self.light_pin}, Threshold: {self.ldr_threshold}")
         except Exception as e:
@@ -35,53 +58,184 @@ class LDRSensor:
 
     def read_ldr(self):
         """
-        Read the LDR sensor value.
+        Read the LDR sensor as an RC charge time. The capacitor is discharged, then the time until
+        the pin's rising edge is measured with a monotonic clock, capped at max_charge_ms.
         
         Returns:
-            int: LDR sensor reading.
+            int: Charge time in microseconds (max_charge_ms * 1000 if it timed out), or None on error.
         """
         try:
-            reading = 0
             GPIO.setup(self.ldr_pin, GPIO.OUT)
             GPIO.output(self.ldr_pin, False)
-            time.sleep(0.1)
-            GPIO.setup(self.ldr_pin, GPIO.IN)
+            time.sleep(self.discharge_ms / 1000.0)
+            charged = threading.Event()
+            edge_ns = []
 
-            while GPIO.input(self.ldr_pin) == GPIO.LOW:
-                reading += 1
+            def on_edge(channel):
+                edge_ns.append(time.perf_counter_ns())
+                charged.set()
 
-            self.logger.debug(f"LDR reading: {reading}")
+            start = time.perf_counter_ns()
+            GPIO.setup(self.ldr_pin, GPIO.IN)
+            # Armed before the level is checked: in bright light the capacitor can charge between the
+            # check and a wait_for_edge() call, whose timeout would then read as darkness
+            GPIO.add_event_detect(self.ldr_pin, GPIO.RISING, callback=on_edge)
+            try:
+                timed_out = False
+                if GPIO.input(self.ldr_pin) == GPIO.LOW:
+                    # Block until the edge callback instead of spinning on input()
+                    timed_out = not charged.wait(self.max_charge_ms / 1000.0)
+                end = edge_ns[0] if edge_ns else time.perf_counter_ns()
+            finally:
+                GPIO.remove_event_detect(self.ldr_pin)
+
+            reading = self.max_charge_ms * 1000 if timed_out else (end - start) // 1000
+            self._record(end - start + int(self.discharge_ms * 1e6), timed_out)
+            self.logger.debug(f"LDR reading: {reading} us{' (timed out)' if timed_out else ''}")
             return reading
         except Exception as e:
             self.logger.error(f"Failed to read LDR sensor: {e}")
             return None
 
-    def control_light(self, duration):
+    def _record(self, elapsed_ns, timed_out):
+        self.stats["samples"] += 1
+        self.stats["total_ns"] += elapsed_ns
+        self.stats["max_ns"] = max(self.stats["max_ns"], elapsed_ns)
+        if timed_out:
+            self.stats["timeouts"] += 1
+
+    def set_calibration(self, points):
+        """
+        Set the calibration curve.
+
+        Args:
+            points (list): [charge_us, level] pairs; at least two with distinct charge times.
+        """
+        points = sorted((float(raw), float(level)) for raw, level in points)
+        if len(points) < 2 or points[0][0] <= 0 or points[0][0] == points[-1][0]:
+            raise ValueError("Calibration needs at least two points with distinct positive charge times")
+        self.calibration = points
+
+    def calibrate(self, level, samples=5):
+        """
+        Measure the current light and add it to the calibration curve as a known level.
+
+        Args:
+            level (float): Light level (0.0 dark to 1.0 bright) the sensor is currently exposed to.
+            samples (int): Readings to take; their median is used.
+
+        Returns:
+            int: The charge time recorded for this level, or None if the sensor could not be read.
+        """
+        readings = sorted(r for r in (self.read_ldr() for _ in range(samples)) if r is not None)
+        if not readings:
+            return None
+        raw = readings[len(readings) // 2]
+        points = [p for p in self.calibration if p[1] != level and p[0] != raw]
+        self.set_calibration(points + [(raw, level)])
+        self.logger.info(f"LDR calibration point: {raw} us = level {level}")
+        return raw
+
+    def to_level(self, reading):
+        """
+        Convert a charge time to a normalized light level through the calibration curve.
+
+        Args:
+            reading (int): Charge time in microseconds.
+
+        Returns:
+            float: Light level from 0.0 (dark) to 1.0 (bright).
         """
-        Control the light based on LDR readings for the specified duration.
+        # Charge time follows LDR resistance, which is roughly a power law of illuminance: interpolate in log space
+        x = math.log(max(reading, 1))
+        points = [(math.log(raw), level) for raw, level in self.calibration]
+        if x <= points[0][0]:
+            level = points[0][1]
+        elif x >= points[-1][0]:
+            level = points[-1][1]
+        else:
+            for (xa, level_a), (xb, level_b) in zip(points, points[1:]):
+                if x <= xb:
+                    level = level_a + (level_b - level_a) * (x - xa) / (xb - xa)
+                    break
+        return round(min(1.0, max(0.0, level)), 3)
+
+    def control_light(self, duration, interval=1):
+        """
+        Schedule light control based on LDR readings for the specified duration. Returns immediately;
+        a control job already running on this sensor is replaced.
         
         Args:
             duration (int): Duration (in seconds) to monitor the LDR sensor.
+            interval (int): Time interval (in seconds) between readings. Default is 1 second.
+
+        Returns:
+            Job: The scheduled light control job.
+        """
+        if self.job is not None:
+            self.job.cancel()
+        self.logger.info(f"Monitoring LDR for {duration} seconds.")
+        self.light_on = False
+        self.job = self.scheduler.every(interval, self.update_light, duration=duration,
+                                        name=f"LDR-{self.ldr_pin}", on_done=self._control_done)
+        return self.job
+
+    def update_light(self):
+        """
+        Read the LDR once and switch the light with hysteresis around the threshold: on below
+        threshold * (1 - hysteresis), off above threshold * (1 + hysteresis), unchanged in between.
         """
         try:
-            self.logger.info(f"Monitoring LDR for {duration} seconds.")
-            start_time = time.time()
-
-            while time.time() - start_time < duration:
-                ldr_reading = self.read_ldr()
-                if ldr_reading is not None:
-                    if ldr_reading < self.ldr_threshold:
-                        GPIO.output(self.light_pin, True)
-                        self.logger.info(f"LDR reading {ldr_reading} below threshold. Light ON.")
-                    else:
-                        GPIO.output(self.light_pin, False)
-                        self.logger.info(f"LDR reading {ldr_reading} above threshold. Light OFF.")
-                time.sleep(1)  # Read every second
+            ldr_reading = self.read_ldr()
+            if ldr_reading is None:
+                return
+            level = self.to_level(ldr_reading)
+            if not self.light_on and ldr_reading < self.ldr_threshold * (1 - self.hysteresis):
+                self.light_on = True
+                GPIO.output(self.light_pin, True)
+                self.logger.info(f"LDR reading {ldr_reading} us (level {level}) below threshold. Light ON.")
+            elif self.light_on and ldr_reading > self.ldr_threshold * (1 + self.hysteresis):
+                self.light_on = False
+                GPIO.output(self.light_pin, False)
+                self.logger.info(f"LDR reading {ldr_reading} us (level {level}) above threshold. Light OFF.")
+            else:
+                self.logger.debug(f"LDR reading {ldr_reading} us (level {level}), light {'ON' if self.light_on else 'OFF'}")
+            if self.telemetry is not None:
+                self.telemetry.submit("LDR Sensor", {"charge_us": ldr_reading, "level": level,
+                                                     "light": self.light_on}, key=self.ldr_pin)
         except Exception as e:
             self.logger.error(f"Failed to control light: {e}")
-        finally:
+
+    def _control_done(self, job):
+        try:
             GPIO.output(self.light_pin, False)  # Ensure the light is turned off
-            self.logger.info("LDR monitoring completed.")
+            self.light_on = False
+        except Exception as e:
+            self.logger.error(f"Failed to turn off light: {e}")
+        self.logger.info(f"LDR monitoring completed. Measurement cost: {self.report()}")
+
+    def stop(self):
+        """
+        Stop the light control job.
+        """
+        if self.job is not None:
+            self.job.cancel()
+
+    def report(self):
+        """
+        Return the measurement cost per sample.
+
+        Returns:
+            dict: Samples taken, readings that hit max_charge_ms, and mean and max time per
+            sample (discharge included) in milliseconds.
+        """
+        samples = self.stats["samples"]
+        return {
+            "samples": samples,
+            "timeouts": self.stats["timeouts"],
+            "mean_ms": round(self.stats["total_ns"] / samples / 1e6, 3) if samples else 0.0,
+            "max_ms": round(self.stats["max_ns"] / 1e6, 3),
+        }
 
     def cleanup(self):
         """
@@ -91,4 +245,4 @@ class LDRSensor:
             GPIO.cleanup()
             self.logger.info("GPIO cleanup completed.")
         except Exception as e:
-            self.logger.error(f"Failed to cleanup GPIO: {e}")
\ No newline at end of file
+            self.logger.error(f"Failed to cleanup GPIO: {e}")
@@ -2,7 +2,7 @@ import json
 import paho.mqtt.client as mqtt
 import time
 import atexit
-import RPi.GPIO as GPIO
+from hal import GPIO
 from Digital import DigitalIO
 from lcd import LCD
 from steppermotor import StepperMotor
@@ -12,6 +12,8 @@ from ultrasonic import UltrasonicSensor
 from PIR import PIRSensor
 from input_handlers import handle_button, handle_keypad  # Import button and keypad handlers
 from ldr import LDRSensor
+from topics import TopicLayout, EchoSuppressor, TrackedClient
+from registry import SensorRegistry
 
 # MQTT Broker Configuration
 broker = 'iiotif.com'
@@ -19,6 +21,7 @@ port = 1883
 username = 'blitz_server'
 password = 'sdsmakapgnjvngrp@!#@snsdfod'
 topic = "a/sampleAsset_1718789748945"
+topics = TopicLayout(topic)  # cmd / telemetry / status subtopics
 
 # Initialize components
 digital_io = DigitalIO()
@@ -26,19 +29,26 @@ lcd = LCD()
 stepper_motor = StepperMotor()
 pwm = PWM()
 client = mqtt.Client()
+echo_suppressor = EchoSuppressor()
+publisher = TrackedClient(client, echo_suppressor)
 
-# Initialize Sensor
-dht11_sensor = DHT11Sensor(client)
-ultrasonic_sensor = UltrasonicSensor(client)
-pir_sensor = PIRSensor(client, topic)
-ldr_sensor = LDRSensor() 
+# Sensors are created per pin set on first use, so several of each type can run at once
+sensors = SensorRegistry()
+sensors.register("DHT11", lambda: DHT11Sensor(publisher, topics.telemetry), ["pin"], stop=DHT11Sensor.stop_monitoring)
+sensors.register("Ultrasonic sensor", lambda: UltrasonicSensor(publisher, topics.telemetry), ["trig_pin", "echo_pin"],
+                 stop=UltrasonicSensor.stop_monitoring)
+sensors.register("PIR_SENSOR", lambda: PIRSensor(publisher, topics.telemetry), ["pin"], stop=PIRSensor.cleanup)
+sensors.register("LDR Sensor", LDRSensor, ["ldr_pin", "light_pin"], stop=LDRSensor.stop)
 
 # MQTT Callbacks
 def on_connect(client, userdata, flags, rc):
     print("Connected to MQTT broker")
-    client.subscribe(topic)
+    client.subscribe(topics.cmd)
 
 def on_message(client, userdata, message):
+    # Drop anything that is not a command, including echoes of our own telemetry
+    if not topics.is_command(message.topic) or echo_suppressor.is_echo(message.topic, message.payload):
+        return
     try:
         data = json.loads(message.payload.decode("utf-8").strip())
         component = data.get('component')
@@ -84,9 +94,8 @@ def on_message(client, userdata, message):
             interval = data['data'].get('interval')  # Default interval
             duration = data['data'].get('duration')  # Default duration
             
-            # Setup the DHT11 sensor and read data
-            dht11_sensor.setup(pin)
-            dht11_sensor.read_data(interval, duration)
+            # Get the DHT11 sensor on this pin and read data
+            sensors.get("DHT11", data['data']).read_data(interval, duration)
 
         elif component == "Ultrasonic sensor":
             trig_pin = data['data'].get('trig_pin')
@@ -95,17 +104,15 @@ def on_message(client, userdata, message):
             duration = data['data'].get('duration')  # Default duration
 
             
-            # Setup the Ultrasonic sensor
-            ultrasonic_sensor.setup(trig_pin, echo_pin)
-            ultrasonic_sensor.monitor(interval, duration)
+            # Get the Ultrasonic sensor on these pins
+            sensors.get("Ultrasonic sensor", data['data']).monitor(interval, duration)
 
         elif component == "PIR_SENSOR":
             pir_pin = data.get('data', {}).get('pin')
             interval = data.get('data', {}).get('interval')  # Default interval
             duration = data.get('data', {}).get('duration')  # Default duration
             if pir_pin is not None:
-                pir_sensor.setup(pir_pin)
-                pir_sensor.monitor(interval, duration)
+                sensors.get("PIR_SENSOR", data['data']).monitor(interval, duration)
 
                 # Handle LDR component
         elif component == "LDR Sensor":
@@ -114,6 +121,7 @@ def on_message(client, userdata, message):
             threshold = data.get('data', {}).get('threshold', 1000)
             duration = data.get('data', {}).get('duration', 10)  # Default duration 10 seconds
             if ldr_pin is not None and light_pin is not None:
+                ldr_sensor = sensors.get("LDR Sensor", data['data'])
                 ldr_sensor.setup(ldr_pin, light_pin, threshold)
                 ldr_sensor.control_light(duration)
                 print(f"LDR setup on pin {ldr_pin}, controlling light on pin {light_pin}, threshold: {threshold}, duration: {duration}")
@@ -163,5 +171,5 @@ finally:
     digital_io.cleanup()
     pwm.cleanup()
     stepper_motor.cleanup()
-    pir_sensor.cleanup()  # Cleanup PIR sensor
+    sensors.close()  # Stop all sensors
     client.loop_stop()
@@ -2,176 +2,285 @@ import json
 import paho.mqtt.client as mqtt
 import time
 import atexit
-import threading
 import logging
-# import RPi.GPIO as GPIO
-# from Digital import DigitalIO
-# from lcd import LCD
-# from steppermotor import StepperMotor
-# from Pwm import PWM
-# from DHT_11 import DHT11Sensor
-# from ultrasonic import UltrasonicSensor
-# from PIR import PIRSensor
-# from input_handlers import handle_button, handle_keypad
-# from ldr import LDRSensor
+from hal import GPIO
+from Digital import DigitalIO
+from lcd import LCD
+from steppermotor import StepperMotor
+from Pwm import PWM
+from DHT_11 import DHT11Sensor
+from ultrasonic import UltrasonicSensor
+from PIR import PIRSensor
+from input_handlers import handle_button as watch_button, handle_keypad as watch_keypad
+from edges import EdgeMonitor
+from keypad_scanner import KeypadScanner
+from ldr import LDRSensor
+from dispatcher import CommandDispatcher
+from batch import BatchExecutor, as_batch, BATCH_COMPONENT
+from schemas import CommandValidator, ValidationError
+from topics import TopicLayout, EchoSuppressor, TrackedClient
+from offline_buffer import OfflineBuffer, BufferedClient
+from telemetry import TelemetryPublisher
+from filters import FilterBank
+from encoding import get_codec, publish_descriptors
+from scheduler import Scheduler
+from registry import SensorRegistry
+from sessions import SessionManager, SESSION_COMPONENT
+from history import HistoryStore, SummaryPublisher
+from anomaly import AnomalyMonitor
+from store import TimeSeriesStore
+from metrics import get_default_registry, MetricsPublisher
 
 # Import configurations
-from config import MQTT_CONFIG, GPIO_CONFIG
+from config import (
+    MQTT_CONFIG, TOPIC_CONFIG, GPIO_CONFIG, DISPATCH_CONFIG, BATCH_CONFIG, OFFLINE_BUFFER_CONFIG,
+    TELEMETRY_CONFIG, FILTER_CONFIG, ENCODING_CONFIG, SCHEDULER_CONFIG, EDGE_CONFIG, ULTRASONIC_CONFIG,
+    LDR_CONFIG, KEYPAD_CONFIG, HISTORY_CONFIG, SUMMARY_CONFIG,
+    ANOMALY_CONFIG, STORE_CONFIG, METRICS_CONFIG, STEPPER_CONFIG,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Counters and latency histograms accumulate per thread without locks; the HAL counts GPIO and I2C operations here too
+metrics = get_default_registry()
+
 # Initialize components
-# digital_io = DigitalIO()
-# lcd = LCD()
-# stepper_motor = StepperMotor()
-# pwm = PWM()
+digital_io = DigitalIO()
+lcd = LCD()
+stepper_motor = StepperMotor(metrics=metrics, **STEPPER_CONFIG)
+pwm = PWM()
 
 
 client = mqtt.Client()
 
-# Initialize sensors with MQTT topic from config
-# dht11_sensor = DHT11Sensor(client, topic=MQTT_CONFIG["topic"])
-# ultrasonic_sensor = UltrasonicSensor(client, topic=MQTT_CONFIG["topic"])
-# pir_sensor = PIRSensor(client, topic=MQTT_CONFIG["topic"])
-# ldr_sensor = LDRSensor()
+# Commands arrive on the cmd subtopic; readings go out on telemetry so they never loop back
+topics = TopicLayout(MQTT_CONFIG["topic"], TOPIC_CONFIG)
+echo_suppressor = EchoSuppressor()
+publisher = TrackedClient(client, echo_suppressor, metrics=metrics)
+
+# Payload encoding per topic (JSON, CBOR, MessagePack or fixed struct layout)
+codecs = {name: get_codec(encoding) for name, encoding in ENCODING_CONFIG.items()}
+
+# Telemetry published while offline is kept on disk and replayed after reconnecting
+offline_buffer = OfflineBuffer(**OFFLINE_BUFFER_CONFIG)
+
+def publish_buffer_report(report):
+    publisher.publish(topics.status, json.dumps({"offline_buffer": report}))
+    logger.info(f"Offline buffer drained: {report}")
+
+telemetry_client = BufferedClient(publisher, offline_buffer, on_drained=publish_buffer_report)
+
+# All periodic sampling runs on one scheduler, so the thread count does not grow with active monitors
+scheduler = Scheduler(metrics=metrics, **SCHEDULER_CONFIG)
+
+# Every sample is kept in a bounded per-sensor ring buffer for local history and window statistics
+history = HistoryStore(**HISTORY_CONFIG)
+
+# Every reading is also written to a local SQLite store, so dashboards can backfill with the history command
+store = TimeSeriesStore(scheduler=scheduler, **STORE_CONFIG)
+
+# Anomalies skip the batch and go out on the alerts topic as soon as a detector trips.
+# While connected they also skip the replay backlog; they are only buffered while offline.
+alert_client = BufferedClient(publisher, offline_buffer, on_drained=publish_buffer_report, ordered=False)
+anomalies = AnomalyMonitor(alert_client, topics.alerts, ANOMALY_CONFIG)
+
+# All sensors feed one batching publisher; deadband filters drop samples that carry no new information
+telemetry_filters = FilterBank(FILTER_CONFIG)
+telemetry = TelemetryPublisher(telemetry_client, topics.telemetry, filters=telemetry_filters,
+                               codec=codecs["telemetry"], history=history, anomalies=anomalies, store=store,
+                               summarized_components=SUMMARY_CONFIG, **TELEMETRY_CONFIG)
 
-# Global flag to control sensor monitoring threads
-monitoring_active = True
+# Summarized components publish window statistics instead of raw samples
+summaries = SummaryPublisher(history, telemetry, SUMMARY_CONFIG, scheduler=scheduler)
+
+# PIR and buttons report through GPIO edge callbacks instead of polling
+edge_monitor = EdgeMonitor(scheduler=scheduler, **EDGE_CONFIG)
+
+# The keypad is scanned at a fixed rate with pins configured once
+keypad_scanner = KeypadScanner(scheduler=scheduler, **KEYPAD_CONFIG)
+
+# One sensor instance per component and pin set, created on the first command that uses it
+sensors = SensorRegistry()
+sensors.register("DHT11", lambda: DHT11Sensor(telemetry_client, topic=topics.telemetry, telemetry=telemetry,
+                                              scheduler=scheduler),
+                 pins=["pin"], stop=DHT11Sensor.stop_monitoring)
+sensors.register("Ultrasonic sensor", lambda: UltrasonicSensor(telemetry_client, topic=topics.telemetry, telemetry=telemetry,
+                                                               scheduler=scheduler, ranging=ULTRASONIC_CONFIG),
+                 pins=["trig_pin", "echo_pin"], stop=UltrasonicSensor.stop_monitoring)
+sensors.register("PIR_SENSOR", lambda: PIRSensor(telemetry_client, topic=topics.telemetry, telemetry=telemetry,
+                                                 edges=edge_monitor),
+                 pins=["pin"], stop=PIRSensor.cleanup)
+sensors.register("LDR Sensor", lambda: LDRSensor(scheduler=scheduler, telemetry=telemetry, **LDR_CONFIG),
+                 pins=["ldr_pin", "light_pin"], stop=LDRSensor.stop)
 
 # MQTT Callbacks
 def on_connect(client, userdata, flags, rc):
     if rc == 0:
         logger.info("Connected to MQTT broker")
-        client.subscribe(MQTT_CONFIG["topic"])
+        client.subscribe(topics.cmd)
+        publisher.publish(topics.status, json.dumps({"status": "online"}), retain=True)
+        publish_descriptors(publisher, topics, codecs)
+        if not offline_buffer.is_empty():
+            offline_buffer.start_drain(publisher, on_done=publish_buffer_report)
     else:
         logger.error(f"Connection failed with code {rc}")
 
 def on_disconnect(client, userdata, rc):
-    logger.warning("Disconnected from MQTT broker. Attempting to reconnect...")
-    while not client.is_connected():
-        try:
-            client.reconnect()
-            logger.info("Reconnected to MQTT broker")
-        except Exception as e:
-            logger.error(f"Reconnection failed: {e}. Retrying in 5 seconds...")
-            time.sleep(5)
+    # Never block here: paho's network loop reconnects on its own backoff schedule
+    offline_buffer.stop_drain()
+    if rc != 0:
+        logger.warning(f"Disconnected from MQTT broker (rc={rc}). Reconnecting in the background; telemetry is buffered")
 
 def on_message(client, userdata, message):
+    if not topics.is_command(message.topic):
+        logger.debug(f"Ignoring message on non-command topic {message.topic}")
+        return
+    if echo_suppressor.is_echo(message.topic, message.payload):
+        logger.debug(f"Suppressed echo of our own message on {message.topic}")
+        return
     try:
-        data = json.loads(message.payload.decode("utf-8").strip())
+        data = codecs["cmd"].decode(message.payload)
         logger.debug(f"Message received: {data}")
-        handle_mqtt_message(data)
-    except json.JSONDecodeError:
-        logger.error("Failed to decode JSON from message payload")
+        # Only decode, validate and enqueue here; handlers run on the component worker pools
+        batch = as_batch(data)
+        dispatcher.submit(batch if batch is not None else validator.validate(data))
+    except ValidationError as e:
+        logger.error(f"Rejected invalid command: {e}")
+    except ValueError as e:
+        logger.error(f"Failed to decode {codecs['cmd'].name} message payload: {e}")
     except Exception as e:
         logger.error(f"Error processing message: {e}")
 
 # Handle MQTT messages
 def handle_mqtt_message(data):
-    component = data.get('component')
-    if not component:
-        logger.error("No component specified in message")
+    try:
+        data = validator.validate(data)
+    except ValidationError as e:
+        logger.error(f"Rejected invalid command: {e}")
         return
 
-    handler = MESSAGE_HANDLERS.get(component)
+    handler = MESSAGE_HANDLERS.get(data['component'])
     if handler:
         handler(data)
     else:
-        logger.error(f"No handler found for component: {component}")
+        logger.error(f"No handler found for component: {data['component']}")
 
-# Handlers for different components
+# Handlers for different components.
+# Commands reach them already validated against schemas.COMMAND_SCHEMAS, with defaults filled in.
 def handle_lcd(data):
-    msg = data.get('data', {}).get('message')
-    if msg:
-        # lcd.display_message(msg)
-        logger.info(f"LCD message displayed: {msg}")
+    msg = data['data']['message']
+    lcd.display_message(msg)
+    logger.info(f"LCD message displayed: {msg}")
 
 def handle_digital_io(data):
-    component = data.get('component')
-    pin = data.get('data', {}).get('pin')
-    state = data.get('data', {}).get('state')
-    if pin is not None and state is not None:
-        # digital_io.switch(component, pin, state)
-        logger.info(f"{component} switched to {state} on pin {pin}")
+    component = data['component']
+    params = data['data']
+    digital_io.switch(component, params)
+    logger.info(f"{component} switched to {params['state']} on pin {params['pin']}")
+
+def apply_digital_writes(commands):
+    writes = [(command['component'], command['data']) for command in commands]
+    digital_io.switch_many(writes)
+    logger.info(f"Applied {len(writes)} digital writes atomically")
+
+def publish_stepper_status(motion):
+    publisher.publish(topics.status, json.dumps({"stepper": motion.describe()}))
 
 def handle_stepper_motor(data):
-    pins = data.get('data', {}).get('pins')
-    direction = data.get('data', {}).get('direction')
-    steps = data.get('data', {}).get('steps', 400)
-    delay = data.get('data', {}).get('delay', 10) / 1000.0
-    if pins and direction:
-        # GPIO.setup(pins, GPIO.OUT)
-        # stepper_motor.move_motor(pins, delay, steps, direction)
-        logger.info(f"Stepper motor moving {direction} for {steps} steps with {delay} seconds delay.")
+    params = data['data']
+    action = params['action']
+    # One motor given by 'pins', or several in 'motors' that start and finish together
+    if 'motors' in params:
+        motors = params['motors']
+    elif 'pins' in params:
+        motors = [params]
+    else:
+        raise ValueError("stepper command needs 'pins' or 'motors'")
+    if action == 'stop':
+        for motor in motors:
+            stepper_motor.stop(motor['pins'], immediate=params['immediate'])
+        positions = {str(motor['pins']): stepper_motor.position(motor['pins']) for motor in motors}
+        logger.info(f"Stepper motors stopped at positions {positions}")
+        return
+    # Moves run in the background; the final positions and achieved step rate are published when they end
+    speed = 1000.0 / params['delay'] if params['delay'] > 0 else None
+    options = {"speed": speed, "accel": params.get('accel'), "profile": params.get('profile')}
+    if action == 'goto':
+        if any('position' not in motor for motor in motors):
+            raise ValueError("stepper goto needs a position")
+        motion = stepper_motor.goto_many([(motor['pins'], motor['position']) for motor in motors], **options)
+    else:
+        if any('direction' not in motor for motor in motors):
+            raise ValueError(f"stepper {action} needs a direction")
+        if action == 'jog':
+            if len(motors) > 1:
+                raise ValueError("stepper jog takes a single motor")
+            motion = stepper_motor.jog(motors[0]['pins'], motors[0]['direction'],
+                                       duration=params.get('duration'), **options)
+        else:
+            motion = stepper_motor.move_many([(motor['pins'], motor['steps'] * 4, motor['direction'])
+                                              for motor in motors], **options)
+    motion.add_done_callback(publish_stepper_status)
 
 def handle_pwm(data):
-    component = data.get('component')
-    if component == "light":
-        pins = data.get('data', {}).get('pins', [])
-        color = data.get('data', {}).get('color', [])
-        if pins:
-            # pwm.set_rgb_color(pins, color)
-            logger.info(f"RGB color set to: {color}")
-    elif component == "servo":
-        pin = data.get('data', {}).get('pin')
-        angle = data.get('data', {}).get('angle')
-        if pin is not None and angle is not None:
-            # pwm.set_servo_angle(pin, angle)
-            logger.info(f"Servo set to angle: {angle} on pin: {pin}")
+    params = data['data']
+    if data['component'] == "light":
+        pwm.set_rgb_color(params['pins'], params['color'])
+        logger.info(f"RGB color set to: {params['color']}")
+    else:
+        pwm.set_servo_angle(params['pin'], params['angle'])
+        logger.info(f"Servo set to angle: {params['angle']} on pin: {params['pin']}")
 
+# Sensor session starters: each returns the session's Job or EdgeWatch so it can be stopped, re-timed and extended
 def handle_dht11(data):
-    pin = data['data'].get('pin')
-    interval = data['data'].get('interval', 2)  # Default interval
-    duration = data['data'].get('duration', 10)  # Default duration
-    if pin:
-        # dht11_sensor.setup(pin)
-        threading.Thread(target=dht11_sensor.read_data, args=(interval, duration), daemon=True).start()
-        logger.info(f"DHT11 sensor monitoring started on pin {pin}")
+    params = data['data']
+    logger.info(f"DHT11 sensor monitoring started on pin {params['pin']}")
+    return sensors.get("DHT11", params).read_data(params['interval'], params['duration'])
 
 def handle_ultrasonic(data):
-    trig_pin = data['data'].get('trig_pin')
-    echo_pin = data['data'].get('echo_pin')
-    interval = data['data'].get('interval', 1)  # Default interval
-    duration = data['data'].get('duration', 10)  # Default duration
-    if trig_pin and echo_pin:
-        # ultrasonic_sensor.setup(trig_pin, echo_pin)
-        # threading.Thread(target=ultrasonic_sensor.monitor, args=(interval, duration), daemon=True).start()
-        logger.info(f"Ultrasonic sensor monitoring started on pins {trig_pin} (trig) and {echo_pin} (echo)")
+    params = data['data']
+    logger.info(f"Ultrasonic sensor monitoring started on pins {params['trig_pin']} (trig) and {params['echo_pin']} (echo)")
+    return sensors.get("Ultrasonic sensor", params).monitor(params['interval'], params['duration'])
 
 def handle_pir(data):
-    pir_pin = data.get('data', {}).get('pin')
-    interval = data.get('data', {}).get('interval', 1)  # Default interval
-    duration = data.get('data', {}).get('duration', 10)  # Default duration
-    if pir_pin:
-        # pir_sensor.setup(pir_pin)
-        # threading.Thread(target=pir_sensor.monitor, args=(interval, duration), daemon=True).start()
-        logger.info(f"PIR sensor monitoring started on pin {pir_pin}")
+    params = data['data']
+    logger.info(f"PIR sensor monitoring started on pin {params['pin']}")
+    return sensors.get("PIR_SENSOR", params).monitor(params['interval'], params['duration'])
 
 def handle_ldr(data):
-    ldr_pin = data.get('data', {}).get('ldr_pin')
-    light_pin = data.get('data', {}).get('light_pin')
-    threshold = data.get('data', {}).get('threshold', 1000)
-    duration = data.get('data', {}).get('duration', 10)  # Default duration
-    if ldr_pin and light_pin:
-        # ldr_sensor.setup(ldr_pin, light_pin, threshold)
-        # threading.Thread(target=ldr_sensor.control_light, args=(duration,), daemon=True).start()
-        logger.info(f"LDR setup on pin {ldr_pin}, controlling light on pin {light_pin}")
+    params = data['data']
+    ldr_sensor = sensors.get("LDR Sensor", params)
+    ldr_sensor.setup(params['ldr_pin'], params['light_pin'], params['threshold'], params['hysteresis'])
+    logger.info(f"LDR setup on pin {params['ldr_pin']}, controlling light on pin {params['light_pin']}")
+    return ldr_sensor.control_light(params['duration'], params['interval'])
 
 def handle_button(data):
-    pin = data.get('data', {}).get('pin')
-    duration = data.get('data', {}).get('duration', 10)  # Default duration
-    if pin:
-        threading.Thread(target=handle_button, args=(pin, duration), daemon=True).start()
-        logger.info(f"Button handling started on pin {pin}")
+    params = data['data']
+    logger.info(f"Button handling started on pin {params['pin']}")
+    return watch_button(telemetry_client, topics.telemetry, params['pin'], params['duration'], telemetry, edge_monitor)
+
+def handle_history(data):
+    # Downsampled readings from the local store, returned in one message on the status topic
+    params = data['data']
+    result = store.query(params['sensor'], params['seconds'], params['bucket'], key=params.get('key'),
+                         field=params.get('field'), start=params.get('start'), end=params.get('end'))
+    publisher.publish(topics.status, json.dumps({"history": dict(result, id=params.get('id'))}))
+    logger.info(f"History for {params['sensor']}: {sum(len(s['samples']) for s in result['series'])} buckets")
 
 def handle_keypad(data):
-    pin = data.get('data', {}).get('pin')
-    duration = data.get('data', {}).get('duration', 10)  # Default duration
-    if pin:
-        # threading.Thread(target=handle_keypad, args=(pin, duration), daemon=True).start()
-        logger.info(f"Keypad handling started on pin {pin}")
+    params = data['data']
+    logger.info(f"Keypad handling started on pin {params['pin']}")
+    watch_keypad(telemetry_client, topics.telemetry, params['duration'], telemetry, keypad_scanner)
+
+# Monitoring sessions can be stopped, re-timed, extended and listed over MQTT; a repeated start updates the running session
+sessions = SessionManager(publisher, topics.status)
+sessions.register("DHT11", handle_dht11, pins=["pin"])
+sessions.register("Ultrasonic sensor", handle_ultrasonic, pins=["trig_pin", "echo_pin"])
+sessions.register("PIR_SENSOR", handle_pir, pins=["pin"])
+sessions.register("LDR Sensor", handle_ldr, pins=["ldr_pin", "light_pin"])
+sessions.register("Button", handle_button, pins=["pin"])
 
 # Dictionary to map components to their handlers
 MESSAGE_HANDLERS = {
@@ -182,38 +291,117 @@ MESSAGE_HANDLERS = {
     "stepper_motor": handle_stepper_motor,
     "light": handle_pwm,
     "servo": handle_pwm,
-    "DHT11": handle_dht11,
-    "Ultrasonic sensor": handle_ultrasonic,
-    "PIR_SENSOR": handle_pir,
-    "LDR Sensor": handle_ldr,
-    "Button": handle_button,
+    "DHT11": sessions.handle,
+    "Ultrasonic sensor": sessions.handle,
+    "PIR_SENSOR": sessions.handle,
+    "LDR Sensor": sessions.handle,
+    "Button": sessions.handle,
     "Keypad": handle_keypad,
+    "history": handle_history,
+    SESSION_COMPONENT: sessions.handle,
 }
+# Every handler call is counted and timed per component
+MESSAGE_HANDLERS = {component: metrics.instrument(handler, "handler", component=component)
+                    for component, handler in MESSAGE_HANDLERS.items()}
+
+# Hooks used to stop a running command when a newer one preempts it.
+# Sensor and stepper handlers return as soon as their session or motion is started, so only blocking handlers need one.
+CANCEL_HOOKS = {
+    "Keypad": keypad_scanner.stop,
+}
+
+# Command schemas are compiled once; invalid commands never reach a handler
+validator = CommandValidator()
+
+# Per-component worker pools so the paho network thread never runs a handler
+dispatcher = CommandDispatcher(MESSAGE_HANDLERS, DISPATCH_CONFIG, CANCEL_HOOKS)
+
+# Batches run in order on their own pool, with one acknowledgement on the status topic
+batch_executor = BatchExecutor(MESSAGE_HANDLERS, dispatcher, publisher, topics.status,
+                               BATCH_CONFIG, atomic_writer=apply_digital_writes, validator=validator)
+dispatcher.add_component(BATCH_COMPONENT, metrics.instrument(batch_executor.run, "handler", component=BATCH_COMPONENT))
+
+# Queue depths and component counters are read from their reports only when a snapshot is taken
+metrics.add_report("dispatch", dispatcher.stats, label="component", help="Command dispatch per component pool")
+metrics.add_report("validation", validator.report, label="component", help="Command schema validation cost per component")
+metrics.gauge("scheduler_ready", scheduler.ready.qsize, help="Job ticks waiting for a scheduler worker")
+metrics.gauge("scheduler_jobs", lambda: len(scheduler.active), help="Active scheduled jobs")
+metrics.add_report("telemetry", telemetry.report, help="Telemetry batching publisher")
+metrics.add_report("offline_buffer", offline_buffer.report, help="Offline store-and-forward buffer")
+metrics.add_report("store", store.report, help="Local time-series store")
+metrics.add_report("history", history.report, help="History ring buffers")
+metrics.add_report("anomalies", anomalies.report, label="component", help="Anomaly detection")
+metrics.add_report("edges", edge_monitor.report, label="pin", help="GPIO edge events per pin")
+metrics.add_report("keypad", keypad_scanner.report, help="Keypad scanner")
+metrics.add_report("stepper", stepper_motor.report, label="pins", help="Stepper position and achieved step rate")
+
+# Snapshots go out on the metrics subtopic (and to a Prometheus textfile when configured)
+metrics_publisher = MetricsPublisher(metrics, publisher, topics.metrics, scheduler=scheduler, **METRICS_CONFIG)
 
 # Register GPIO cleanup on exit
-# atexit.register(lambda: GPIO.cleanup())
-
-# MQTT Client Setup
-client.username_pw_set(username=MQTT_CONFIG["username"], password=MQTT_CONFIG["password"])
-client.on_connect = on_connect
-client.on_disconnect = on_disconnect
-client.on_message = on_message
-
-# Connect to MQTT broker and loop forever
-client.connect(MQTT_CONFIG["broker"], MQTT_CONFIG["port"], 60)
-client.loop_start()  # Start the MQTT loop in a separate thread
-
-try:
-    logger.info("Listening for MQTT messages...")
-    while True:
-        time.sleep(0.1)  # Keep the script running
-except KeyboardInterrupt:
-    logger.info("\nExiting the program.")
-finally:
-    # Cleanup
-    monitoring_active = False
-    # digital_io.cleanup()
-    # pwm.cleanup()
-    # stepper_motor.cleanup()
-    # pir_sensor.cleanup()
-    client.loop_stop()
\ No newline at end of file
+atexit.register(lambda: GPIO.cleanup())
+
+def start():
+    """
+    Connect to the broker and start the background services. Returns immediately;
+    the MQTT loop thread retries with backoff until the broker is reachable.
+    """
+    client.username_pw_set(username=MQTT_CONFIG["username"], password=MQTT_CONFIG["password"])
+    client.will_set(topics.status, json.dumps({"status": "offline"}), retain=True)
+    client.on_connect = on_connect
+    client.on_disconnect = on_disconnect
+    client.on_message = on_message
+    client.reconnect_delay_set(min_delay=MQTT_CONFIG["reconnect_min_delay"], max_delay=MQTT_CONFIG["reconnect_max_delay"])
+
+    client.connect_async(MQTT_CONFIG["broker"], MQTT_CONFIG["port"], 60)
+    client.loop_start()  # Start the MQTT loop in a separate thread
+    scheduler.start()
+    telemetry.start()
+    summaries.start()
+    store.start()
+    metrics_publisher.start()
+
+def stop():
+    """
+    Stop handlers and sensors, flush telemetry and the local store, release the hardware and disconnect.
+    """
+    dispatcher.shutdown(timeout=1)
+    logger.info(f"Command validation: {validator.report()}")
+    stepper_motor.stop(immediate=True)  # Before the pins are released
+    logger.info(f"Stepper motors: {stepper_motor.report()}")
+    sessions.close()  # Publishes a 'stopped' status for each running session
+    sensors.close()  # Stop every sensor session and release its pins
+    summaries.stop()
+    metrics_publisher.stop()
+    logger.info(f"History buffers: {history.report()}")
+    logger.info(f"Anomalies: {anomalies.report()}")
+    edge_monitor.close()
+    logger.info(f"Edge events: {edge_monitor.report()}")
+    logger.info(f"Keypad scanner: {keypad_scanner.report()}")
+    scheduler.shutdown(timeout=1)  # Cancel monitoring jobs before their readings are flushed
+    telemetry.close()  # Flush pending samples (into the offline buffer if disconnected)
+    store.flush()
+    logger.info(f"Time-series store: {store.report()}")
+    store.close()
+    logger.info(f"Telemetry publisher: {telemetry.report()}")
+    logger.info(f"Telemetry filters: {telemetry_filters.report()}")
+    offline_buffer.close()
+    digital_io.cleanup()
+    pwm.cleanup()
+    stepper_motor.cleanup()
+    client.loop_stop()
+
+def main():
+    start()
+    try:
+        logger.info("Listening for MQTT messages...")
+        while True:
+            time.sleep(0.1)  # Keep the script running
+    except KeyboardInterrupt:
+        logger.info("\nExiting the program.")
+    finally:
+        stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+import bisect
+import json
+import os
+import threading
+import time
+import logging
+from scheduler import get_default_scheduler
+
+# Latency histogram bucket upper bounds in milliseconds; one more bucket counts everything above the last
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Counter:
+    __slots__ = ("registry", "local", "index")
+
+    def __init__(self, registry, index):
+        """
+        Monotonic counter. Create it with MetricsRegistry.counter().
+        """
+        self.registry = registry
+        self.local = registry.local
+        self.index = index
+
+    def inc(self, amount=1):
+        try:
+            self.local.shard[self.index] += amount
+        except AttributeError:  # First record from this thread
+            self.registry._shard()[self.index] += amount
+
+    def value(self):
+        return self.registry._total(self.index)
+
+
+class Histogram:
+    __slots__ = ("registry", "local", "index", "bounds", "sum_index")
+
+    def __init__(self, registry, index, bounds):
+        """
+        Bucketed distribution (e.g. latency in milliseconds). Create it with MetricsRegistry.histogram().
+        """
+        self.registry = registry
+        self.local = registry.local
+        self.index = index
+        self.bounds = bounds
+        self.sum_index = index + len(bounds) + 1
+
+    def observe(self, value):
+        try:
+            shard = self.local.shard
+        except AttributeError:  # First record from this thread
+            shard = self.registry._shard()
+        shard[self.index + bisect.bisect_left(self.bounds, value)] += 1
+        shard[self.sum_index] += value
+
+    def value(self):
+        """
+        Returns:
+            dict: Per-bucket counts (the last one above the highest bound), total count and sum.
+        """
+        counts = [self.registry._total(self.index + i) for i in range(len(self.bounds) + 1)]
+        return {"buckets": counts, "count": sum(counts), "sum": self.registry._total(self.sum_index)}
+
+    def quantile(self, q, value=None):
+        """
+        Estimate a quantile by interpolating inside the bucket that holds it.
+
+        Args:
+            q (float): Quantile (0.5 for the median).
+            value (dict): A result of value(), to avoid reading the counters again.
+
+        Returns:
+            float: The estimate, or None without observations. Values above the highest bound report that bound.
+        """
+        value = value or self.value()
+        if not value["count"]:
+            return None
+        rank = q * value["count"]
+        seen = 0
+        for i, count in enumerate(value["buckets"]):
+            if count and seen + count >= rank:
+                if i == len(self.bounds):
+                    return self.bounds[-1]
+                low = self.bounds[i - 1] if i else 0.0
+                return low + (self.bounds[i] - low) * (rank - seen) / count
+            seen += count
+        return self.bounds[-1]
+
+
+class MetricsRegistry:
+    def __init__(self, prefix="iiot"):
+        """
+        Counters and histograms for hot paths. Every thread accumulates into its own preallocated
+        list of slots, so recording is a thread-local list increment with no lock; collection sums
+        the per-thread lists. Counts from threads that have exited are kept.
+
+        Gauges and collectors are callbacks evaluated only when metrics are collected.
+
+        Args:
+            prefix (str): Prefix of every metric name in the Prometheus output.
+        """
+        self.prefix = prefix
+        self.size = 0  # Slots allocated so far
+        self.shards = []  # One slot list per thread that has recorded anything
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.metrics = {}  # (name, sorted labels) -> Counter or Histogram
+        self.families = {}  # name -> (type, help)
+        self.collectors = []
+        self.logger = logging.getLogger(__name__)
+
+    def _shard(self):
+        try:
+            return self.local.shard
+        except AttributeError:
+            with self.lock:
+                shard = self.local.shard = [0] * self.size
+                self.shards.append(shard)
+            return shard
+
+    def _allocate(self, slots):
+        # Caller holds the lock. Existing shards grow before the new slots are handed out.
+        index = self.size
+        self.size += slots
+        for shard in self.shards:
+            shard.extend([0] * slots)
+        return index
+
+    def _total(self, index):
+        return sum(shard[index] for shard in list(self.shards))
+
+    def _register(self, kind, name, help, labels, create):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            metric = self.metrics.get(key)
+            if metric is None:
+                family = self.families.setdefault(name, (kind, help))
+                if family[0] != kind:
+                    raise ValueError(f"Metric {name} is already registered as a {family[0]}")
+                metric = self.metrics[key] = create()
+            return metric
+
+    def counter(self, name, help="", **labels):
+        """
+        Return the counter for a name and label set, creating it on first use.
+
+        Args:
+            name (str): Metric name (e.g. 'handler_calls_total').
+            help (str): Description for the Prometheus output.
+            **labels: Label values (e.g. component='led').
+
+        Returns:
+            Counter: Counter with inc() and value().
+        """
+        return self._register("counter", name, help, labels, lambda: Counter(self, self._allocate(1)))
+
+    def histogram(self, name, help="", buckets=LATENCY_BUCKETS_MS, **labels):
+        """
+        Return the histogram for a name and label set, creating it on first use.
+
+        Args:
+            name (str): Metric name (e.g. 'handler_latency_ms').
+            help (str): Description for the Prometheus output.
+            buckets (tuple): Increasing bucket upper bounds.
+            **labels: Label values.
+
+        Returns:
+            Histogram: Histogram with observe(), value() and quantile().
+        """
+        bounds = tuple(buckets)
+        return self._register("histogram", name, help, labels,
+                              lambda: Histogram(self, self._allocate(len(bounds) + 2), bounds))
+
+    def instrument(self, fn, name, **labels):
+        """
+        Wrap a callable to count its calls and errors and record its latency.
+
+        Metrics: '<name>_calls_total', '<name>_errors_total' (exceptions, re-raised) and '<name>_latency_ms'.
+
+        Args:
+            fn (callable): Function to wrap.
+            name (str): Metric name prefix (e.g. 'handler').
+            **labels: Label values (e.g. component='led').
+
+        Returns:
+            callable: Wrapper returning fn's result.
+        """
+        calls = self.counter(f"{name}_calls_total", f"Calls of each {name}", **labels)
+        errors = self.counter(f"{name}_errors_total", f"Calls of each {name} that raised", **labels)
+        latency = self.histogram(f"{name}_latency_ms", f"Run time of each {name} in milliseconds", **labels)
+
+        perf_counter = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                calls.inc()
+                latency.observe((perf_counter() - start) * 1000)
+
+        wrapper.__wrapped__ = fn
+        return wrapper
+
+    def gauge(self, name, fn, help="", **labels):
+        """
+        Report the current value of fn() under a name and label set at each collection.
+
+        Args:
+            name (str): Metric name.
+            fn (callable): Returns a number.
+            help (str): Description for the Prometheus output.
+            **labels: Label values.
+        """
+        self.add_collector(lambda: [(name, "gauge", labels, fn())], {name: help})
+
+    def add_report(self, name, report, label=None, help=""):
+        """
+        Export the numeric fields of a component's report() dict as gauges named '<name>_<field>'.
+
+        Args:
+            name (str): Metric name prefix (e.g. 'dispatch').
+            report (callable): Returns {field: number}, or with label set {label value: {field: number}}.
+            label (str): Label name for the keys of a nested report (e.g. 'component').
+            help (str): Description for the Prometheus output.
+        """
+        def collect():
+            data = report()
+            rows = data.items() if label is not None else [(None, data)]
+            samples = []
+            for key, fields in rows:
+                labels = {label: key} if label is not None else {}
+                for field, value in fields.items():
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        samples.append((f"{name}_{field}", "gauge", labels, value))
+            return samples
+
+        self.add_collector(collect, {None: help})
+
+    def add_collector(self, fn, help=None):
+        """
+        Add a callback evaluated at each collection.
+
+        Args:
+            fn (callable): Returns an iterable of (name, type, labels, value) samples; type is 'counter' or 'gauge'.
+            help (dict): Metric name to description.
+        """
+        with self.lock:
+            self.collectors.append((fn, help or {}))
+
+    def collect(self):
+        """
+        Read every metric.
+
+        Returns:
+            list: (name, type, help, labels, value) tuples; histogram values are dicts from Histogram.value().
+        """
+        with self.lock:
+            metrics = list(self.metrics.items())
+            collectors = list(self.collectors)
+        samples = []
+        for (name, labels), metric in metrics:
+            kind, help = self.families[name]
+            samples.append((name, kind, help, dict(labels), metric.value()))
+        for fn, helps in collectors:
+            try:
+                for name, kind, labels, value in fn():
+                    samples.append((name, kind, helps.get(name, helps.get(None, "")), labels, value))
+            except Exception as e:
+                self.logger.error(f"Metrics collector failed: {e}")
+        return samples
+
+    def snapshot(self):
+        """
+        Return every metric in a JSON-friendly form.
+
+        Returns:
+            dict: Metric name to a list of {'labels', 'value'} entries. Histograms report
+            count, sum, p50, p99 and per-bucket counts instead of a single value.
+        """
+        result = {}
+        for name, kind, _, labels, value in self.collect():
+            if kind == "histogram":
+                metric = self.metrics[(name, tuple(sorted(labels.items())))]
+                p50, p99 = metric.quantile(0.5, value), metric.quantile(0.99, value)
+                value = {"count": value["count"], "sum": round(value["sum"], 3),
+                         "p50": round(p50, 3) if p50 is not None else None,
+                         "p99": round(p99, 3) if p99 is not None else None,
+                         "buckets": value["buckets"]}
+            result.setdefault(name, []).append({"labels": labels, "value": value})
+        return result
+
+    def prometheus(self):
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: Exposition text.
+        """
+        lines = []
+        described = set()
+        for name, kind, help, labels, value in sorted(self.collect(), key=lambda sample: sample[0]):
+            full = f"{self.prefix}_{name}"
+            if full not in described:
+                described.add(full)
+                if help:
+                    lines.append(f"# HELP {full} {help}")
+                lines.append(f"# TYPE {full} {kind}")
+            if kind != "histogram":
+                lines.append(f"{full}{_labels(labels)} {value}")
+                continue
+            bounds = self.metrics[(name, tuple(sorted(labels.items())))].bounds
+            cumulative = 0
+            for bound, count in zip(bounds + ("+Inf",), value["buckets"]):
+                cumulative += count
+                lines.append(f"{full}_bucket{_labels(dict(labels, le=bound))} {cumulative}")
+            lines.append(f"{full}_sum{_labels(labels)} {value['sum']}")
+            lines.append(f"{full}_count{_labels(labels)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+
+class MetricsPublisher:
+    def __init__(self, registry, client, topic, interval=60, textfile=None, scheduler=None):
+        """
+        Publish a metrics snapshot periodically, and optionally keep a Prometheus textfile up to date
+        (for node_exporter's textfile collector).
+
+        Args:
+            registry (MetricsRegistry): Metrics to publish.
+            client: Client with a publish(topic, payload) method.
+            topic (str): Metrics topic.
+            interval (float): Seconds between snapshots.
+            textfile (str): Path of the Prometheus textfile. None disables it.
+            scheduler (Scheduler): Scheduler running the snapshots. Defaults to the shared scheduler.
+        """
+        self.registry = registry
+        self.client = client
+        self.topic = topic
+        self.interval = interval
+        self.textfile = textfile
+        self.scheduler = scheduler or get_default_scheduler()
+        self.job = None
+        self.logger = logging.getLogger(__name__)
+
+    def start(self):
+        """
+        Start the snapshot job.
+        """
+        self.job = self.scheduler.every(self.interval, self.publish, name="metrics")
+
+    def publish(self):
+        """
+        Publish one snapshot and rewrite the textfile.
+        """
+        try:
+            self.client.publish(self.topic, json.dumps({"ts": round(time.time(), 3), "metrics": self.registry.snapshot()}))
+        except Exception as e:
+            self.logger.error(f"Failed to publish metrics: {e}")
+        if self.textfile:
+            self.write_textfile()
+
+    def write_textfile(self):
+        """
+        Write the Prometheus textfile atomically (write a temporary file, then rename it into place).
+        """
+        directory = os.path.dirname(self.textfile)
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temporary = f"{self.textfile}.{os.getpid()}.tmp"
+            with open(temporary, "w") as f:
+                f.write(self.registry.prometheus())
+            os.replace(temporary, self.textfile)
+        except OSError as e:
+            self.logger.error(f"Failed to write metrics textfile {self.textfile}: {e}")
+
+    def stop(self):
+        """
+        Cancel the snapshot job.
+        """
+        if self.job is not None:
+            self.job.cancel()
+            self.job = None
+
+
+_default_registry = None
+_default_lock = threading.Lock()
+
+
+def get_default_registry():
+    """
+    Return the process-wide metrics registry, creating it on first use.
+
+    Returns:
+        MetricsRegistry: Shared registry used by the HAL and by components not given one.
+    """
+    global _default_registry
+    with _default_lock:
+        if _default_registry is None:
+            _default_registry = MetricsRegistry()
+        return _default_registry
@@ -0,0 +1,318 @@
+import os
+import struct
+import threading
+import time
+import logging
+
+# Record layout: topic length, payload length, qos, retain, then topic and payload bytes
+_HEADER = struct.Struct("<HIBB")
+
+DROP_OLDEST = "oldest"  # Delete the oldest segment to make room
+DROP_NEWEST = "newest"  # Refuse new records while the buffer is full
+
+
+class OfflineBuffer:
+    def __init__(self, directory, max_bytes=16 * 1024 * 1024, segment_bytes=1024 * 1024,
+                 drop_policy=DROP_OLDEST, drain_rate=50):
+        """
+        Initialize a bounded on-disk store-and-forward buffer made of append-only segment files.
+
+        Args:
+            directory (str): Directory holding the segment files.
+            max_bytes (int): Maximum total size of all segments.
+            segment_bytes (int): Size at which the active segment is closed and a new one started.
+            drop_policy (str): 'oldest' to discard the oldest segment when full, 'newest' to refuse new records.
+            drain_rate (float): Maximum records per second replayed after reconnecting.
+        """
+        if drop_policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.drop_policy = drop_policy
+        self.drain_rate = drain_rate
+        self.logger = logging.getLogger(__name__)
+        self.lock = threading.Lock()
+        self.segments = []  # [sequence, size in bytes, record count], oldest first
+        self.writer = None  # File handle of the active (newest) segment
+        self.read_offset = 0  # Position of the next record to replay in the oldest segment
+        self.drain_thread = None
+        self.draining = False  # Set under the lock while a drain thread owns the replay
+        self.stop_event = threading.Event()
+        self.stats = {"buffered": 0, "dropped": 0, "replayed": 0, "replay_seconds": 0.0}
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _path(self, sequence):
+        return os.path.join(self.directory, f"{sequence:08d}.seg")
+
+    def _load(self):
+        # Pick up segments left over from a previous run
+        for name in sorted(os.listdir(self.directory)):
+            if name.endswith(".seg"):
+                path = os.path.join(self.directory, name)
+                count, size = self._count_records(path)
+                if size < os.path.getsize(path):
+                    # A crash mid-append leaves a torn record at the end: cut the segment back to the last whole one
+                    self.logger.warning(f"Truncating torn record at the end of offline buffer segment {name}")
+                    with open(path, "r+b") as f:
+                        f.truncate(size)
+                self.segments.append([int(name[:-4]), size, count])
+        pending = sum(segment[2] for segment in self.segments)
+        if pending:
+            self.logger.info(f"Offline buffer holds {pending} records from a previous run")
+
+    def _count_records(self, path):
+        # Return the number of complete records and the size they take up from the start of the file
+        count = 0
+        offset = 0
+        file_size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            while True:
+                header = f.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    return count, offset
+                topic_len, payload_len, _, _ = _HEADER.unpack(header)
+                end = offset + _HEADER.size + topic_len + payload_len
+                if end > file_size:
+                    return count, offset
+                f.seek(end)
+                offset = end
+                count += 1
+
+    def total_bytes(self):
+        """
+        Return the size of all buffered segments.
+
+        Returns:
+            int: Total size in bytes.
+        """
+        return sum(segment[1] for segment in self.segments)
+
+    def is_empty(self):
+        """
+        Check whether any records are waiting to be replayed.
+
+        Returns:
+            bool: True if nothing is buffered.
+        """
+        with self.lock:
+            return not any(segment[2] for segment in self.segments)
+
+    def append(self, topic, payload, qos=0, retain=False):
+        """
+        Store a message for later delivery.
+
+        Args:
+            topic (str): Topic the message is meant for.
+            payload (str or bytes): Message payload.
+            qos (int): MQTT quality of service.
+            retain (bool): Whether the broker should retain the message.
+
+        Returns:
+            bool: True if the message was stored.
+        """
+        topic_bytes = topic.encode("utf-8")
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        record = _HEADER.pack(len(topic_bytes), len(payload), qos, int(retain)) + topic_bytes + payload
+
+        with self.lock:
+            if not self._make_room(len(record)):
+                self.stats["dropped"] += 1
+                return False
+            if self.writer is None or self.segments[-1][1] + len(record) > self.segment_bytes:
+                self._rotate()
+            self.writer.write(record)
+            self.writer.flush()
+            self.segments[-1][1] += len(record)
+            self.segments[-1][2] += 1
+            self.stats["buffered"] += 1
+            return True
+
+    def _make_room(self, size):
+        while self.total_bytes() + size > self.max_bytes:
+            if self.drop_policy == DROP_NEWEST or len(self.segments) <= 1:
+                return False
+            sequence, _, records = self.segments.pop(0)
+            self.read_offset = 0
+            os.remove(self._path(sequence))
+            self.stats["dropped"] += records
+            self.logger.warning(f"Offline buffer full, dropped {records} oldest records")
+        return True
+
+    def _rotate(self):
+        if self.writer is not None:
+            self.writer.close()
+        sequence = self.segments[-1][0] + 1 if self.segments else 1
+        self.writer = open(self._path(sequence), "ab")
+        self.segments.append([sequence, 0, 0])
+
+    def _next_record(self):
+        # Return (topic, payload, qos, retain, (segment sequence, next offset)) of the oldest record, or None if drained
+        with self.lock:
+            while self.segments:
+                sequence, size, _ = self.segments[0]
+                if self.read_offset < size:
+                    with open(self._path(sequence), "rb") as f:
+                        f.seek(self.read_offset)
+                        topic_len, payload_len, qos, retain = _HEADER.unpack(f.read(_HEADER.size))
+                        topic = f.read(topic_len).decode("utf-8")
+                        payload = f.read(payload_len)
+                    end = self.read_offset + _HEADER.size + topic_len + payload_len
+                    return topic, payload, qos, bool(retain), (sequence, end)
+                # Segment fully replayed
+                if len(self.segments) == 1 and self.writer is not None:
+                    self.writer.close()
+                    self.writer = None
+                self.segments.pop(0)
+                self.read_offset = 0
+                os.remove(self._path(sequence))
+            return None
+
+    def _advance(self, position):
+        sequence, offset = position
+        with self.lock:
+            # The segment may have been dropped to make room while the record was being published;
+            # its offset would then land mid-record in the new oldest segment
+            if self.segments and self.segments[0][0] == sequence:
+                self.read_offset = offset
+                self.segments[0][2] -= 1
+                self.stats["replayed"] += 1
+
+    def start_drain(self, client, on_done=None):
+        """
+        Replay buffered messages in the background at the configured rate.
+
+        Args:
+            client: Client with a publish(topic, payload, qos, retain) method.
+            on_done (callable): Called with the buffer report once the buffer is empty.
+        """
+        with self.lock:
+            self.stop_event.clear()  # A drain still running keeps going rather than exiting on a stale stop
+            if self.draining:
+                return
+            self.draining = True
+        self.drain_thread = threading.Thread(target=self._drain, args=(client, on_done), daemon=True)
+        self.drain_thread.start()
+
+    def stop_drain(self):
+        """
+        Stop replaying, e.g. because the connection dropped again.
+        """
+        self.stop_event.set()
+
+    def _drain(self, client, on_done):
+        period = 1.0 / self.drain_rate if self.drain_rate else 0
+        start = time.monotonic()
+        deadline = start
+        replayed = 0
+        exited = False  # Set once a normal exit has released the drain under the lock
+        try:
+            while True:
+                record = None if self.stop_event.is_set() else self._next_record()
+                if record is None:
+                    with self.lock:
+                        # Re-check before exiting: a record appended since the last read would otherwise
+                        # wait for the next reconnect, as publishers only start a drain when none is running
+                        if self.stop_event.is_set() or not any(segment[2] for segment in self.segments):
+                            self.draining = False
+                            exited = True
+                            break
+                    continue
+                topic, payload, qos, retain, position = record
+                result = client.publish(topic, payload, qos=qos, retain=retain)
+                if getattr(result, "rc", 0) != 0:
+                    self.logger.warning("Replay interrupted, keeping remaining records buffered")
+                    with self.lock:
+                        self.draining = False
+                    exited = True
+                    break
+                self._advance(position)
+                replayed += 1
+                deadline += period
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    self.stop_event.wait(delay)
+        except Exception as e:
+            self.logger.error(f"Replay failed, keeping remaining records buffered: {e}")
+        finally:
+            if not exited:
+                # Otherwise start_drain() would see a drain that no longer runs and never start another
+                with self.lock:
+                    self.draining = False
+
+        elapsed = time.monotonic() - start
+        with self.lock:
+            self.stats["replay_seconds"] += elapsed
+        if replayed:
+            self.logger.info(f"Replayed {replayed} buffered messages in {elapsed:.1f} s ({replayed / max(elapsed, 1e-9):.1f} msg/s)")
+        if on_done is not None and self.is_empty():
+            on_done(self.report())
+
+    def report(self):
+        """
+        Return buffer occupancy and replay counters.
+
+        Returns:
+            dict: Buffered, dropped and replayed counts, pending records, size and replay throughput.
+        """
+        with self.lock:
+            stats = dict(self.stats)
+            stats["pending"] = sum(segment[2] for segment in self.segments)
+            stats["bytes"] = self.total_bytes()
+        seconds = stats.pop("replay_seconds")
+        stats["replay_rate"] = round(stats["replayed"] / seconds, 1) if seconds else 0.0
+        return stats
+
+    def close(self):
+        """
+        Stop replaying and close the active segment. Unsent records stay on disk for the next run.
+        """
+        self.stop_drain()
+        with self.lock:
+            if self.writer is not None:
+                self.writer.close()
+                self.writer = None
+
+
+class BufferedClient:
+    def __init__(self, client, buffer, on_drained=None, ordered=True):
+        """
+        Wrap a client so messages published while offline go to the offline buffer.
+
+        Args:
+            client: Client with publish() and is_connected() methods.
+            buffer (OfflineBuffer): Buffer that stores messages until the connection is back.
+            on_drained (callable): Called with the buffer report when a drain started here empties the buffer.
+            ordered (bool): Queue behind older buffered records while connected. False publishes right away
+                whenever connected (for priority messages such as alerts) and only buffers while offline.
+        """
+        self._client = client
+        self._buffer = buffer
+        self._on_drained = on_drained
+        self._ordered = ordered
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        """
+        Publish a message, or buffer it if the broker is unreachable or a replay is pending.
+
+        Args:
+            topic (str): Topic to publish to.
+            payload (str or bytes): Message payload.
+            qos (int): MQTT quality of service.
+            retain (bool): Whether the broker should retain the message.
+        """
+        # Keep ordering: while older records wait for replay, new ones queue behind them
+        if self._client.is_connected() and (not self._ordered or self._buffer.is_empty()):
+            result = self._client.publish(topic, payload, qos=qos, retain=retain)
+            if getattr(result, "rc", 0) == 0:
+                return result
+        self._buffer.append(topic, payload if payload is not None else b"", qos, retain)
+        if self._client.is_connected():
+            # Connected but buffered (a failed publish or a backlog): make sure a drain is running
+            self._buffer.start_drain(self._client, on_done=self._on_drained)
+        return None
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
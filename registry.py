@@ -0,0 +1,132 @@
+import threading
+import logging
+
+
+class SensorRegistry:
+    def __init__(self):
+        """
+        Create and cache one sensor instance per (component, pin set), so sensors of the same type on
+        different pins run their own monitoring sessions side by side.
+        """
+        self.types = {}
+        self.instances = {}  # (component, pins) -> sensor
+        self.claimed = {}  # pin -> (component, pins) of the sensor using it
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def register(self, component, factory, pins, stop=None):
+        """
+        Register a sensor type.
+
+        Args:
+            component (str): Component name used in commands (e.g. 'DHT11').
+            factory (callable): Returns a new, not yet set up sensor instance.
+            pins (tuple): Command data fields holding the sensor's pins, in the order setup() takes them.
+            stop (callable): Called with an instance to end its session and release its pins.
+        """
+        self.types[component] = {"factory": factory, "pins": tuple(pins), "stop": stop}
+
+    def get(self, component, params):
+        """
+        Return the sensor for a command, creating and setting it up on first use.
+
+        Args:
+            component (str): Registered component name.
+            params (dict): Command data containing the pin fields.
+
+        Returns:
+            The sensor instance for this component and pin set.
+
+        Raises:
+            ValueError: If the component is not registered or a pin is in use by another sensor.
+        """
+        spec = self.types.get(component)
+        if spec is None:
+            raise ValueError(f"No sensor type registered for component {component}")
+        pins = tuple(params[field] for field in spec["pins"])
+        key = (component, pins)
+        with self.lock:
+            sensor = self.instances.get(key)
+            if sensor is not None:
+                return sensor
+            for pin in pins:
+                owner = self.claimed.get(pin)
+                if owner is not None:
+                    raise ValueError(f"Pin {pin} is already used by {owner[0]} on pins {list(owner[1])}")
+            sensor = spec["factory"]()
+            sensor.setup(*pins)
+            self.instances[key] = sensor
+            for pin in pins:
+                self.claimed[pin] = key
+        self.logger.info(f"Created {component} sensor on pins {list(pins)} ({self.count(component)} active)")
+        return sensor
+
+    def remove(self, component, params):
+        """
+        Stop a sensor and release its pins.
+
+        Args:
+            component (str): Registered component name.
+            params (dict): Command data containing the pin fields.
+
+        Returns:
+            bool: True if a sensor was removed.
+        """
+        spec = self.types.get(component)
+        if spec is None:
+            return False
+        key = (component, tuple(params[field] for field in spec["pins"]))
+        with self.lock:
+            sensor = self.instances.pop(key, None)
+            if sensor is None:
+                return False
+            for pin in key[1]:
+                self.claimed.pop(pin, None)
+        self._stop(component, sensor)
+        return True
+
+    def _stop(self, component, sensor):
+        stop = self.types[component]["stop"]
+        if stop is None:
+            return
+        try:
+            stop(sensor)
+        except Exception as e:
+            self.logger.error(f"Failed to stop {component} sensor: {e}")
+
+    def count(self, component=None):
+        """
+        Count active sensors.
+
+        Args:
+            component (str): Only count this component. None counts all.
+
+        Returns:
+            int: Number of sensor instances.
+        """
+        with self.lock:
+            return sum(1 for name, _ in self.instances if component is None or name == component)
+
+    def report(self):
+        """
+        List the active sensors.
+
+        Returns:
+            dict: Component name to the pin sets of its instances.
+        """
+        report = {}
+        with self.lock:
+            for component, pins in self.instances:
+                report.setdefault(component, []).append(list(pins))
+        return report
+
+    def close(self):
+        """
+        Stop every sensor and clear the registry.
+        """
+        with self.lock:
+            instances = list(self.instances.items())
+            self.instances.clear()
+            self.claimed.clear()
+        for (component, _), sensor in instances:
+            self._stop(component, sensor)
@@ -0,0 +1,364 @@
+import heapq
+import itertools
+import queue
+import threading
+import time
+import logging
+from timing import SKIP, RESYNC, POLICIES, JITTER_BUCKETS_MS, next_deadline, sleep_until
+
+
+class Job:
+    def __init__(self, scheduler, fn, interval, duration=None, name=None, on_done=None, policy=None):
+        """
+        A periodic job run by a Scheduler. Create jobs with Scheduler.every().
+
+        Args:
+            scheduler (Scheduler): Scheduler running the job.
+            fn (callable): Called with no arguments on every tick. Returning False ends the job.
+            interval (float): Time (in seconds) between runs.
+            duration (float): Total time (in seconds) the job runs for. None runs until cancelled.
+            name (str): Name used in logs.
+            on_done (callable): Called with the job once it has finished or been cancelled.
+            policy (str): What to do with ticks the timer fell behind on (see timing.py). Defaults to the scheduler's.
+        """
+        self.scheduler = scheduler
+        self.interval = interval
+        self.name = name or getattr(fn, "__qualname__", "job")
+        self.policy = policy or scheduler.policy
+        if self.policy not in POLICIES:
+            raise ValueError(f"Unknown timing policy: {self.policy}")
+        self.fn = fn
+        self.overrun_counter = None
+        self.missed_counter = None
+        self.jitter = None
+        if scheduler.metrics is not None:
+            self.fn = scheduler.metrics.instrument(fn, "job", job=self.name)
+            self.overrun_counter = scheduler.metrics.counter(
+                "job_overruns_total", "Ticks skipped because the previous run was still going", job=self.name)
+            self.missed_counter = scheduler.metrics.counter(
+                "job_missed_total", "Ticks dropped because the timer fell behind", job=self.name)
+            self.jitter = scheduler.metrics.histogram(
+                "job_jitter_ms", "Time from a tick's deadline to its run starting", JITTER_BUCKETS_MS, job=self.name)
+        self.callbacks = [on_done] if on_done is not None else []
+        self.started = scheduler.clock()
+        self.end_time = None if duration is None else self.started + duration
+        self.next_run = self.started
+        self.runs = 0
+        self.overruns = 0  # Ticks skipped because the previous run was still going
+        self.missed = 0  # Ticks dropped under the 'skip' policy
+        self.running = False
+        self.cancelled = False
+        self.done = threading.Event()
+
+    def cancel(self):
+        """
+        Stop the job. A run already in progress is allowed to finish.
+        """
+        self.scheduler.cancel(self)
+
+    def reschedule(self, interval):
+        """
+        Change the interval, taking effect from the next run.
+
+        Args:
+            interval (float): New time (in seconds) between runs.
+        """
+        self.scheduler.reschedule(self, interval)
+
+    def extend(self, seconds):
+        """
+        Extend the job's end time.
+
+        Args:
+            seconds (float): Extra time (in seconds) to run for.
+        """
+        if self.end_time is not None:
+            self.end_time += seconds
+
+    def add_done_callback(self, fn):
+        """
+        Call fn with the job once it has finished. Called right away if it already has.
+
+        Args:
+            fn (callable): Called with the job.
+        """
+        with self.scheduler.condition:
+            if not self.done.is_set():
+                self.callbacks.append(fn)
+                return
+        fn(self)
+
+    def remaining(self):
+        """
+        Return the time left before the job ends.
+
+        Returns:
+            float: Seconds until the end time, or None if the job runs until cancelled.
+        """
+        if self.end_time is None:
+            return None
+        return max(0.0, self.end_time - self.scheduler.clock())
+
+    def wait(self, timeout=None):
+        """
+        Block until the job has finished.
+
+        Args:
+            timeout (float): Maximum time (in seconds) to wait.
+
+        Returns:
+            bool: True if the job finished.
+        """
+        return self.done.wait(timeout)
+
+    def is_active(self):
+        """
+        Check whether the job is still scheduled.
+
+        Returns:
+            bool: True until the job finishes or is cancelled.
+        """
+        return not self.done.is_set()
+
+
+class Scheduler:
+    def __init__(self, workers=2, metrics=None, policy=SKIP, spin=0.0, clock=time.monotonic):
+        """
+        Run periodic jobs from a heap ordered by next run time, on a small fixed worker pool.
+
+        The thread count stays at one timer thread plus `workers`, however many jobs are active.
+        Runs are due on a fixed grid from each job's start, so the period does not drift by run time.
+
+        Args:
+            workers (int): Number of worker threads executing job ticks.
+            metrics (MetricsRegistry): Registry recording runs, errors, run time, overruns, missed ticks
+                and jitter per job name. None disables them.
+            policy (str): Default for ticks the timer fell behind on: 'skip', 'catch_up' or 'resync'.
+            spin (float): Seconds the timer busy-waits before each deadline instead of sleeping.
+            clock (callable): Monotonic clock, in seconds, that run times refer to.
+        """
+        self.workers = workers
+        self.metrics = metrics
+        self.policy = policy
+        self.spin = spin
+        self.clock = clock
+        self.heap = []  # (next run, sequence, job)
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.ready = queue.Queue()
+        self.threads = []
+        self.active = set()
+        self.stopped = False
+        self.logger = logging.getLogger(__name__)
+
+    def start(self):
+        """
+        Start the timer thread and worker pool.
+        """
+        if self.threads:
+            return
+        self.threads.append(threading.Thread(target=self._timer, name="scheduler-timer", daemon=True))
+        for i in range(self.workers):
+            self.threads.append(threading.Thread(target=self._worker, name=f"scheduler-worker-{i}", daemon=True))
+        for thread in self.threads:
+            thread.start()
+
+    def every(self, interval, fn, duration=None, name=None, on_done=None, policy=None):
+        """
+        Schedule fn to run every interval seconds, starting now.
+
+        Args:
+            interval (float): Time (in seconds) between runs.
+            fn (callable): Called with no arguments on every tick. Returning False ends the job.
+            duration (float): Total time (in seconds) to run for. None runs until cancelled.
+            name (str): Name used in logs.
+            on_done (callable): Called with the job once it has finished or been cancelled.
+            policy (str): What to do with ticks the timer fell behind on. Defaults to the scheduler's.
+
+        Returns:
+            Job: Handle to stop, reschedule or wait for the job.
+        """
+        self.start()
+        job = Job(self, fn, interval, duration, name, on_done, policy)
+        with self.condition:
+            self.active.add(job)
+            heapq.heappush(self.heap, (job.next_run, next(self.sequence), job))
+            self.condition.notify()
+        self.logger.debug(f"Scheduled {job.name} every {interval} s")
+        return job
+
+    def after(self, delay, fn, name=None):
+        """
+        Run fn once, delay seconds from now.
+
+        Args:
+            delay (float): Time (in seconds) to wait before running.
+            fn (callable): Called with no arguments.
+            name (str): Name used in logs.
+
+        Returns:
+            Job: Handle to cancel or wait for the call.
+        """
+        def once():
+            fn()
+            return False  # End the job after a single run
+
+        self.start()
+        job = Job(self, once, delay, None, name or getattr(fn, "__qualname__", "job"))
+        with self.condition:
+            job.next_run = job.started + delay
+            self.active.add(job)
+            heapq.heappush(self.heap, (job.next_run, next(self.sequence), job))
+            self.condition.notify()
+        return job
+
+    def cancel(self, job):
+        """
+        Stop a job.
+
+        Args:
+            job (Job): Job to stop.
+        """
+        with self.condition:
+            if job.cancelled or job.done.is_set():
+                return
+            job.cancelled = True
+            running = job.running
+        if not running:
+            self._finish(job)
+
+    def reschedule(self, job, interval):
+        """
+        Change a job's interval without restarting it.
+
+        Args:
+            job (Job): Job to change.
+            interval (float): New time (in seconds) between runs.
+        """
+        with self.condition:
+            job.interval = interval
+            job.next_run = min(job.next_run, self.clock() + interval)
+            heapq.heappush(self.heap, (job.next_run, next(self.sequence), job))
+            self.condition.notify()
+
+    def jobs(self):
+        """
+        Return the active jobs.
+
+        Returns:
+            list: Jobs that have not finished yet.
+        """
+        with self.condition:
+            return list(self.active)
+
+    def _timer(self):
+        while True:
+            with self.condition:
+                while not self.stopped:
+                    now = self.clock()
+                    if self.heap and self.heap[0][0] - now <= self.spin:
+                        break
+                    self.condition.wait(self.heap[0][0] - now - self.spin if self.heap else None)
+                if self.stopped:
+                    return
+                due = self.heap[0][0]
+                job = None  # Close enough to spin for, which is done without holding the lock
+                finished = False
+                if due <= now:
+                    due, _, job = heapq.heappop(self.heap)
+                    if job.cancelled or job.done.is_set() or due != job.next_run:
+                        continue  # Cancelled, or a stale entry left behind by reschedule()
+                    if job.end_time is not None and now >= job.end_time:
+                        finished = True
+                    else:
+                        job.next_run, missed = next_deadline(due, job.interval, now, job.policy)
+                        if job.policy == RESYNC and job.next_run <= now:
+                            job.next_run = now + job.interval  # This late run restarts the grid
+                        if missed:
+                            job.missed += missed
+                            if job.missed_counter is not None:
+                                job.missed_counter.inc(missed)
+                        heapq.heappush(self.heap, (job.next_run, next(self.sequence), job))
+                        if job.running:
+                            job.overruns += 1
+                            if job.overrun_counter is not None:
+                                job.overrun_counter.inc()
+                            continue
+                        job.running = True
+            if job is None:
+                sleep_until(due, self.spin, self.clock)
+            elif finished:
+                self._finish(job)
+            else:
+                self.ready.put((job, due))
+
+    def _worker(self):
+        while True:
+            item = self.ready.get()
+            if item is None:
+                return
+            job, due = item
+            if job.jitter is not None:
+                job.jitter.observe((self.clock() - due) * 1000)
+            try:
+                keep_going = job.fn() is not False
+            except Exception as e:
+                keep_going = True
+                self.logger.error(f"Error in scheduled job {job.name}: {e}")
+            with self.condition:
+                job.running = False
+                job.runs += 1
+                stop = job.cancelled or not keep_going
+                if not keep_going:
+                    job.cancelled = True
+            if stop:
+                self._finish(job)
+
+    def _finish(self, job):
+        with self.condition:
+            if job.done.is_set():
+                return
+            job.done.set()
+            self.active.discard(job)
+            callbacks = list(job.callbacks)
+        self.logger.debug(f"Job {job.name} finished after {job.runs} runs")
+        for callback in callbacks:
+            try:
+                callback(job)
+            except Exception as e:
+                self.logger.error(f"Error finishing job {job.name}: {e}")
+
+    def shutdown(self, timeout=None):
+        """
+        Cancel all jobs and stop the scheduler threads.
+
+        Args:
+            timeout (float): Maximum time (in seconds) to wait for each thread.
+        """
+        for job in self.jobs():
+            job.cancel()
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        for _ in range(self.workers):
+            self.ready.put(None)
+        for thread in self.threads:
+            thread.join(timeout)
+
+
+_default_scheduler = None
+_default_lock = threading.Lock()
+
+
+def get_default_scheduler():
+    """
+    Return the process-wide scheduler, creating it on first use.
+
+    Returns:
+        Scheduler: Shared scheduler used when a sensor is not given one.
+    """
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = Scheduler()
+        return _default_scheduler
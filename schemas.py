@@ -0,0 +1,327 @@
+import time
+import threading
+import logging
+
+# Valid BCM GPIO numbers on the Raspberry Pi header
+PIN_RANGE = (0, 27)
+
+_MISSING = object()
+
+# Session control fields shared by the monitoring components (see sessions.py)
+SESSION_FIELDS = {
+    "action": {"type": "str", "default": "start", "choices": ["start", "stop", "update", "extend"]},
+    "seconds": {"type": "float"},  # Time added by 'extend'; negative shortens the session
+}
+
+# One motor of a coordinated stepper move
+STEPPER_MOTOR_FIELDS = {
+    "pins": {"type": "pins", "required": True, "length": 4},
+    "direction": {"type": "str", "choices": ["clockwise", "counterclockwise"]},
+    "steps": {"type": "int", "default": 400, "min": 0},
+    "position": {"type": "int"},
+}
+
+# Declarative command schemas: component -> field -> rule.
+# Rule keys: type ('int', 'float', 'str', 'bool', 'pin', 'pins', 'numbers', 'objects'), required, default,
+# choices, min, max, length (for 'pins'/'numbers'), max_length (for 'str'), fields and max_items (for 'objects').
+COMMAND_SCHEMAS = {
+    "LCD": {
+        "message": {"type": "str", "required": True, "max_length": 32},
+    },
+    "led": {
+        "pin": {"type": "pin", "required": True},
+        "state": {"type": "str", "required": True, "choices": ["ON", "OFF"]},
+    },
+    "stepper_motor": {
+        "action": {"type": "str", "default": "move", "choices": ["move", "goto", "jog", "stop"]},
+        # One motor, or several in 'motors' (each with its own pins, direction, steps and position) moved together
+        "pins": {"type": "pins", "length": 4},
+        "motors": {"type": "objects", "fields": STEPPER_MOTOR_FIELDS, "max_items": 4},
+        # Required by move and jog
+        "direction": {"type": "str", "choices": ["clockwise", "counterclockwise"]},
+        "steps": {"type": "int", "default": 400, "min": 1},  # Passes through the 4-phase sequence (move)
+        "position": {"type": "int"},  # Absolute target in motor steps (goto)
+        "delay": {"type": "float", "default": 10, "min": 0},  # Milliseconds per motor step at cruise speed
+        "accel": {"type": "float", "min": 0},  # Steps per second squared; defaults to STEPPER_CONFIG
+        "profile": {"type": "str", "choices": ["trapezoid", "scurve", "none"]},
+        "duration": {"type": "float", "min": 0},  # Seconds before a jog decelerates; unset jogs until stopped
+        "immediate": {"type": "bool", "default": False},  # Stop without decelerating (stop)
+    },
+    "light": {
+        "pins": {"type": "pins", "required": True, "length": 3},
+        "color": {"type": "numbers", "default": [0, 0, 0], "length": 3, "min": 0, "max": 100},
+    },
+    "servo": {
+        "pin": {"type": "pin", "required": True},
+        "angle": {"type": "int", "required": True, "choices": [0, 90, 180]},
+    },
+    "DHT11": {
+        "pin": {"type": "pin", "required": True},
+        "interval": {"type": "float", "default": 2, "min": 0.1},
+        "duration": {"type": "float", "default": 10, "min": 0},
+        **SESSION_FIELDS,
+    },
+    "Ultrasonic sensor": {
+        "trig_pin": {"type": "pin", "required": True},
+        "echo_pin": {"type": "pin", "required": True},
+        "interval": {"type": "float", "default": 1, "min": 0.05},
+        "duration": {"type": "float", "default": 10, "min": 0},
+        **SESSION_FIELDS,
+    },
+    "PIR_SENSOR": {
+        "pin": {"type": "pin", "required": True},
+        "interval": {"type": "float", "default": 1, "min": 0.01},
+        "duration": {"type": "float", "default": 10, "min": 0},
+        **SESSION_FIELDS,
+    },
+    "LDR Sensor": {
+        "ldr_pin": {"type": "pin", "required": True},
+        "light_pin": {"type": "pin", "required": True},
+        "threshold": {"type": "int", "default": 1000, "min": 0},  # Charge time in microseconds
+        "hysteresis": {"type": "float", "default": 0.1, "min": 0, "max": 0.9},
+        "interval": {"type": "float", "default": 1, "min": 0.1},
+        "duration": {"type": "float", "default": 10, "min": 0},
+        **SESSION_FIELDS,
+    },
+    "Button": {
+        "pin": {"type": "pin", "required": True},
+        "duration": {"type": "float", "default": 10, "min": 0},
+        **SESSION_FIELDS,
+    },
+    "Keypad": {
+        "pin": {"type": "pin", "required": True},
+        "duration": {"type": "float", "default": 10, "min": 0},
+    },
+    "history": {
+        "sensor": {"type": "str", "required": True, "max_length": 64},
+        "key": {"type": "int"},
+        "field": {"type": "str", "max_length": 64},
+        "seconds": {"type": "float", "default": 3600, "min": 1},
+        "bucket": {"type": "float", "default": 60, "min": 1},
+        "start": {"type": "float", "min": 0},
+        "end": {"type": "float", "min": 0},
+        "id": {"type": "str", "max_length": 64},
+    },
+    "session": {
+        "action": {"type": "str", "required": True, "choices": ["list", "stop", "update", "extend"]},
+        "id": {"type": "str", "max_length": 64},
+        "interval": {"type": "float", "min": 0.01},
+        "seconds": {"type": "float"},
+    },
+}
+COMMAND_SCHEMAS["relay"] = COMMAND_SCHEMAS["led"]
+COMMAND_SCHEMAS["buzzer"] = COMMAND_SCHEMAS["led"]
+
+
+class ValidationError(ValueError):
+    """Raised when a command does not match its component schema."""
+
+
+def _to_int(value):
+    if isinstance(value, bool):
+        raise ValueError("boolean is not an integer")
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"{value} is not an integer")
+    return int(value)
+
+
+def _to_float(value):
+    if isinstance(value, bool):
+        raise ValueError("boolean is not a number")
+    return float(value)
+
+
+def _to_bool(value):
+    if isinstance(value, str):
+        if value.lower() in ("true", "on", "1"):
+            return True
+        if value.lower() in ("false", "off", "0"):
+            return False
+        raise ValueError(f"{value!r} is not a boolean")
+    return bool(value)
+
+
+def _to_pin(value):
+    pin = _to_int(value)
+    if not PIN_RANGE[0] <= pin <= PIN_RANGE[1]:
+        raise ValueError(f"pin {pin} outside GPIO range {PIN_RANGE[0]}-{PIN_RANGE[1]}")
+    return pin
+
+
+def _compile_field(name, rule):
+    kind = rule["type"]
+    choices = rule.get("choices")
+    lower, upper = rule.get("min"), rule.get("max")
+    length = rule.get("length")
+    max_length = rule.get("max_length")
+    max_items = rule.get("max_items")
+
+    def check_range(value):
+        if lower is not None and value < lower:
+            raise ValueError(f"{value} is below minimum {lower}")
+        if upper is not None and value > upper:
+            raise ValueError(f"{value} is above maximum {upper}")
+        return value
+
+    def check_length(values):
+        if not isinstance(values, (list, tuple)):
+            raise ValueError("expected a list")
+        if length is not None and len(values) != length:
+            raise ValueError(f"expected {length} values, got {len(values)}")
+        return values
+
+    if kind == "int":
+        convert = lambda value: check_range(_to_int(value))
+    elif kind == "float":
+        convert = lambda value: check_range(_to_float(value))
+    elif kind == "bool":
+        convert = _to_bool
+    elif kind == "pin":
+        convert = _to_pin
+    elif kind == "pins":
+        convert = lambda value: [_to_pin(pin) for pin in check_length(value)]
+    elif kind == "numbers":
+        convert = lambda value: [check_range(_to_float(v)) for v in check_length(value)]
+    elif kind == "objects":
+        validate_item = compile_schema(rule["fields"])
+
+        def convert(value):
+            if not isinstance(value, (list, tuple)) or not value:
+                raise ValueError("expected a non-empty list")
+            if max_items is not None and len(value) > max_items:
+                raise ValueError(f"more than {max_items} items")
+            return [validate_item(item) for item in value]
+    elif kind == "str":
+        def convert(value):
+            if not isinstance(value, str):
+                value = str(value)
+            if max_length is not None and len(value) > max_length:
+                raise ValueError(f"longer than {max_length} characters")
+            return value
+    else:
+        raise ValueError(f"Unknown schema type for field {name}: {kind}")
+
+    if choices is not None:
+        allowed = set(choices)
+        base = convert
+
+        def convert(value):
+            value = base(value)
+            if value not in allowed:
+                raise ValueError(f"{value!r} not one of {choices}")
+            return value
+
+    default = rule.get("default", _MISSING)
+    return name, convert, rule.get("required", False), default
+
+
+def compile_schema(schema):
+    """
+    Compile a declarative component schema into a validator function.
+
+    Args:
+        schema (dict): Mapping of field name to rule.
+
+    Returns:
+        callable: Function taking the command's 'data' dict and returning a normalized copy.
+    """
+    fields = [_compile_field(name, rule) for name, rule in schema.items()]
+
+    def validate(data):
+        if not isinstance(data, dict):
+            raise ValidationError("data is not an object")
+        result = dict(data)  # Unknown fields pass through untouched
+        for name, convert, required, default in fields:
+            value = data.get(name)
+            if value is None:
+                if required:
+                    raise ValidationError(f"missing required field '{name}'")
+                if default is not _MISSING:
+                    result[name] = list(default) if isinstance(default, list) else default
+                continue
+            try:
+                result[name] = convert(value)
+            except (TypeError, ValueError) as e:
+                raise ValidationError(f"invalid '{name}': {e}") from None
+        return result
+
+    return validate
+
+
+class CommandValidator:
+    def __init__(self, schemas=None):
+        """
+        Compile all component schemas once at startup.
+
+        Args:
+            schemas (dict): Mapping of component name to schema. Defaults to COMMAND_SCHEMAS.
+        """
+        self.validators = {
+            component: compile_schema(schema)
+            for component, schema in (schemas or COMMAND_SCHEMAS).items()
+        }
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.logger = logging.getLogger(__name__)
+
+    def validate(self, command):
+        """
+        Validate a command and fill in defaults.
+
+        Args:
+            command (dict): Decoded command with 'component' and 'data' keys.
+
+        Returns:
+            dict: Normalized command.
+
+        Raises:
+            ValidationError: If the command does not match its component schema.
+        """
+        if not isinstance(command, dict):
+            raise ValidationError("command is not an object")
+        component = command.get('component')
+        if not component:
+            raise ValidationError("no component specified")
+        validator = self.validators.get(component)
+        if validator is None:
+            raise ValidationError(f"no schema for component {component}")
+
+        start = time.perf_counter_ns()
+        try:
+            data = validator(command.get('data', {}))
+            ok = True
+        except ValidationError:
+            ok = False
+            raise
+        finally:
+            self._record(component, time.perf_counter_ns() - start, ok)
+        return {**command, "data": data}
+
+    def _record(self, component, elapsed_ns, ok):
+        with self.lock:
+            stats = self.stats.get(component)
+            if stats is None:
+                stats = self.stats[component] = {"count": 0, "invalid": 0, "total_ns": 0, "max_ns": 0}
+            stats["count"] += 1
+            stats["total_ns"] += elapsed_ns
+            stats["max_ns"] = max(stats["max_ns"], elapsed_ns)
+            if not ok:
+                stats["invalid"] += 1
+
+    def report(self):
+        """
+        Return per-component validation cost.
+
+        Returns:
+            dict: Count, invalid count, mean and max validation time (in microseconds) per component.
+        """
+        with self.lock:
+            return {
+                component: {
+                    "count": stats["count"],
+                    "invalid": stats["invalid"],
+                    "mean_us": round(stats["total_ns"] / stats["count"] / 1000, 2),
+                    "max_us": round(stats["max_ns"] / 1000, 2),
+                }
+                for component, stats in self.stats.items()
+            }
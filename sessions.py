@@ -0,0 +1,301 @@
+import json
+import time
+import threading
+import logging
+
+# Actions accepted in a sensor command's data; 'start' is the default
+SESSION_ACTIONS = ("start", "stop", "update", "extend")
+
+# Component name for commands addressing sessions by id, or listing them
+SESSION_COMPONENT = "session"
+
+
+class Session:
+    def __init__(self, session_id, component, pins, interval, duration, handle):
+        """
+        One monitoring session. Create sessions with SessionManager.start().
+
+        Args:
+            session_id (str): Id derived from the component and its pins.
+            component (str): Component name.
+            pins (tuple): Pin values identifying the sensor.
+            interval (float): Sampling interval in seconds, or None for event-driven sensors.
+            duration (float): Requested duration in seconds.
+            handle: Object controlling the running session (a scheduler Job or an EdgeWatch),
+                or None if the start function did not return one.
+        """
+        self.id = session_id
+        self.component = component
+        self.pins = pins
+        self.interval = interval
+        self.handle = handle
+        self.started = time.time()
+        self.expires = time.monotonic() + duration if duration is not None else None
+        self.stopping = False
+
+    def remaining(self):
+        """
+        Return the time left in the session.
+
+        Returns:
+            float: Seconds until the session ends, or None if it runs until stopped.
+        """
+        if self.handle is not None:
+            return self.handle.remaining()
+        if self.expires is None:
+            return None
+        return max(0.0, self.expires - time.monotonic())
+
+    def is_active(self):
+        """
+        Check whether the session is still running.
+
+        Returns:
+            bool: True while the session runs.
+        """
+        if self.handle is not None:
+            return self.handle.is_active()
+        return self.expires is None or time.monotonic() < self.expires
+
+    def describe(self):
+        """
+        Return the session's state for status messages.
+
+        Returns:
+            dict: Id, component, pins, interval, start time and remaining seconds.
+        """
+        remaining = self.remaining() if self.is_active() else 0.0
+        return {
+            "id": self.id,
+            "component": self.component,
+            "pins": list(self.pins),
+            "interval": self.interval,
+            "started": round(self.started, 3),
+            "remaining": round(remaining, 3) if remaining is not None else None,
+        }
+
+
+class SessionManager:
+    def __init__(self, publisher, status_topic):
+        """
+        Track monitoring sessions so they can be stopped, re-timed and extended over MQTT.
+
+        Sensor commands carry an optional 'action' ('start', 'stop', 'update' or 'extend') and are
+        matched to a session by their pins. A start for a sensor that is already running updates the
+        running session instead of starting a second one. Commands for the 'session' component
+        address sessions by id, and 'list' reports every running session. Each change is published
+        to the status topic.
+
+        Args:
+            publisher: Client used to publish session status.
+            status_topic (str): Topic status messages are published to.
+        """
+        self.publisher = publisher
+        self.status_topic = status_topic
+        self.types = {}
+        self.sessions = {}  # id -> running Session
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def register(self, component, start, pins):
+        """
+        Register a component whose commands start monitoring sessions.
+
+        Args:
+            component (str): Component name used in commands (e.g. 'DHT11').
+            start (callable): Called with the command; returns the session handle (a Job or EdgeWatch).
+            pins (list): Command data fields identifying the sensor.
+        """
+        self.types[component] = {"start": start, "pins": tuple(pins)}
+
+    def session_id(self, component, params):
+        """
+        Return the id of the session a sensor command refers to.
+
+        Args:
+            component (str): Registered component name.
+            params (dict): Command data containing the pin fields.
+
+        Returns:
+            str: Session id, e.g. 'dht11-4'.
+        """
+        pins = [str(params[field]) for field in self.types[component]["pins"]]
+        return "-".join([component.lower().replace(" ", "_")] + pins)
+
+    def handle(self, data):
+        """
+        Command handler for registered components and the 'session' component.
+
+        Args:
+            data (dict): Validated command.
+
+        Raises:
+            ValueError: If the component is not registered, or the session does not exist.
+        """
+        component = data['component']
+        params = data.get('data', {})
+        action = params.get('action', "start")
+        if component == SESSION_COMPONENT:
+            if action == "list":
+                self.publish_list()
+                return
+            session = self._get(params.get('id'))
+        else:
+            if component not in self.types:
+                raise ValueError(f"No session type registered for component {component}")
+            if action == "start":
+                self.start(data)
+                return
+            session = self._get(self.session_id(component, params))
+
+        if action == "stop":
+            self.stop(session)
+        elif action == "update":
+            self.update(session, params.get('interval'))
+        elif action == "extend":
+            self.extend(session, params.get('seconds'))
+        else:
+            raise ValueError(f"Unknown session action: {action}")
+
+    def _get(self, session_id):
+        with self.lock:
+            session = self.sessions.get(session_id)
+        if session is None or not session.is_active():
+            raise ValueError(f"No running session {session_id}")
+        return session
+
+    def start(self, data):
+        """
+        Start a session, or update the running one for the same sensor.
+
+        Args:
+            data (dict): Validated sensor command.
+
+        Returns:
+            Session: The new or updated session.
+        """
+        component = data['component']
+        params = data['data']
+        session_id = self.session_id(component, params)
+        interval = params.get('interval')
+        duration = params.get('duration')
+        with self.lock:
+            session = self.sessions.get(session_id)
+        if session is not None and session.is_active():
+            # Idempotent restart: re-time the running session instead of starting another one
+            self._retime(session, interval, duration)
+            self._publish("updated", session)
+            return session
+
+        handle = self.types[component]["start"](data)
+        pins = tuple(params[field] for field in self.types[component]["pins"])
+        session = Session(session_id, component, pins, interval, duration, handle)
+        with self.lock:
+            self.sessions[session_id] = session
+        if handle is not None:
+            handle.add_done_callback(lambda _: self._finished(session))
+        self.logger.info(f"Started session {session_id}")
+        self._publish("started", session)
+        return session
+
+    def _retime(self, session, interval, duration):
+        if interval is not None and interval != session.interval:
+            self._reschedule(session, interval)
+        remaining = session.remaining()
+        if duration is not None and remaining is not None:
+            self._extend(session, duration - remaining)
+
+    def _reschedule(self, session, interval):
+        session.interval = interval
+        if session.handle is not None:
+            session.handle.reschedule(interval)
+
+    def _extend(self, session, seconds):
+        if session.expires is not None:
+            session.expires += seconds
+        if session.handle is not None:
+            session.handle.extend(seconds)
+
+    def stop(self, session):
+        """
+        End a session.
+
+        Args:
+            session (Session): Running session.
+        """
+        session.stopping = True
+        if session.handle is not None:
+            session.handle.cancel()  # The done callback publishes 'stopped'
+        else:
+            self._finished(session)
+
+    def update(self, session, interval):
+        """
+        Change a session's sampling interval without restarting it.
+
+        Args:
+            session (Session): Running session.
+            interval (float): New interval in seconds.
+        """
+        if interval is None:
+            raise ValueError("update needs an 'interval'")
+        self._reschedule(session, interval)
+        self.logger.info(f"Session {session.id} interval set to {interval}s")
+        self._publish("updated", session)
+
+    def extend(self, session, seconds):
+        """
+        Add time to a session.
+
+        Args:
+            session (Session): Running session.
+            seconds (float): Seconds to add to the remaining duration.
+        """
+        if not seconds:
+            raise ValueError("extend needs 'seconds'")
+        self._extend(session, seconds)
+        self.logger.info(f"Session {session.id} extended by {seconds}s")
+        self._publish("extended", session)
+
+    def _finished(self, session):
+        with self.lock:
+            if self.sessions.get(session.id) is not session:
+                return
+            del self.sessions[session.id]
+        self.logger.info(f"Session {session.id} {'stopped' if session.stopping else 'finished'}")
+        self._publish("stopped" if session.stopping else "finished", session)
+
+    def list(self):
+        """
+        Describe the running sessions.
+
+        Returns:
+            list: One dict per running session.
+        """
+        with self.lock:
+            sessions = list(self.sessions.values())
+        return [session.describe() for session in sessions if session.is_active()]
+
+    def publish_list(self):
+        """
+        Publish the running sessions to the status topic.
+        """
+        self._send({"sessions": self.list()})
+
+    def _publish(self, event, session):
+        self._send({"session": session.describe(), "event": event})
+
+    def _send(self, message):
+        try:
+            self.publisher.publish(self.status_topic, json.dumps(message))
+        except Exception as e:
+            self.logger.error(f"Failed to publish session status: {e}")
+
+    def close(self):
+        """
+        Stop every running session.
+        """
+        with self.lock:
+            sessions = list(self.sessions.values())
+        for session in sessions:
+            self.stop(session)
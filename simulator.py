@@ -0,0 +1,690 @@
+import random
+import threading
+import time
+import logging
+from collections import Counter, deque
+
+
+class OpRecorder:
+    def __init__(self, max_entries=100000):
+        """
+        Timestamped log of every simulated hardware operation, so benchmarks and tests can count
+        and assert what a module did.
+
+        Args:
+            max_entries (int): Entries kept; the oldest are dropped beyond it. Counts cover every operation.
+        """
+        self.entries = deque(maxlen=max_entries)  # (perf_counter_ns, op, args)
+        self.totals = Counter()
+        self.lock = threading.Lock()
+
+    def record(self, op, *args):
+        with self.lock:
+            self.entries.append((time.perf_counter_ns(), op, args))
+            self.totals[op] += 1
+
+    def counts(self, prefix=None):
+        """
+        Count operations by name.
+
+        Args:
+            prefix (str): Only count operations starting with this (e.g. 'gpio.' or 'i2c.').
+
+        Returns:
+            Counter: Operation name to count.
+        """
+        with self.lock:
+            return Counter({op: n for op, n in self.totals.items() if prefix is None or op.startswith(prefix)})
+
+    def ops(self, op=None):
+        """
+        Return logged operations.
+
+        Args:
+            op (str): Only this operation.
+
+        Returns:
+            list: (perf_counter_ns, op, args) tuples, oldest first.
+        """
+        with self.lock:
+            return [entry for entry in self.entries if op is None or entry[1] == op]
+
+    def reset(self):
+        """
+        Clear the log and the counts.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.totals.clear()
+
+
+class SimPWM:
+    def __init__(self, gpio, pin, frequency):
+        """
+        Simulated RPi.GPIO.PWM channel. Create it with SimGPIO.PWM().
+        """
+        self.gpio = gpio
+        self.pin = pin
+        self.frequency = frequency
+        self.duty_cycle = 0.0
+        self.running = False
+        gpio.recorder.record("gpio.pwm", pin, frequency)
+
+    def start(self, duty_cycle):
+        self.duty_cycle, self.running = duty_cycle, True
+        self.gpio.recorder.record("gpio.pwm_start", self.pin, duty_cycle)
+
+    def ChangeDutyCycle(self, duty_cycle):
+        if not 0.0 <= duty_cycle <= 100.0:
+            raise ValueError("dutycycle must have a value from 0.0 to 100.0")
+        self.duty_cycle = duty_cycle
+        self.gpio.recorder.record("gpio.pwm_duty", self.pin, duty_cycle)
+
+    def ChangeFrequency(self, frequency):
+        self.frequency = frequency
+        self.gpio.recorder.record("gpio.pwm_frequency", self.pin, frequency)
+
+    def stop(self):
+        self.running = False
+        self.gpio.recorder.record("gpio.pwm_stop", self.pin)
+
+
+class SimGPIO:
+    # Same constant values as RPi.GPIO
+    BCM, BOARD = 11, 10
+    OUT, IN = 0, 1
+    LOW, HIGH = 0, 1
+    PUD_OFF, PUD_DOWN, PUD_UP = 20, 21, 22
+    RISING, FALLING, BOTH = 31, 32, 33
+
+    def __init__(self, recorder=None):
+        """
+        Drop-in simulation of the RPi.GPIO module API. Input levels come from, in order: the pin's own
+        output, an attached device model or external drive, a keypad matrix, then the pull resistor.
+        Edge callbacks run on the thread that changes the level (a device model's thread, or drive()).
+
+        Like RPi.GPIO, reading a pin that was never set up and writing to a pin that is not an
+        output raise RuntimeError, so the simulator catches the same wiring mistakes as the hardware.
+
+        Args:
+            recorder (OpRecorder): Operation log. A new one is created if not given.
+        """
+        self.recorder = recorder or OpRecorder()
+        self.mode = None
+        self.modes = {}
+        self.pulls = {}
+        self.outputs = {}
+        self.setup_ns = {}  # Time each pin was last set up (RC timing models use it)
+        self.drivers = {}  # pin -> callable returning the externally driven level, or None
+        self.output_listeners = {}  # pin -> callables(level, t_ns) run on every output write
+        self.setup_listeners = {}  # pin -> callables(direction, t_ns) run on every setup
+        self.matrix = None
+        self.detects = {}  # pin -> {"edge", "callbacks", "level", "event"}
+        self.lock = threading.RLock()
+        self.logger = logging.getLogger(__name__)
+
+    # RPi.GPIO API
+
+    def setmode(self, mode):
+        self.recorder.record("gpio.setmode", mode)
+        self.mode = mode
+
+    def getmode(self):
+        return self.mode
+
+    def setwarnings(self, flag):
+        self.recorder.record("gpio.setwarnings", flag)
+
+    def setup(self, channel, direction, pull_up_down=PUD_OFF, initial=None):
+        for pin in self._channels(channel):
+            self.recorder.record("gpio.setup", pin, direction, pull_up_down, initial)
+            with self.lock:
+                self.modes[pin] = direction
+                self.pulls[pin] = pull_up_down
+                self.setup_ns[pin] = now = time.perf_counter_ns()
+                if direction == self.OUT:
+                    self.outputs[pin] = int(bool(initial)) if initial is not None else self.outputs.get(pin, self.LOW)
+                listeners = list(self.setup_listeners.get(pin, ()))
+            for listener in listeners:
+                listener(direction, now)
+            self._check_edge(pin)
+
+    def output(self, channel, value):
+        channels = self._channels(channel)
+        values = value if isinstance(value, (list, tuple)) else [value] * len(channels)
+        for pin, level in zip(channels, values):
+            self.recorder.record("gpio.output", pin, level)
+            with self.lock:
+                if self.modes.get(pin) != self.OUT:
+                    raise RuntimeError("The GPIO channel has not been set up as an OUTPUT")
+                self.outputs[pin] = int(bool(level))
+                listeners = list(self.output_listeners.get(pin, ()))
+            now = time.perf_counter_ns()
+            for listener in listeners:
+                listener(int(bool(level)), now)
+            self._check_edge(pin)
+
+    def input(self, channel):
+        self.recorder.record("gpio.input", channel)
+        with self.lock:
+            if channel not in self.modes:
+                raise RuntimeError("You must setup() the GPIO channel first")
+            return self._level(channel)
+
+    def cleanup(self, channel=None):
+        self.recorder.record("gpio.cleanup", channel)
+        with self.lock:
+            pins = list(self.modes) if channel is None else self._channels(channel)
+            for pin in pins:
+                self.modes.pop(pin, None)
+                self.pulls.pop(pin, None)
+                self.outputs.pop(pin, None)
+                self.detects.pop(pin, None)
+
+    def PWM(self, pin, frequency):
+        return SimPWM(self, pin, frequency)
+
+    def add_event_detect(self, channel, edge, callback=None, bouncetime=None):
+        self.recorder.record("gpio.add_event_detect", channel, edge)
+        with self.lock:
+            if channel in self.detects:
+                raise RuntimeError("Conflicting edge detection already enabled for this GPIO channel")
+            if self.modes.get(channel) != self.IN:
+                raise RuntimeError("You must setup() the GPIO channel as an input first")
+            self.detects[channel] = {"edge": edge, "callbacks": [callback] if callback else [],
+                                     "level": self._level(channel), "event": False}
+
+    def add_event_callback(self, channel, callback):
+        with self.lock:
+            detect = self.detects.get(channel)
+            if detect is None:
+                raise RuntimeError("Add event detection using add_event_detect first before adding a callback")
+            detect["callbacks"].append(callback)
+
+    def remove_event_detect(self, channel):
+        self.recorder.record("gpio.remove_event_detect", channel)
+        with self.lock:
+            self.detects.pop(channel, None)
+
+    def event_detected(self, channel):
+        with self.lock:
+            detect = self.detects.get(channel)
+            if detect is None or not detect["event"]:
+                return False
+            detect["event"] = False
+            return True
+
+    def wait_for_edge(self, channel, edge, bouncetime=None, timeout=None):
+        self.recorder.record("gpio.wait_for_edge", channel, edge, timeout)
+        deadline = time.perf_counter_ns() + timeout * 1_000_000 if timeout is not None else None
+        with self.lock:
+            last = self._level(channel)
+        while deadline is None or time.perf_counter_ns() < deadline:
+            time.sleep(0.00005)
+            with self.lock:
+                level = self._level(channel)
+            if level != last and self._matches(edge, level):
+                return channel
+            last = level
+        return None
+
+    # Simulation controls
+
+    def drive(self, pin, level):
+        """
+        Drive an input from outside (a sensor output or a switch), firing edge callbacks.
+
+        Args:
+            pin (int): GPIO pin.
+            level: 1/0, or None to release the pin back to its pull resistor.
+        """
+        self.recorder.record("sim.drive", pin, level)
+        with self.lock:
+            self.drivers[pin] = None if level is None else (lambda value=int(bool(level)): value)
+        self._check_edge(pin)
+
+    def attach(self, pin, level_fn):
+        """
+        Drive an input from a device model evaluated on every read.
+
+        Args:
+            pin (int): GPIO pin.
+            level_fn (callable): Returns the current level (1/0), or None to leave the pin to its pull resistor.
+        """
+        with self.lock:
+            self.drivers[pin] = level_fn
+
+    def on_output(self, pin, listener):
+        """
+        Call listener(level, t_ns) whenever the program writes to a pin (e.g. an ultrasonic trigger).
+        """
+        with self.lock:
+            self.output_listeners.setdefault(pin, []).append(listener)
+
+    def on_setup(self, pin, listener):
+        """
+        Call listener(direction, t_ns) whenever the program sets a pin up (e.g. an RC circuit starting to charge).
+        """
+        with self.lock:
+            self.setup_listeners.setdefault(pin, []).append(listener)
+
+    def level(self, pin):
+        """
+        Return a pin's current level without logging an operation.
+        """
+        with self.lock:
+            return self._level(pin)
+
+    def reset(self):
+        """
+        Forget all pin state, device models and edge detection.
+        """
+        with self.lock:
+            for table in (self.modes, self.pulls, self.outputs, self.setup_ns, self.drivers,
+                          self.output_listeners, self.setup_listeners, self.detects):
+                table.clear()
+            self.matrix = None
+            self.mode = None
+
+    # Internals
+
+    @staticmethod
+    def _channels(channel):
+        return list(channel) if isinstance(channel, (list, tuple)) else [channel]
+
+    def _level(self, pin):
+        if self.modes.get(pin) == self.OUT:
+            return self.outputs.get(pin, self.LOW)
+        driver = self.drivers.get(pin)
+        if driver is not None:
+            level = driver()
+            if level is not None:
+                return level
+        if self.matrix is not None:
+            level = self.matrix.level(pin)
+            if level is not None:
+                return level
+        return self.HIGH if self.pulls.get(pin) == self.PUD_UP else self.LOW
+
+    def _matches(self, edge, level):
+        return edge == self.BOTH or (edge == self.RISING) == bool(level)
+
+    def _check_edge(self, pin):
+        with self.lock:
+            detect = self.detects.get(pin)
+            if detect is None:
+                return
+            level = self._level(pin)
+            if level == detect["level"]:
+                return
+            detect["level"] = level
+            if not self._matches(detect["edge"], level):
+                return
+            detect["event"] = True
+            callbacks = list(detect["callbacks"])
+        self.recorder.record("gpio.edge", pin, level)
+        for callback in callbacks:
+            callback(pin)
+
+
+class UltrasonicModel:
+    SPEED_CM_PER_NS = 343.4 * 100 / 1e9  # At 20 °C
+
+    def __init__(self, gpio, trig_pin, echo_pin, distance_cm=100.0, noise_cm=0.0, dropout=0.0, latency_us=450):
+        """
+        HC-SR04 model: a trigger pulse is answered by an echo pulse as long as the sound's round trip.
+
+        Args:
+            gpio (SimGPIO): Simulated GPIO.
+            trig_pin (int): Trigger pin (written by the program).
+            echo_pin (int): Echo pin (read by the program).
+            distance_cm (float or callable): Target distance, or a function of time returning it.
+            noise_cm (float): Standard deviation of the measured distance.
+            dropout (float): Probability that a ping gets no echo.
+            latency_us (float): Delay from the trigger to the echo rising.
+        """
+        self.gpio = gpio
+        self.distance_cm = distance_cm
+        self.noise_cm = noise_cm
+        self.dropout = dropout
+        self.latency_ns = int(latency_us * 1000)
+        self.echo = None  # (rise_ns, fall_ns) of the current echo pulse
+        self.triggered_ns = None
+        self.pings = 0
+        gpio.on_output(trig_pin, self._on_trigger)
+        gpio.attach(echo_pin, self._echo_level)
+
+    def _on_trigger(self, level, t_ns):
+        if level:
+            self.triggered_ns = t_ns
+            return
+        if self.triggered_ns is None:
+            return
+        self.triggered_ns = None
+        self.pings += 1
+        if random.random() < self.dropout:
+            self.echo = None
+            return
+        distance = self.distance_cm() if callable(self.distance_cm) else self.distance_cm
+        distance = max(2.0, distance + random.gauss(0, self.noise_cm)) if self.noise_cm else distance
+        rise = t_ns + self.latency_ns
+        self.echo = (rise, rise + int(2 * distance / self.SPEED_CM_PER_NS))
+
+    def _echo_level(self):
+        echo = self.echo
+        return 1 if echo is not None and echo[0] <= time.perf_counter_ns() < echo[1] else 0
+
+
+class WaveformModel:
+    def __init__(self, gpio, pin, waveform, repeat=True):
+        """
+        Drive an input through a sequence of levels on a background thread, firing edge callbacks
+        like a real sensor output (e.g. a PIR's motion pulses).
+
+        Args:
+            gpio (SimGPIO): Simulated GPIO.
+            pin (int): Input pin.
+            waveform (list): (level, seconds) steps.
+            repeat (bool): Loop the waveform until stopped.
+        """
+        self.gpio = gpio
+        self.pin = pin
+        self.waveform = list(waveform)
+        self.repeat = repeat
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name=f"sim-waveform-{self.pin}", daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            for level, seconds in self.waveform:
+                self.gpio.drive(self.pin, level)
+                if self.stop_event.wait(seconds):
+                    return
+            if not self.repeat:
+                return
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=1)
+
+
+class RCModel:
+    def __init__(self, gpio, pin, charge_us):
+        """
+        RC charge-time circuit (e.g. an LDR and capacitor): once the pin is switched to an input,
+        it reads high after the charge time, and edge detection sees the rising edge.
+
+        Args:
+            gpio (SimGPIO): Simulated GPIO.
+            pin (int): Pin the capacitor is connected to.
+            charge_us (float or callable): Charge time in microseconds, or a function returning it
+                (called once per charge).
+        """
+        self.gpio = gpio
+        self.pin = pin
+        self.charge_us = charge_us
+        self.current_us = None  # Charge time of the charge in progress
+        gpio.attach(pin, self._level)
+        gpio.on_setup(pin, self._on_setup)
+
+    def _on_setup(self, direction, t_ns):
+        if direction != self.gpio.IN:
+            return
+        self.current_us = self.charge_us() if callable(self.charge_us) else self.charge_us
+        # Re-evaluate the level once charged, firing edge callbacks like the hardware's edge interrupt
+        timer = threading.Timer(self.current_us / 1e6, self.gpio._check_edge, (self.pin,))
+        timer.daemon = True
+        timer.start()
+
+    def _level(self):
+        started = self.gpio.setup_ns.get(self.pin)
+        if started is None or self.current_us is None:
+            return 0
+        return 1 if time.perf_counter_ns() - started >= self.current_us * 1000 else 0
+
+
+class DHT11Model:
+    def __init__(self, temperature=25.0, humidity=60.0, noise=0.0, error_rate=0.0):
+        """
+        Temperature and humidity seen by a simulated DHT11, reported at the sensor's 1 unit resolution.
+
+        Args:
+            temperature (float or callable): Temperature in °C, or a function returning it.
+            humidity (float or callable): Relative humidity in %, or a function returning it.
+            noise (float): Standard deviation of the Gaussian noise added to each reading.
+            error_rate (float): Probability of a reading failing its checksum.
+        """
+        self.temperature = temperature
+        self.humidity = humidity
+        self.noise = noise
+        self.error_rate = error_rate
+
+    def measure(self):
+        """
+        Return one reading as (error code, temperature, humidity), with SimDHT11's error codes.
+        """
+        if random.random() < self.error_rate:
+            return SimDHT11.ERR_CRC, 0, 0
+        temperature = self.temperature() if callable(self.temperature) else self.temperature
+        humidity = self.humidity() if callable(self.humidity) else self.humidity
+        temperature = round(temperature + random.gauss(0, self.noise)) if self.noise else round(temperature)
+        humidity = round(humidity + random.gauss(0, self.noise)) if self.noise else round(humidity)
+        return SimDHT11.ERR_NO_ERROR, max(0, min(50, temperature)), max(20, min(90, humidity))
+
+
+class KeypadModel:
+    def __init__(self, gpio, rows, columns, keymap):
+        """
+        Key matrix without diodes: a pressed key connects its row and column pins. An input connected
+        to outputs reads their level (a low output wins), otherwise its pull resistor.
+
+        Args:
+            gpio (SimGPIO): Simulated GPIO.
+            rows (list): Row pins.
+            columns (list): Column pins.
+            keymap (list): Key labels, one list per row.
+        """
+        self.gpio = gpio
+        self.positions = {key: (rows[i], columns[j]) for i, row in enumerate(keymap) for j, key in enumerate(row)}
+        self.pressed = set()  # (row pin, column pin)
+        gpio.matrix = self
+
+    def press(self, key):
+        self.pressed.add(self.positions[key])
+
+    def release(self, key=None):
+        """
+        Release a key, or every key when key is None.
+        """
+        if key is None:
+            self.pressed.clear()
+        else:
+            self.pressed.discard(self.positions[key])
+
+    def level(self, pin):
+        gpio = self.gpio
+        driven = [gpio.outputs.get(other, gpio.LOW) for row, column in self.pressed
+                  for other in ((column,) if pin == row else (row,) if pin == column else ())
+                  if gpio.modes.get(other) == gpio.OUT]
+        return min(driven) if driven else None
+
+
+class HD44780:
+    LINE_OFFSETS = (0x00, 0x40, 0x14, 0x54)
+
+    def __init__(self, columns=16, lines=2, rs=0x40, rw=0x20, en=0x10, backlight=0x00, data_shift=0):
+        """
+        HD44780 character LCD behind a PCF8574 I2C expander, driven in 4-bit mode. The default bit
+        mapping matches RPi_I2C_driver (data on P0-P3, EN P4, RW P5, RS P6); common backpacks use
+        rs=0x01, rw=0x02, en=0x04, backlight=0x08, data_shift=4.
+
+        Args:
+            columns (int): Characters per line.
+            lines (int): Display lines.
+            rs (int): Register select bit on the expander.
+            rw (int): Read/write bit.
+            en (int): Enable bit; data is latched on its falling edge.
+            backlight (int): Backlight bit, 0 if not wired.
+            data_shift (int): Position of D4 on the expander.
+        """
+        self.columns = columns
+        self.lines = lines
+        self.rs, self.rw, self.en, self.backlight_bit, self.data_shift = rs, rw, en, backlight, data_shift
+        self.ddram = [0x20] * 0x80
+        self.address = 0
+        self.four_bit = False
+        self.high_nibble = None
+        self.display_on = False
+        self.backlight = False
+        self.port = 0
+        self.commands = 0
+        self.characters = 0
+
+    def write_byte(self, value):
+        if self.backlight_bit:
+            self.backlight = bool(value & self.backlight_bit)
+        falling = self.port & self.en and not value & self.en
+        self.port = value
+        if falling and not value & self.rw:
+            self._latch((value >> self.data_shift) & 0x0F, bool(value & self.rs))
+
+    def read_byte(self):
+        return self.port
+
+    def _latch(self, nibble, is_data):
+        if not self.four_bit:
+            # After power-up the controller is in 8-bit mode: each latch is a whole command (upper nibble)
+            self._execute(nibble << 4, is_data)
+            return
+        if self.high_nibble is None:
+            self.high_nibble = nibble
+            return
+        byte, self.high_nibble = (self.high_nibble << 4) | nibble, None
+        self._execute(byte, is_data)
+
+    def _execute(self, byte, is_data):
+        if is_data:
+            self.ddram[self.address] = byte
+            self.address = (self.address + 1) % len(self.ddram)
+            self.characters += 1
+            return
+        self.commands += 1
+        if byte & 0x80:
+            self.address = byte & 0x7F
+        elif byte & 0x40:
+            pass  # CGRAM address; custom characters are not modelled
+        elif byte & 0x20:
+            self.four_bit = not byte & 0x10
+            self.high_nibble = None
+        elif byte & 0x08:
+            self.display_on = bool(byte & 0x04)
+        elif byte & 0x02:
+            self.address = 0
+        elif byte & 0x01:
+            self.ddram = [0x20] * 0x80
+            self.address = 0
+
+    def text(self):
+        """
+        Return the visible text, one string per line.
+        """
+        return ["".join(chr(c) for c in self.ddram[offset:offset + self.columns])
+                for offset in self.LINE_OFFSETS[:self.lines]]
+
+
+class SimSMBus:
+    devices = {}  # I2C address -> device model, shared by every bus instance
+    recorder = OpRecorder()
+
+    def __init__(self, bus=None):
+        """
+        Drop-in simulation of smbus.SMBus. Devices attached with SimSMBus.attach() answer on their address;
+        any other address fails with OSError 121 like an unanswered transfer on the real bus.
+
+        Args:
+            bus (int): Bus number (ignored).
+        """
+        self.bus = bus
+
+    @classmethod
+    def attach(cls, address, device):
+        cls.devices[address] = device
+        return device
+
+    def _device(self, address):
+        device = self.devices.get(address)
+        if device is None:
+            raise OSError(121, "Remote I/O error")
+        return device
+
+    def write_byte(self, address, value):
+        self.recorder.record("i2c.write_byte", address, value)
+        self._device(address).write_byte(value)
+
+    def write_byte_data(self, address, register, value):
+        self.recorder.record("i2c.write_byte_data", address, register, value)
+        self._device(address).write_byte_data(register, value)
+
+    def write_block_data(self, address, register, data):
+        self.recorder.record("i2c.write_block_data", address, register, list(data))
+        self._device(address).write_block_data(register, list(data))
+
+    def read_byte(self, address):
+        self.recorder.record("i2c.read_byte", address)
+        return self._device(address).read_byte()
+
+    def read_byte_data(self, address, register):
+        self.recorder.record("i2c.read_byte_data", address, register)
+        return self._device(address).read_byte_data(register)
+
+    def read_block_data(self, address, register):
+        self.recorder.record("i2c.read_block_data", address, register)
+        return self._device(address).read_block_data(register)
+
+    def close(self):
+        pass
+
+
+class SimDHT11Result:
+    def __init__(self, error_code, temperature, humidity):
+        self.error_code = error_code
+        self.temperature = temperature
+        self.humidity = humidity
+
+    def is_valid(self):
+        return self.error_code == SimDHT11.ERR_NO_ERROR
+
+
+class SimDHT11:
+    ERR_NO_ERROR, ERR_MISSING_DATA, ERR_CRC = 0, 1, 2  # Same codes as the dht11 package
+    sensors = {}  # GPIO pin -> DHT11Model, shared by every driver instance
+    default = None  # Model answering on pins without one of their own
+    recorder = OpRecorder()
+
+    def __init__(self, pin):
+        """
+        Drop-in simulation of the dht11 package's DHT11 driver. Sensors attached with SimDHT11.attach()
+        answer on their pin; any other pin reads as missing data, like a sensor that never responds.
+
+        Args:
+            pin (int): GPIO pin of the sensor's data line.
+        """
+        self.pin = pin
+
+    @classmethod
+    def attach(cls, pin, model):
+        cls.sensors[pin] = model
+        return model
+
+    def read(self):
+        self.recorder.record("dht11.read", self.pin)
+        model = self.sensors.get(self.pin, self.default)
+        if model is None:
+            return SimDHT11Result(self.ERR_MISSING_DATA, 0, 0)
+        return SimDHT11Result(*model.measure())
@@ -1,69 +1,489 @@
-import RPi.GPIO as GPIO
+from hal import GPIO
+import sys
+import threading
 import time
 import logging
+from functools import lru_cache
+from timing import Ticker, RESYNC, JITTER_BUCKETS_MS
+
+# Two-phase-on full-step sequence; clockwise walks it forward, counterclockwise backward
+PHASES = ((1, 0, 1, 0), (0, 1, 1, 0), (0, 1, 0, 1), (1, 0, 0, 1))
+DIRECTIONS = {"clockwise": 1, "counterclockwise": -1}
+PROFILES = ("trapezoid", "scurve", "none")
+
+
+@lru_cache(maxsize=64)
+def ramp_table(profile, start_speed, max_speed, accel):
+    """
+    Step intervals while accelerating from start_speed to max_speed, one per step.
+    The same table read backwards decelerates.
+
+    'trapezoid' accelerates at a constant rate. 'scurve' makes the speed follow a smoothstep in time,
+    so acceleration rises from and falls back to zero (limited jerk) with the same peak as the trapezoid.
+
+    Args:
+        profile (str): 'trapezoid', 'scurve' or 'none'.
+        start_speed (float): Speed the motor can start at without a ramp (steps per second).
+        max_speed (float): Cruise speed (steps per second).
+        accel (float): Peak acceleration (steps per second squared).
+
+    Returns:
+        tuple: Seconds before each ramp step; empty when no ramp is needed.
+    """
+    if profile == "none" or max_speed <= start_speed or accel <= 0:
+        return ()
+    gain = max_speed - start_speed
+    if profile == "trapezoid":
+        duration = gain / accel
+
+        def position(t):
+            return start_speed * t + accel * t * t / 2
+    else:
+        duration = 1.5 * gain / accel  # The smoothstep's peak acceleration is 1.5 times its mean
+
+        def position(t):
+            u = t / duration
+            return start_speed * t + gain * duration * (u ** 3 - u ** 4 / 2)
+
+    times = [0.0]
+    for step in range(1, int(position(duration)) + 1):
+        low, high = times[-1], duration
+        for _ in range(40):  # Bisect for the time the position reaches this step
+            middle = (low + high) / 2
+            if position(middle) < step:
+                low = middle
+            else:
+                high = middle
+        times.append(high)
+    return tuple(b - a for a, b in zip(times, times[1:]))
+
+
+class Axis:
+    def __init__(self, pins):
+        """
+        One motor's coils and absolute position. Created by StepperMotor on first use of a pin set.
+
+        Args:
+            pins (tuple): The four coil pins, in PHASES order.
+        """
+        self.pins = tuple(pins)
+        self.position = 0  # Motor steps from where the axis was first used
+        # Writes taking the coils from each phase to the next one, per direction: only the two pins that change
+        self.step_writes = {
+            direction: [self._changes(PHASES[phase], PHASES[(phase + direction) % 4]) for phase in range(4)]
+            for direction in (1, -1)
+        }
+        GPIO.setup(list(self.pins), GPIO.OUT)
+        GPIO.output(list(self.pins), list(PHASES[0]))  # Energize the coils at the home phase
+
+    def _changes(self, current, following):
+        changed = [(pin, level) for pin, level, previous in zip(self.pins, following, current) if level != previous]
+        return [pin for pin, _ in changed], [level for _, level in changed]
+
+
+class Motion:
+    def __init__(self, motor, moves, speed, ramp, duration=None, name=None):
+        """
+        A move of one or more axes in a single step loop, run on its own thread.
+        Create motions with StepperMotor.move(), move_many(), goto() or jog().
+
+        The axis with the most steps (the leader) steps on every tick; the others are interleaved with
+        Bresenham's line algorithm, so all of them start and finish together. The coil writes of every
+        axis stepping on a tick go out in one GPIO.output() call.
+
+        Args:
+            motor (StepperMotor): Motor driver that owns the axes.
+            moves (list): (Axis, steps, direction) per axis, direction 1 (clockwise) or -1 (counterclockwise).
+                Steps None runs until stopped (single axis only).
+            speed (float): Cruise speed of the leader (steps per second).
+            ramp (tuple): Acceleration intervals from ramp_table().
+            duration (float): Decelerate to a stop after this many seconds.
+            name (str): Name used in logs.
+        """
+        self.motor = motor
+        self.moves = moves
+        self.axes = [axis for axis, _, _ in moves]
+        self.counts = [sys.maxsize if steps is None else steps for _, steps, _ in moves]
+        self.span = max(self.counts, default=0)  # Leader steps: the number of ticks
+        self.total = self.span  # Lowered when the motion is stopped early
+        self.speed = speed
+        self.ramp = ramp
+        self.duration = duration
+        self.label = "+".join("-".join(map(str, axis.pins)) for axis in self.axes)
+        self.name = name or f"stepper-{self.label}"
+        self.ticks = 0
+        self.done_steps = [0] * len(moves)
+        # A late step restarts the grid: catching up would burst steps faster than the motor can follow
+        self.ticker = Ticker(1.0 / speed, RESYNC, motor.spin, motor.jitter(self.label))
+        self.elapsed = 0.0
+        self.error = None
+        self.stop_requested = False
+        self.immediate = False
+        self.callbacks = []
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+
+    def _run(self):
+        ramp, ramp_length = self.ramp, len(self.ramp)
+        cruise = 1.0 / self.speed
+        span, counts, done_steps = self.span, self.counts, self.done_steps
+        # Per axis: (index, axis, direction, phase writes), and the Bresenham error starting half a tick in
+        axes = [(i, axis, direction, axis.step_writes[direction]) for i, (axis, _, direction) in enumerate(self.moves)]
+        errors = [span // 2] * len(axes)
+        output, wait = GPIO.output, self.ticker.wait
+        self.ticker.reset()
+        start = self.ticker.deadline
+        end_by = None if self.duration is None else start + self.duration
+        tick = 0
+        try:
+            while tick < self.total:
+                if self.stop_requested or end_by is not None and self.ticker.deadline >= end_by:
+                    # Decelerate from the current point of the ramp, or stop right here
+                    slowdown = 0 if self.immediate else min(tick, ramp_length)
+                    self.total = min(self.total, tick + slowdown)
+                    end_by = None
+                    if tick >= self.total:
+                        break
+                k = min(tick, self.total - 1 - tick)
+                wait(ramp[k] if k < ramp_length else cruise)
+                channels, values = [], []
+                for i, axis, direction, writes in axes:
+                    errors[i] -= counts[i]
+                    if errors[i] < 0:
+                        errors[i] += span
+                        changed, levels = writes[axis.position % 4]
+                        channels += changed
+                        values += levels
+                        axis.position += direction
+                        done_steps[i] += 1
+                if channels:
+                    output(channels, values)
+                tick += 1
+        except Exception as e:
+            self.error = str(e)
+            self.motor.logger.error(f"Stepper motion {self.name} failed after {tick} steps: {e}")
+        self.ticks = tick
+        self.elapsed = time.perf_counter() - start
+        self._finish()
+
+    def _finish(self):
+        with self.lock:
+            self.done.set()
+            callbacks = list(self.callbacks)
+        self.motor._finished(self)
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                self.motor.logger.error(f"Error finishing stepper motion {self.name}: {e}")
+
+    def stop(self, immediate=False):
+        """
+        Ask the motion to stop: decelerate along the ramp, or stop at the next step.
+        Every axis of the motion stops together.
+
+        Args:
+            immediate (bool): Skip the deceleration (the motor may lose steps at high speed).
+        """
+        self.immediate = self.immediate or immediate
+        self.stop_requested = True
+
+    def wait(self, timeout=None):
+        """
+        Block until the motion has finished.
+
+        Returns:
+            bool: True if the motion finished.
+        """
+        return self.done.wait(timeout)
+
+    def is_active(self):
+        return not self.done.is_set()
+
+    def add_done_callback(self, fn):
+        """
+        Call fn with the motion once it has finished. Called right away if it already has.
+        """
+        with self.lock:
+            if not self.done.is_set():
+                self.callbacks.append(fn)
+                return
+        fn(self)
+
+    def describe(self):
+        """
+        Return the motion's progress and achieved step rate.
+
+        Returns:
+            dict: 'motors' (pins, position and steps taken per axis), leader 'steps', target 'speed',
+            achieved mean 'rate' of the leader (steps per second), 'late' steps, 'max_lag_ms' and 'error'.
+        """
+        elapsed = self.elapsed if self.done.is_set() else None
+        timing = self.ticker.report()
+        return {
+            "motors": [{"pins": list(axis.pins), "position": axis.position, "steps": steps}
+                       for axis, steps in zip(self.axes, self.done_steps)],
+            "steps": self.ticks,
+            "speed": round(self.speed, 1),
+            "rate": round(self.ticks / elapsed, 1) if elapsed else None,
+            "late": timing["late"],
+            "max_lag_ms": timing["max_lag_ms"],
+            "error": self.error,
+        }
+
 
 class StepperMotor:
-    def __init__(self):
+    def __init__(self, start_speed=200, max_speed=1000, accel=2000, profile="trapezoid", spin=0.0, metrics=None):
         """
-        Initialize the stepper motor.
+        Initialize the stepper motion engine. Moves run in the background with acceleration ramps
+        and can be stopped; each axis (set of coil pins) tracks its absolute position.
+
+        Args:
+            start_speed (float): Speed reached without a ramp (steps per second).
+            max_speed (float): Highest allowed cruise speed (steps per second).
+            accel (float): Default acceleration (steps per second squared).
+            profile (str): Default ramp profile ('trapezoid', 'scurve' or 'none').
+            spin (float): Seconds busy-waited before each step instead of sleeping, for sub-millisecond timing.
+            metrics (MetricsRegistry): Registry recording step jitter per motion loop. None disables it.
         """
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown stepper ramp profile: {profile}")
         GPIO.setmode(GPIO.BCM)  # Use BCM pin numbering
         GPIO.setwarnings(False)  # Disable GPIO warnings
+        self.start_speed = start_speed
+        self.max_speed = max_speed
+        self.accel = accel
+        self.profile = profile
+        self.spin = spin
+        self.metrics = metrics
+        self.axes = {}  # pins -> Axis
+        self.motions = {}  # pins -> running Motion (one entry per axis it moves)
+        self.stats = {}  # pins -> {"moves", "steps", "seconds", "late"}
+        self.lock = threading.Lock()
         self.logger = logging.getLogger(__name__)
 
-    def set_step(self, pins, step_sequence):
+    def axis(self, pins):
         """
-        Set the GPIO pins to the specified step sequence.
-        
+        Return the axis for a pin set, setting its pins up on first use.
+
         Args:
-            pins (list): List of GPIO pins connected to the stepper motor.
-            step_sequence (list): List of states for each pin in the step sequence.
+            pins (list): The four coil pins.
+
+        Returns:
+            Axis: The axis.
         """
-        try:
-            for pin, state in zip(pins, step_sequence):
-                GPIO.output(pin, state)
-            self.logger.debug(f"Set step sequence: {step_sequence} on pins {pins}")
-        except Exception as e:
-            self.logger.error(f"Failed to set step sequence: {e}")
+        pins = tuple(pins)
+        with self.lock:
+            axis = self.axes.get(pins)
+            if axis is None:
+                axis = self.axes[pins] = Axis(pins)
+            return axis
+
+    def jitter(self, label):
+        """
+        Return the step jitter histogram of a motion loop, or None without a metrics registry.
+
+        Args:
+            label (str): Pins of the loop's axes, e.g. '16-19-20-21' or '16-19-20-21+2-3-4-5'.
+        """
+        if self.metrics is None:
+            return None
+        return self.metrics.histogram("stepper_jitter_ms", "Time from a step's deadline to its coil write",
+                                      JITTER_BUCKETS_MS, pins=label)
+
+    def move(self, pins, steps, direction="clockwise", speed=None, accel=None, profile=None, duration=None):
+        """
+        Start a relative move. A motion already running on the axis is decelerated to a stop first.
+
+        Args:
+            pins (list): The four coil pins.
+            steps (int): Motor steps to move; None moves until stopped.
+            direction (str): 'clockwise' or 'counterclockwise'.
+            speed (float): Cruise speed (steps per second), capped at max_speed. Defaults to max_speed.
+            accel (float): Acceleration (steps per second squared). Defaults to the engine's.
+            profile (str): Ramp profile. Defaults to the engine's.
+            duration (float): Decelerate to a stop after this many seconds.
+
+        Returns:
+            Motion: Handle to stop or wait for the move.
+        """
+        return self.move_many([(pins, steps, direction)], speed, accel, profile, duration)
+
+    def move_many(self, moves, speed=None, accel=None, profile=None, duration=None):
+        """
+        Start a coordinated relative move of several axes, which start and finish together.
+        Motions already running on any of them are decelerated to a stop first.
+
+        Args:
+            moves (list): (pins, steps, direction) per axis. Steps None moves until stopped (single axis only).
+            speed (float): Cruise speed of the axis with the most steps; the others run proportionally slower.
+            accel, profile, duration: As for move().
+
+        Returns:
+            Motion: Handle to stop or wait for the move.
+        """
+        if not moves:
+            raise ValueError("No stepper motors to move")
+        pins = [pin for move in moves for pin in move[0]]
+        if len(set(pins)) != len(pins):
+            raise ValueError(f"Stepper motors share pins: {pins}")
+        if len(moves) > 1 and any(steps is None for _, steps, _ in moves):
+            raise ValueError("Only a single stepper motor can move until stopped")
+        for _, _, direction in moves:
+            if direction not in DIRECTIONS:
+                raise ValueError(f"Unknown stepper direction: {direction}")
+        profile = profile or self.profile
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown stepper ramp profile: {profile}")
+        speed = min(speed or self.max_speed, self.max_speed)
+        axes = [self.axis(move[0]) for move in moves]
+        for axis in axes:
+            self.stop(axis.pins)
+        ramp = ramp_table(profile, self.start_speed, speed, accel if accel is not None else self.accel)
+        motion = Motion(self, [(axis, steps, DIRECTIONS[direction]) for axis, (_, steps, direction) in zip(axes, moves)],
+                        speed, ramp, duration)
+        with self.lock:
+            for axis in axes:
+                self.motions[axis.pins] = motion
+        motion.thread.start()
+        described = ", ".join(f"{list(axis.pins)} {direction} {'continuously' if steps is None else f'{steps} steps'}"
+                              for axis, (_, steps, direction) in zip(axes, moves))
+        self.logger.info(f"Moving stepper {described} at {speed:.0f} steps/s ({profile})")
+        return motion
+
+    def goto(self, pins, position, speed=None, accel=None, profile=None):
+        """
+        Move an axis to an absolute position.
+
+        Args:
+            pins (list): The four coil pins.
+            position (int): Target position in motor steps.
+            speed, accel, profile: As for move().
+
+        Returns:
+            Motion: Handle to stop or wait for the move.
+        """
+        return self.goto_many([(pins, position)], speed, accel, profile)
+
+    def goto_many(self, targets, speed=None, accel=None, profile=None):
+        """
+        Move several axes to absolute positions, starting and finishing together.
+
+        Args:
+            targets (list): (pins, position in motor steps) per axis.
+            speed, accel, profile: As for move_many().
+
+        Returns:
+            Motion: Handle to stop or wait for the move.
+        """
+        for pins, _ in targets:
+            self.stop(pins)
+        moves = []
+        for pins, position in targets:
+            offset = position - self.axis(pins).position
+            moves.append((pins, abs(offset), "clockwise" if offset >= 0 else "counterclockwise"))
+        return self.move_many(moves, speed, accel, profile)
+
+    def jog(self, pins, direction="clockwise", speed=None, duration=None, accel=None, profile=None):
+        """
+        Run an axis continuously until stop() is called or the duration ends.
+
+        Args:
+            pins (list): The four coil pins.
+            direction (str): 'clockwise' or 'counterclockwise'.
+            duration (float): Seconds to run before decelerating. None runs until stopped.
+            speed, accel, profile: As for move().
+
+        Returns:
+            Motion: Handle to stop or wait for the move.
+        """
+        return self.move(pins, None, direction, speed, accel, profile, duration)
+
+    def stop(self, pins=None, immediate=False, wait=True):
+        """
+        Stop running motions. Stopping one axis of a coordinated move stops all of its axes.
+
+        Args:
+            pins (list): Axis to stop. None stops every axis.
+            immediate (bool): Skip the deceleration.
+            wait (bool): Block until the motions have finished.
+        """
+        with self.lock:
+            if pins is None:
+                motions = list({id(m): m for m in self.motions.values()}.values())
+            else:
+                motions = [m for m in [self.motions.get(tuple(pins))] if m]
+        for motion in motions:
+            motion.stop(immediate)
+        if wait:
+            for motion in motions:
+                motion.wait()
+
+    def position(self, pins):
+        """
+        Return an axis's absolute position in motor steps.
+        """
+        return self.axis(pins).position
+
+    def _finished(self, motion):
+        with self.lock:
+            for axis, steps in zip(motion.axes, motion.done_steps):
+                if self.motions.get(axis.pins) is motion:
+                    del self.motions[axis.pins]
+                stats = self.stats.setdefault(axis.pins, {"moves": 0, "steps": 0, "seconds": 0.0, "late": 0})
+                stats["moves"] += 1
+                stats["steps"] += steps
+                stats["seconds"] += motion.elapsed
+                stats["late"] += motion.ticker.late
+        described = motion.describe()
+        positions = ", ".join(f"{motor['pins']} at {motor['position']}" for motor in described["motors"])
+        self.logger.info(f"Stepper stopped with {positions}: {described['steps']} steps at {described['rate']} steps/s "
+                         f"(target {described['speed']}, {described['late']} late)")
+
+    def report(self):
+        """
+        Return per-axis position and achieved step rate.
+
+        Returns:
+            dict: Pins (as 'a-b-c-d') to position, moves, steps, mean rate while moving and late steps.
+        """
+        with self.lock:
+            report = {}
+            for pins, axis in self.axes.items():
+                stats = self.stats.get(pins, {"moves": 0, "steps": 0, "seconds": 0.0, "late": 0})
+                report["-".join(map(str, pins))] = {
+                    "position": axis.position,
+                    "moving": pins in self.motions,
+                    "moves": stats["moves"],
+                    "steps": stats["steps"],
+                    "rate": round(stats["steps"] / stats["seconds"], 1) if stats["seconds"] else 0.0,
+                    "late": stats["late"],
+                }
+            return report
 
     def move_motor(self, pins, delay, steps, direction):
         """
-        Move the stepper motor in the specified direction.
-        
+        Move the stepper motor in the specified direction and wait for the move to finish.
+
         Args:
             pins (list): List of GPIO pins connected to the stepper motor.
             delay (float): Delay (in seconds) between steps.
-            steps (int): Number of steps to move.
+            steps (int): Number of passes through the 4-phase sequence (4 motor steps each).
             direction (str): Direction of movement ('clockwise' or 'counterclockwise').
         """
         try:
-            step_sequence = [
-                [1, 0, 1, 0],
-                [0, 1, 1, 0],
-                [0, 1, 0, 1],
-                [1, 0, 0, 1]
-            ] if direction == 'clockwise' else [
-                [1, 0, 0, 1],
-                [0, 1, 0, 1],
-                [0, 1, 1, 0],
-                [1, 0, 1, 0]
-            ]
-
-            self.logger.info(f"Moving stepper motor {direction} for {steps} steps with {delay} seconds delay.")
-
-            for _ in range(steps):
-                for step in step_sequence:
-                    self.set_step(pins, step)
-                    time.sleep(delay)
+            self.move(pins, steps * 4, direction, speed=1.0 / delay if delay > 0 else None).wait()
         except Exception as e:
             self.logger.error(f"Failed to move stepper motor: {e}")
 
     def cleanup(self):
         """
-        Clean up GPIO resources.
+        Stop all motions and clean up GPIO resources.
         """
         try:
+            self.stop(immediate=True)
             GPIO.cleanup()
             self.logger.info("GPIO cleanup completed.")
         except Exception as e:
-            self.logger.error(f"Failed to cleanup GPIO: {e}")
\ No newline at end of file
+            self.logger.error(f"Failed to cleanup GPIO: {e}")
@@ -0,0 +1,240 @@
+import os
+import sqlite3
+import threading
+import time
+import logging
+from scheduler import get_default_scheduler
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    sensor TEXT NOT NULL,
+    key,
+    field TEXT NOT NULL,
+    ts REAL NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_samples_sensor_ts ON samples (sensor, ts);
+"""
+
+
+class TimeSeriesStore:
+    def __init__(self, path, batch_size=200, flush_interval=5.0, max_age=7 * 24 * 3600, max_bytes=64 * 1024 * 1024,
+                 prune_interval=300, max_points=5000, components=None, scheduler=None):
+        """
+        Local time-series store for sensor readings: SQLite in WAL mode, one row per field value,
+        indexed on (sensor, ts). Samples are queued in memory and inserted in one transaction per
+        batch; old rows are pruned by age and total size.
+
+        Args:
+            path (str): Database file.
+            batch_size (int): Pending rows that trigger an insert.
+            flush_interval (float): Maximum time (in seconds) rows wait before being inserted.
+            max_age (float): Rows older than this many seconds are deleted.
+            max_bytes (int): Maximum database size; the oldest rows are deleted beyond it.
+            prune_interval (float): Seconds between retention passes.
+            max_points (int): Maximum buckets returned by one query.
+            components (iterable): Components to store. None stores every component.
+            scheduler (Scheduler): Scheduler running flushes and pruning. Defaults to the shared scheduler.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.prune_interval = prune_interval
+        self.max_points = max_points
+        self.components = set(components) if components is not None else None
+        self.scheduler = scheduler or get_default_scheduler()
+        self.pending = []
+        self.pending_lock = threading.Lock()
+        self.lock = threading.Lock()  # Serializes use of the connection
+        self.jobs = []
+        self.stats = {"rows": 0, "flushes": 0, "pruned": 0, "queries": 0, "errors": 0}
+        self.logger = logging.getLogger(__name__)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        # Must be set before the first table is created for deleted pages to be returned to the OS
+        self.db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.execute("PRAGMA synchronous = NORMAL")  # Durable at checkpoints; a crash loses at most the last batches
+        self.db.executescript(_SCHEMA)
+
+    def start(self):
+        """
+        Start the periodic flush and retention jobs.
+        """
+        self.jobs = [
+            self.scheduler.every(self.flush_interval, self.flush, name="store-flush"),
+            self.scheduler.every(self.prune_interval, self.prune, name="store-prune"),
+        ]
+
+    def record(self, component, key, data, ts=None):
+        """
+        Queue a sample. Numeric and boolean fields are stored; missing and text values are skipped.
+
+        Args:
+            component (str): Component that produced the sample.
+            key: Sensor instance key (usually its pin).
+            data (dict): Field name to value mapping.
+            ts (float): Sample timestamp (epoch seconds). Defaults to now.
+        """
+        if self.components is not None and component not in self.components:
+            return
+        ts = time.time() if ts is None else ts
+        rows = [(component, key, field, ts, float(value)) for field, value in data.items()
+                if isinstance(value, (int, float)) and value == value]  # value == value skips NaN
+        if not rows:
+            return
+        with self.pending_lock:
+            self.pending.extend(rows)
+            due = len(self.pending) >= self.batch_size
+        if due:
+            self.flush()
+
+    def flush(self):
+        """
+        Insert all pending rows in one transaction.
+
+        Returns:
+            int: Number of rows inserted.
+        """
+        with self.pending_lock:
+            rows, self.pending = self.pending, []
+        if not rows:
+            return 0
+        try:
+            with self.lock, self.db:
+                self.db.executemany("INSERT INTO samples (sensor, key, field, ts, value) VALUES (?, ?, ?, ?, ?)", rows)
+        except sqlite3.Error as e:
+            self.stats["errors"] += 1
+            self.logger.error(f"Failed to store {len(rows)} rows: {e}")
+            return 0
+        self.stats["rows"] += len(rows)
+        self.stats["flushes"] += 1
+        return len(rows)
+
+    def size(self):
+        """
+        Return the disk space taken by the database.
+
+        Returns:
+            int: Size in bytes of the database file plus its WAL file.
+        """
+        wal = self.path + "-wal"
+        return os.path.getsize(self.path) + (os.path.getsize(wal) if os.path.exists(wal) else 0)
+
+    def prune(self):
+        """
+        Delete rows older than max_age, then the oldest rows until the database fits in max_bytes.
+
+        Returns:
+            int: Number of rows deleted.
+        """
+        deleted = 0
+        try:
+            with self.lock, self.db:
+                deleted += self.db.execute("DELETE FROM samples WHERE ts < ?", (time.time() - self.max_age,)).rowcount
+            self._checkpoint()
+            for _ in range(5):
+                size = self.size()
+                if size <= self.max_bytes:
+                    break
+                # Drop the oldest rows in proportion to the excess (at least a tenth) and re-check
+                with self.lock, self.db:
+                    count = self.db.execute("SELECT COUNT(*) FROM samples").fetchone()[0]
+                    if not count:
+                        break
+                    excess = max(count // 10, int(count * (1 - self.max_bytes / size)), 1)
+                    cutoff = self.db.execute("SELECT ts FROM samples ORDER BY ts LIMIT 1 OFFSET ?",
+                                             (min(excess, count) - 1,)).fetchone()[0]
+                    deleted += self.db.execute("DELETE FROM samples WHERE ts <= ?", (cutoff,)).rowcount
+                self._checkpoint()
+        except sqlite3.Error as e:
+            self.stats["errors"] += 1
+            self.logger.error(f"Failed to prune the time-series store: {e}")
+        if deleted:
+            self.stats["pruned"] += deleted
+            self.logger.info(f"Pruned {deleted} rows from the time-series store")
+        return deleted
+
+    def _checkpoint(self):
+        with self.lock:
+            # The vacuum frees one page per step: execute() stops after the first step (it returns no rows),
+            # executescript() steps it to completion. The file only shrinks once the WAL is checkpointed
+            self.db.executescript("PRAGMA incremental_vacuum;")
+            self.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def query(self, sensor, seconds=3600, bucket=60, key=None, field=None, start=None, end=None):
+        """
+        Return a sensor's readings over a time range, downsampled into fixed-size buckets.
+
+        Args:
+            sensor (str): Component name (e.g. 'DHT11').
+            seconds (float): Range length, ending at end. Ignored when start is given.
+            bucket (float): Bucket size in seconds.
+            key: Only this sensor instance (pin). None returns every instance.
+            field (str): Only this field. None returns every field.
+            start (float): Range start (epoch seconds).
+            end (float): Range end (epoch seconds). Defaults to now.
+
+        Returns:
+            dict: The range, bucket size and one series per (key, field) with
+            [bucket start, mean, min, max, count] rows. Truncated at max_points buckets.
+        """
+        self.flush()  # Include readings still waiting to be inserted
+        end = time.time() if end is None else end
+        start = end - seconds if start is None else start
+        sql = ("SELECT key, field, CAST(ts / :bucket AS INTEGER) * :bucket AS bucket, "
+               "AVG(value), MIN(value), MAX(value), COUNT(*) "
+               "FROM samples WHERE sensor = :sensor AND ts >= :start AND ts < :end")
+        if key is not None:
+            sql += " AND key = :key"
+        if field is not None:
+            sql += " AND field = :field"
+        sql += " GROUP BY key, field, bucket ORDER BY key, field, bucket LIMIT :limit"
+        params = {"bucket": bucket, "sensor": sensor, "start": start, "end": end, "key": key, "field": field,
+                  "limit": self.max_points + 1}
+        query_start = time.perf_counter()
+        with self.lock:
+            rows = self.db.execute(sql, params).fetchall()
+        self.stats["queries"] += 1
+
+        truncated = len(rows) > self.max_points
+        series = {}
+        for row_key, row_field, bucket_ts, mean, low, high, count in rows[:self.max_points]:
+            series.setdefault((row_key, row_field), []).append(
+                [bucket_ts, round(mean, 3), round(low, 3), round(high, 3), count])
+        self.logger.debug(f"History query for {sensor}: {len(rows)} buckets in "
+                          f"{(time.perf_counter() - query_start) * 1000:.1f} ms")
+        return {
+            "sensor": sensor,
+            "start": round(start, 3),
+            "end": round(end, 3),
+            "bucket": bucket,
+            "truncated": truncated,
+            "series": [{"key": series_key, "field": series_field, "fields": ["ts", "mean", "min", "max", "count"],
+                        "samples": samples}
+                       for (series_key, series_field), samples in series.items()],
+        }
+
+    def report(self):
+        """
+        Return store metrics.
+
+        Returns:
+            dict: Rows inserted, insert transactions, rows pruned, queries, errors and size in bytes.
+        """
+        return dict(self.stats, bytes=self.size())
+
+    def close(self):
+        """
+        Stop the jobs, insert pending rows and close the database.
+        """
+        for job in self.jobs:
+            job.cancel()
+        self.jobs = []
+        self.flush()
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,211 @@
+import threading
+import time
+import logging
+from encoding import JsonCodec
+
+
+class TelemetryPublisher:
+    def __init__(self, client, topic, max_batch=50, max_age=1.0, immediate_components=(), filters=None,
+                 codec=None, history=None, summarized_components=(), anomalies=None,
+                 store=None):
+        """
+        Initialize the shared telemetry publisher that batches sensor samples.
+
+        Samples are grouped into one message per flush:
+        {"streams": [{"component": ..., "key": ..., "fields": ["ts", ...], "samples": [[...], ...]}]}
+
+        Args:
+            client: Client with a publish(topic, payload) method.
+            topic (str): Telemetry topic.
+            max_batch (int): Number of pending samples that triggers a flush.
+            max_age (float): Maximum time (in seconds) a sample waits before being flushed.
+            immediate_components (iterable): Components whose samples are flushed right away (e.g. button events).
+            filters (FilterBank): Report-by-exception filters applied before samples are queued.
+            codec: Payload codec from encoding.py. Defaults to compact JSON.
+            history (HistoryStore): Local history every sample is recorded to, before filtering.
+            summarized_components (iterable): Components kept in history only; their raw samples are not
+                published (a SummaryPublisher sends window statistics instead).
+            anomalies (AnomalyMonitor): Detectors every sample is checked by, before filtering.
+            store (TimeSeriesStore): Local time-series store every sample is written to, before filtering.
+        """
+        self.client = client
+        self.topic = topic
+        self.max_batch = max_batch
+        self.max_age = max_age
+        self.immediate = set(immediate_components)
+        self.filters = filters
+        self.codec = codec or JsonCodec()
+        self.history = history
+        self.summarized = set(summarized_components)
+        self.anomalies = anomalies
+        self.store = store
+        self.streams = {}  # (component, key, fields) -> list of sample rows
+        self.pending = 0
+        self.oldest = None  # Monotonic time the oldest pending sample was submitted
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.closed = False
+        self.thread = None
+        self.stats = {"flushes": 0, "samples": 0, "bytes": 0, "errors": 0, "flush_ms_total": 0.0,
+                      "flush_ms_max": 0.0, "wait_ms_max": 0.0, "reasons": {}}
+        self.logger = logging.getLogger(__name__)
+
+    def start(self):
+        """
+        Start the background thread that flushes batches by size and age.
+        """
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="telemetry-flush", daemon=True)
+            self.thread.start()
+
+    def submit(self, component, data, key=None, ts=None):
+        """
+        Queue one sample for the next flush.
+
+        Args:
+            component (str): Component that produced the sample (e.g. 'DHT11').
+            data (dict): Field name to value mapping for this sample.
+            key: Identifies the sensor instance (usually its pin).
+            ts (float): Sample timestamp (epoch seconds). Defaults to now.
+        """
+        ts = self.observe(component, data, key, ts)
+        if component in self.summarized:
+            return
+        fields = tuple(data)
+        values = tuple(data.values())
+        with self.lock:
+            if self.filters is not None:
+                reported = self.filters.process(component, key, fields, ts, values)
+                if not reported:
+                    return
+            else:
+                reported = [(ts, values)]
+            rows = self.streams.get((component, key, fields))
+            if rows is None:
+                rows = self.streams[(component, key, fields)] = []
+            for sample_ts, sample_values in reported:
+                rows.append([sample_ts, *sample_values])
+            self.pending += len(reported)
+            if self.oldest is None:
+                self.oldest = time.monotonic()
+            due = self.pending >= self.max_batch or component in self.immediate
+        if due:
+            self.wake.set()
+
+    def observe(self, component, data, key=None, ts=None):
+        """
+        Record a sample locally (history, anomaly detection and the time-series store) without publishing it.
+        Used directly for readings that are not published, such as failed measurements.
+
+        Args:
+            component (str): Component that produced the sample.
+            data (dict): Field name to value mapping; None marks a missing reading.
+            key: Identifies the sensor instance (usually its pin).
+            ts (float): Sample timestamp (epoch seconds). Defaults to now.
+
+        Returns:
+            float: The sample timestamp.
+        """
+        ts = round(time.time(), 3) if ts is None else ts
+        if self.history is not None:
+            self.history.record(component, key, data, ts)
+        if self.anomalies is not None:
+            self.anomalies.process(component, key, data, ts)
+        if self.store is not None:
+            self.store.record(component, key, data, ts)
+        return ts
+
+    def _run(self):
+        while not self.closed:
+            with self.lock:
+                oldest = self.oldest
+            timeout = self.max_age if oldest is None else max(0.0, oldest + self.max_age - time.monotonic())
+            self.wake.wait(timeout)
+            self.wake.clear()
+            if self.closed:
+                break
+            with self.lock:
+                if self.pending == 0:
+                    continue
+                if self.pending >= self.max_batch:
+                    reason = "size"
+                elif time.monotonic() - self.oldest >= self.max_age:
+                    reason = "age"
+                else:
+                    reason = "immediate"
+            self.flush(reason)
+
+    def flush(self, reason="manual"):
+        """
+        Publish all pending samples as one message.
+
+        Args:
+            reason (str): Why the flush happened ('size', 'age', 'immediate', 'shutdown' or 'manual').
+
+        Returns:
+            int: Number of samples flushed.
+        """
+        with self.lock:
+            if self.pending == 0:
+                return 0
+            streams, self.streams = self.streams, {}
+            count, self.pending = self.pending, 0
+            oldest, self.oldest = self.oldest, None
+
+        payload = self.codec.encode({
+            "streams": [
+                {"component": component, "key": key, "fields": ["ts", *fields], "samples": rows}
+                for (component, key, fields), rows in streams.items()
+            ]
+        })
+
+        start = time.perf_counter()
+        try:
+            self.client.publish(self.topic, payload)
+            ok = True
+        except Exception as e:
+            ok = False
+            self.logger.error(f"Failed to publish telemetry batch: {e}")
+        flush_ms = (time.perf_counter() - start) * 1000
+        wait_ms = (time.monotonic() - oldest) * 1000
+
+        with self.lock:
+            stats = self.stats
+            if ok:
+                stats["flushes"] += 1
+                stats["samples"] += count
+                stats["bytes"] += len(payload)
+            else:
+                stats["errors"] += 1
+            stats["flush_ms_total"] += flush_ms
+            stats["flush_ms_max"] = max(stats["flush_ms_max"], flush_ms)
+            stats["wait_ms_max"] = max(stats["wait_ms_max"], wait_ms)
+            stats["reasons"][reason] = stats["reasons"].get(reason, 0) + 1
+        self.logger.debug(f"Flushed {count} samples ({len(payload)} bytes, {reason}) in {flush_ms:.2f} ms")
+        return count
+
+    def report(self):
+        """
+        Return flush metrics.
+
+        Returns:
+            dict: Flush count, samples (messages), bytes, mean/max flush latency and max sample wait.
+        """
+        with self.lock:
+            stats = dict(self.stats, reasons=dict(self.stats["reasons"]))
+        flushes = stats["flushes"] + stats["errors"]
+        stats["flush_ms_mean"] = round(stats.pop("flush_ms_total") / flushes, 3) if flushes else 0.0
+        stats["flush_ms_max"] = round(stats["flush_ms_max"], 3)
+        stats["wait_ms_max"] = round(stats["wait_ms_max"], 1)
+        stats["samples_per_flush"] = round(stats["samples"] / stats["flushes"], 1) if stats["flushes"] else 0.0
+        return stats
+
+    def close(self):
+        """
+        Flush anything still pending and stop the flush thread.
+        """
+        self.closed = True
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join(timeout=1)
+        self.flush("shutdown")
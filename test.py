@@ -47,13 +47,12 @@
 # # client.disconnect()  # Uncomment if stopping the script
 
 
-from config import MQTT_CONFIG
+from config import MQTT_CONFIG, TOPIC_CONFIG
 from DHT_11 import DHT11Sensor
 from ultrasonic import UltrasonicSensor
+from topics import TopicLayout
 import paho.mqtt.client as mqtt
 import logging
-import time
-import threading
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -63,39 +62,26 @@ logger = logging.getLogger(__name__)
 client = mqtt.Client()
 client.username_pw_set(username=MQTT_CONFIG["username"], password=MQTT_CONFIG["password"])
 client.connect(MQTT_CONFIG["broker"], MQTT_CONFIG["port"])
+topics = TopicLayout(MQTT_CONFIG["topic"], TOPIC_CONFIG)
 
-# Initialize ultrasonic sensor with the topic from config
-ultrasonic_sensor = UltrasonicSensor(client, topic=MQTT_CONFIG["topic"])
+# Initialize ultrasonic sensor with the telemetry topic
+ultrasonic_sensor = UltrasonicSensor(client, topic=topics.telemetry)
 ultrasonic_sensor.setup(trig_pin=23, echo_pin=24)  # Replace with your GPIO pin numbers
 
-# Initialize DHT11 sensor with the topic from config
-dht11_sensor = DHT11Sensor(client, topic=MQTT_CONFIG["topic"])
+# Initialize DHT11 sensor with the telemetry topic
+dht11_sensor = DHT11Sensor(client, topic=topics.telemetry)
 dht11_sensor.setup(pin=14)  # Replace 14 with your GPIO pin number
 
-# Start monitoring for DHT11 sensor in a separate thread
-dht11_thread = threading.Thread(
-    target=dht11_sensor.read_data,
-    kwargs={"interval": 2, "duration": 30}  # Monitor for 30 seconds with 2-second intervals
-)
-
-# Start monitoring for ultrasonic sensor in a separate thread
-ultrasonic_thread = threading.Thread(
-    target=ultrasonic_sensor.monitor,
-    kwargs={"interval": 5, "duration": 20}  # Monitor for 20 seconds with 5-second intervals
-)
-
-# Start both threads
-dht11_thread.start()
-ultrasonic_thread.start()
+# Start monitoring; both sensors are sampled by the shared scheduler
+dht11_job = dht11_sensor.read_data(interval=2, duration=30)  # Monitor for 30 seconds with 2-second intervals
+ultrasonic_job = ultrasonic_sensor.monitor(interval=5, duration=20)  # Monitor for 20 seconds with 5-second intervals
 
 # Keep the main program running
 try:
-    while dht11_thread.is_alive() or ultrasonic_thread.is_alive():
-        time.sleep(1)
+    dht11_job.wait()
+    ultrasonic_job.wait()
 except KeyboardInterrupt:
     logger.info("Stopping sensor monitoring...")
     dht11_sensor.stop_monitoring()
     ultrasonic_sensor.stop_monitoring()
-    dht11_thread.join()
-    ultrasonic_thread.join()
-    logger.info("Program stopped.")
\ No newline at end of file
+    logger.info("Program stopped.")
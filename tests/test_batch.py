@@ -0,0 +1,70 @@
+import json
+import threading
+import time
+
+from batch import BatchExecutor
+from dispatcher import CommandDispatcher
+
+
+class StubPublisher:
+    def __init__(self):
+        self.acks = []
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        self.acks.append(json.loads(payload))
+
+
+def led(state):
+    return {"component": "led", "data": {"pin": 17, "state": state}}
+
+
+def make_executor(applied, atomic_writer=None):
+    def handle_led(command):
+        time.sleep(0.05)
+        applied.append(command["data"]["state"])
+
+    handlers = {"led": handle_led}
+    dispatcher = CommandDispatcher(handlers, {"components": {"led": {"coalesce": ["pin"]}}})
+    config = {"atomic_components": ["led"]}
+    return dispatcher, BatchExecutor(handlers, dispatcher, StubPublisher(), "status", config, atomic_writer)
+
+
+def run_batch_after_singles(dispatcher, executor, envelope):
+    dispatcher.submit(led("ON"))
+    time.sleep(0.01)  # Let the first command start so the next one stays queued behind it
+    dispatcher.submit(led("OFF"))
+    thread = threading.Thread(target=executor.run, args=(envelope,))
+    thread.start()
+    thread.join(5)
+    dispatcher.shutdown(5)
+
+
+def test_inline_batch_runs_after_queued_singles():
+    applied = []
+    dispatcher, executor = make_executor(applied)
+    handle_led = executor.handlers["led"]
+
+    def handle_and_submit(command):
+        # A single command arriving while the batch applies must not overtake it
+        dispatcher.submit(led("LATE"))
+        handle_led(command)
+
+    executor.handlers = {"led": handle_and_submit}
+    run_batch_after_singles(dispatcher, executor, {"id": "b", "atomic": False, "commands": [led("BATCH")]})
+
+    assert applied == ["ON", "OFF", "BATCH", "LATE"]
+    assert executor.publisher.acks[0]["results"] == [{"status": "ok"}]
+
+
+def test_atomic_batch_runs_after_queued_singles():
+    applied = []
+
+    def apply_writes(commands):
+        dispatcher.submit(led("LATE"))
+        applied.extend(command["data"]["state"] for command in commands)
+
+    dispatcher, executor = make_executor(applied, apply_writes)
+    run_batch_after_singles(dispatcher, executor, {"id": "b", "atomic": True, "commands": [led("BATCH")]})
+
+    assert applied == ["ON", "OFF", "BATCH", "LATE"]
+    assert executor.publisher.acks[0]["results"] == [{"status": "ok"}]
@@ -0,0 +1,44 @@
+from hal import recorder
+from DHT_11 import DHT11Sensor
+from simulator import DHT11Model, SimDHT11
+
+PIN = 4
+
+
+class StubTelemetry:
+    def __init__(self):
+        self.samples = []
+
+    def submit(self, component, payload, key=None):
+        self.samples.append((component, key, payload))
+
+
+def make_sensor(model):
+    SimDHT11.attach(PIN, model)
+    telemetry = StubTelemetry()
+    sensor = DHT11Sensor(None, "telemetry", telemetry=telemetry)
+    sensor.setup(PIN)
+    return sensor, telemetry
+
+
+def test_sample_reads_the_sensor_through_the_hal():
+    sensor, telemetry = make_sensor(DHT11Model(temperature=23.4, humidity=55.6))
+    recorder.reset()
+    sensor.sample()
+    sensor.sample()
+
+    assert telemetry.samples == [("DHT11", PIN, {"temperature": 23, "humidity": 56})] * 2
+    assert recorder.counts("dht11.")["dht11.read"] == 2
+
+
+def test_invalid_reading_is_not_published():
+    sensor, telemetry = make_sensor(DHT11Model(error_rate=1.0))
+    sensor.sample()
+    assert telemetry.samples == []
+
+
+def test_sensor_without_a_model_reads_as_missing_data(monkeypatch):
+    monkeypatch.setattr(SimDHT11, "default", None)
+    result = SimDHT11(pin=99).read()
+    assert not result.is_valid()
+    assert result.error_code == SimDHT11.ERR_MISSING_DATA
@@ -0,0 +1,115 @@
+import threading
+import time
+
+from dispatcher import ComponentWorkerPool, POLICY_PREEMPT
+
+
+def blocking_handler(started, release):
+    def handle(command):
+        started.set()
+        release.wait(5)
+    return handle
+
+
+def test_preempt_cancel_hook_runs_outside_the_pool_lock():
+    started, release = threading.Event(), threading.Event()
+
+    def cancel():
+        # Hooks may call back into the pool, e.g. to read its counters
+        with pool.lock:
+            pass
+        release.set()
+
+    pool = ComponentWorkerPool("Keypad", blocking_handler(started, release), policy=POLICY_PREEMPT, cancel=cancel)
+    pool.submit({"component": "Keypad", "data": {}})
+    assert started.wait(5)
+
+    submitter = threading.Thread(target=pool.submit, args=({"component": "Keypad", "data": {}},))
+    submitter.start()
+    submitter.join(2)
+    assert not submitter.is_alive(), "submit() deadlocked in the cancel hook"
+    assert pool.stats["preempted"] == 1
+    pool.shutdown(5)
+    assert pool.stats["completed"] == 2
+
+
+def test_shutdown_honours_its_timeout_when_the_queue_is_full():
+    started, release = threading.Event(), threading.Event()
+    pool = ComponentWorkerPool("stepper_motor", blocking_handler(started, release), queue_size=1)
+    pool.submit({"component": "stepper_motor", "data": {}})
+    assert started.wait(5)
+    assert pool.submit({"component": "stepper_motor", "data": {}})
+
+    begin = time.monotonic()
+    pool.shutdown(timeout=0.2)
+    assert time.monotonic() - begin < 2
+    release.set()
+
+
+def run_coalesced(coalesce, commands):
+    # Holds the single worker on a first command so the rest wait in the queue, then returns what ran
+    started, release = threading.Event(), threading.Event()
+    handled = []
+
+    def handle(command):
+        if not started.is_set():
+            started.set()
+            release.wait(5)
+            return
+        handled.append(command["data"])
+
+    pool = ComponentWorkerPool("led", handle, coalesce=coalesce)
+    pool.submit({"component": "led", "data": {"pin": 0, "pins": [0]}})
+    assert started.wait(5)
+    for data in commands:
+        assert pool.submit({"component": "led", "data": data})
+    release.set()
+    pool.shutdown(5)
+    return handled, pool.stats
+
+
+def test_latest_command_wins_per_pin():
+    handled, stats = run_coalesced(["pin"], [
+        {"pin": 17, "state": "ON"}, {"pin": 27, "state": "ON"}, {"pin": 17, "state": "OFF"}, {"pin": 17, "state": "ON"},
+    ])
+    # The pin 17 slot keeps its place in the queue and carries the newest state
+    assert handled == [{"pin": 17, "state": "ON"}, {"pin": 27, "state": "ON"}]
+    assert stats["accepted"] == 5
+    assert stats["coalesced"] == 2
+
+
+def test_list_fields_are_coalescing_keys():
+    handled, _ = run_coalesced(["pins"], [
+        {"pins": [5, 6, 13], "color": "red"}, {"pins": [5, 6, 19], "color": "blue"}, {"pins": [5, 6, 13], "color": "green"},
+    ])
+    assert handled == [{"pins": [5, 6, 13], "color": "green"}, {"pins": [5, 6, 19], "color": "blue"}]
+
+
+def test_empty_key_keeps_only_the_newest_command():
+    handled, stats = run_coalesced([], [{"message": "a"}, {"message": "b"}, {"message": "c"}])
+    assert handled == [{"message": "c"}]
+    assert stats["coalesced"] == 2
+
+
+def test_no_coalescing_without_a_key():
+    handled, stats = run_coalesced(None, [{"pin": 17, "state": "ON"}, {"pin": 17, "state": "OFF"}])
+    assert handled == [{"pin": 17, "state": "ON"}, {"pin": 17, "state": "OFF"}]
+    assert stats["coalesced"] == 0
+
+
+def test_running_command_is_not_coalesced_into():
+    started, release = threading.Event(), threading.Event()
+    handled = []
+
+    def handle(command):
+        handled.append(command["data"]["state"])
+        started.set()
+        release.wait(5)
+
+    pool = ComponentWorkerPool("led", handle, coalesce=["pin"])
+    pool.submit({"component": "led", "data": {"pin": 17, "state": "ON"}})
+    assert started.wait(5)
+    pool.submit({"component": "led", "data": {"pin": 17, "state": "OFF"}})
+    release.set()
+    pool.shutdown(5)
+    assert handled == ["ON", "OFF"]
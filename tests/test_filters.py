@@ -0,0 +1,80 @@
+from filters import DeadbandFilter, FilterBank, StreamFilter
+
+
+def run(stream, samples):
+    emitted = []
+    for ts, values in samples:
+        emitted.extend(stream.process(ts, values))
+    return emitted
+
+
+def values(emitted, index=0):
+    return [sample[1][index] for sample in emitted]
+
+
+def test_deadband_reports_changes_beyond_the_band():
+    stream = StreamFilter(("t",), {"t": {"type": "deadband", "absolute": 0.5}})
+    emitted = run(stream, enumerate([(20.0,), (20.3,), (20.4,), (20.6,), (20.9,), (21.2,)]))
+    assert values(emitted) == [20.0, 20.6, 21.2]
+
+
+def test_deadband_percent_band_follows_the_last_report():
+    stream = StreamFilter(("h",), {"h": {"type": "deadband", "percent": 10}})
+    emitted = run(stream, enumerate([(50.0,), (54.0,), (56.0,), (61.0,), (62.0,)]))
+    # 10 % of 50 is 5, then 10 % of 56 is 5.6
+    assert values(emitted) == [50.0, 56.0, 62.0]
+
+
+def test_deadband_hysteresis_applies_on_reversal():
+    band = DeadbandFilter(absolute=0.5, hysteresis=0.2)
+    band.commit(0, 20.0)
+    band.commit(1, 20.6)  # Rising
+    assert band.check(2, 21.2) == 1  # Same direction: the plain band applies
+    assert band.check(2, 20.0) == 0  # Falling by 0.6 does not clear 0.5 + 0.2
+    assert band.check(2, 19.8) == 1
+
+
+def test_swinging_door_keeps_a_line_on_a_ramp():
+    stream = StreamFilter(("d",), {"d": {"type": "swinging_door", "deviation": 1.0}})
+    ramp = [(ts, (2.0 * ts,)) for ts in range(20)]
+    emitted = run(stream, ramp)
+    assert emitted == [ramp[0]]
+
+
+def test_swinging_door_reconstructs_within_the_deviation():
+    deviation = 1.0
+    stream = StreamFilter(("d",), {"d": {"type": "swinging_door", "deviation": deviation}})
+    signal = [(ts, (min(ts, 10) * 3.0 + (0.4 if ts % 2 else -0.4),)) for ts in range(30)]
+    emitted = run(stream, signal)
+    points = emitted + [signal[-1]]  # The tail after the last report is flushed by the next one
+    assert len(emitted) < len(signal) / 3
+    for ts, (value,) in signal:
+        (t0, (v0,)), (t1, (v1,)) = next((a, b) for a, b in zip(points, points[1:]) if a[0] <= ts <= b[0])
+        rebuilt = v0 + (v1 - v0) * (ts - t0) / (t1 - t0) if t1 > t0 else v0
+        assert abs(rebuilt - value) <= deviation + 1e-9
+
+
+def test_heartbeat_after_max_silence():
+    stream = StreamFilter(("t",), {"t": {"type": "deadband", "absolute": 5}}, max_silence=10)
+    emitted = run(stream, [(ts, (20.0,)) for ts in range(0, 25)])
+    assert [sample[0] for sample in emitted] == [0, 10, 20]
+
+
+def test_carried_fields_never_trigger_but_are_sent_along():
+    stream = StreamFilter(("d", "valid"), {"d": {"type": "deadband", "absolute": 1}, "valid": {"type": "carry"}})
+    emitted = run(stream, [(0, (10.0, True)), (1, (10.2, False)), (2, (12.0, False))])
+    assert emitted == [(0, (10.0, True)), (2, (12.0, False))]
+
+
+def test_fields_without_a_rule_report_on_change():
+    stream = StreamFilter(("motion",))
+    emitted = run(stream, enumerate([(0,), (0,), (1,), (1,), (0,)]))
+    assert values(emitted) == [0, 1, 0]
+
+
+def test_bank_passes_unconfigured_components_and_reports_ratios():
+    bank = FilterBank({"DHT11": {"fields": {"temperature": {"type": "deadband", "absolute": 1}}}})
+    assert bank.process("LDR Sensor", 25, ("level",), 0, (0.5,)) == [(0, (0.5,))]
+    for ts, temperature in enumerate([20.0, 20.1, 20.2, 25.0]):
+        bank.process("DHT11", 4, ("temperature",), ts, (temperature,))
+    assert bank.report() == {"DHT11": {"offered": 4, "reported": 2, "ratio": 0.5}}
@@ -0,0 +1,45 @@
+from hal import GPIO, recorder
+from ldr import LDRSensor
+from simulator import RCModel
+
+LDR_PIN, LIGHT_PIN = 25, 26
+
+
+def make_sensor(charge_us):
+    GPIO.reset()
+    RCModel(GPIO, LDR_PIN, charge_us)
+    sensor = LDRSensor(max_charge_ms=50, discharge_ms=1)
+    sensor.setup(LDR_PIN, LIGHT_PIN, threshold=1000)
+    return sensor
+
+
+def test_reading_follows_charge_time():
+    sensor = make_sensor(5000)
+    reading = sensor.read_ldr()
+    assert 5000 <= reading < 20000
+    assert sensor.report()["timeouts"] == 0
+
+
+def test_bright_light_is_not_read_as_darkness():
+    # Charged before the level is even checked: the reading must stay short, not hit the timeout
+    sensor = make_sensor(0)
+    recorder.reset()
+    readings = [sensor.read_ldr() for _ in range(20)]
+    assert max(readings) < sensor.max_charge_ms * 1000
+    assert sensor.report()["timeouts"] == 0
+    counts = recorder.counts("gpio.")
+    assert counts["gpio.add_event_detect"] == counts["gpio.remove_event_detect"] == 20
+
+
+def test_dark_reading_times_out_at_max_charge():
+    sensor = make_sensor(1_000_000)
+    assert sensor.read_ldr() == 50 * 1000
+    assert sensor.report()["timeouts"] == 1
+
+
+def test_short_charge_switches_the_light_on():
+    sensor = make_sensor(0)
+    sensor.ldr_threshold = 20000
+    sensor.update_light()
+    assert sensor.light_on
+    assert GPIO.level(LIGHT_PIN) == 1
@@ -0,0 +1,172 @@
+import struct
+import time
+
+from offline_buffer import OfflineBuffer, BufferedClient
+
+
+class Result:
+    def __init__(self, rc):
+        self.rc = rc
+
+
+class StubClient:
+    def __init__(self, connected=True, failures=0, on_publish=None):
+        self.connected = connected
+        self.failures = failures  # Number of publishes to fail (rc != 0) before succeeding
+        self.on_publish = on_publish
+        self.sent = []
+
+    def is_connected(self):
+        return self.connected
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        if self.on_publish is not None:
+            hook, self.on_publish = self.on_publish, None
+            hook()
+        if self.failures:
+            self.failures -= 1
+            return Result(1)
+        self.sent.append(payload.encode() if isinstance(payload, str) else payload)
+        return Result(0)
+
+
+def wait_until_empty(buffer, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not buffer.is_empty() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    if buffer.drain_thread is not None:
+        buffer.drain_thread.join(timeout)
+
+
+def test_replay_keeps_order_across_segments(tmp_path):
+    buffer = OfflineBuffer(str(tmp_path), segment_bytes=64, drain_rate=0)
+    messages = [f"m{i:03d}".encode() for i in range(20)]
+    for message in messages:
+        assert buffer.append("t", message)
+    assert len(buffer.segments) > 1
+
+    client = StubClient()
+    buffer.start_drain(client)
+    wait_until_empty(buffer)
+
+    assert client.sent == messages
+    assert buffer.report()["replayed"] == len(messages)
+    assert buffer.total_bytes() == 0
+
+
+def test_replay_order_survives_restart(tmp_path):
+    buffer = OfflineBuffer(str(tmp_path), segment_bytes=64, drain_rate=0)
+    messages = [f"m{i:03d}".encode() for i in range(10)]
+    for message in messages:
+        buffer.append("t", message)
+    buffer.close()
+
+    reloaded = OfflineBuffer(str(tmp_path), segment_bytes=64, drain_rate=0)
+    assert reloaded.report()["pending"] == len(messages)
+    client = StubClient()
+    reloaded.start_drain(client)
+    wait_until_empty(reloaded)
+    assert client.sent == messages
+
+
+def test_failed_publish_while_connected_is_drained(tmp_path):
+    buffer = OfflineBuffer(str(tmp_path), drain_rate=0)
+    client = StubClient(failures=1)
+    publisher = BufferedClient(client, buffer)
+    for i in range(5):
+        publisher.publish("t", f"m{i}")
+    wait_until_empty(buffer)
+
+    assert client.sent == [f"m{i}".encode() for i in range(5)]
+    assert buffer.report()["pending"] == 0
+
+
+def test_buffered_while_offline_waits_for_drain(tmp_path):
+    buffer = OfflineBuffer(str(tmp_path), drain_rate=0)
+    client = StubClient(connected=False)
+    publisher = BufferedClient(client, buffer)
+    publisher.publish("t", "m0")
+    time.sleep(0.05)
+    assert client.sent == []
+    assert buffer.report()["pending"] == 1
+
+
+def test_drop_oldest_during_replay(tmp_path):
+    # 16-byte records in 64-byte segments; newer records are longer, so a stale offset lands mid-record
+    buffer = OfflineBuffer(str(tmp_path), max_bytes=192, segment_bytes=64, drain_rate=0)
+    old = [f"old-{i:03d}".encode() for i in range(8)]
+    new = [f"new-record-{i:03d}".encode() for i in range(12)]
+    for message in old:
+        buffer.append("t", message)
+
+    def fill():
+        # Appends while the first record is being published, dropping the segment it came from
+        for message in new:
+            buffer.append("t", message)
+
+    client = StubClient(on_publish=fill)
+    buffer.start_drain(client)
+    wait_until_empty(buffer)
+
+    assert client.sent[0] == old[0]
+    replayed_new = client.sent[1:]
+    assert replayed_new, "newer records were not replayed"
+    assert replayed_new == new[len(new) - len(replayed_new):]
+    # The record in flight when its segment was dropped counts as dropped, not replayed
+    report = buffer.report()
+    assert report["replayed"] == len(replayed_new)
+    assert report["dropped"] + report["replayed"] == len(old) + len(new)
+
+
+def test_unordered_client_skips_the_backlog(tmp_path):
+    buffer = OfflineBuffer(str(tmp_path), drain_rate=0)
+    for i in range(3):
+        buffer.append("t", f"old-{i}")
+    client = StubClient()
+    alerts = BufferedClient(client, buffer, ordered=False)
+    alerts.publish("alerts", "alert")
+    assert client.sent == [b"alert"]
+    assert buffer.report()["pending"] == 3
+
+    client.connected = False
+    alerts.publish("alerts", "offline alert")
+    assert buffer.report()["pending"] == 4
+
+
+def test_torn_records_are_truncated_on_load(tmp_path):
+    for tail in (b"\x05\x00", struct.pack("<HIBB", 1, 100, 0, 0) + b"t" + b"short"):
+        directory = tmp_path / str(len(tail))
+        buffer = OfflineBuffer(str(directory), drain_rate=0)
+        for i in range(3):
+            buffer.append("t", f"m{i}")
+        buffer.close()
+        segment = next(directory.glob("*.seg"))
+        intact = segment.stat().st_size
+        with open(segment, "ab") as f:
+            f.write(tail)
+
+        reloaded = OfflineBuffer(str(directory), drain_rate=0)
+        assert segment.stat().st_size == intact
+        assert reloaded.report()["pending"] == 3
+        client = StubClient()
+        reloaded.start_drain(client)
+        wait_until_empty(reloaded)
+        assert client.sent == [b"m0", b"m1", b"m2"]
+
+
+def test_publish_exception_releases_the_drain(tmp_path):
+    buffer = OfflineBuffer(str(tmp_path), drain_rate=0)
+    buffer.append("t", "m0")
+
+    def fail():
+        raise RuntimeError("socket closed")
+
+    client = StubClient(on_publish=fail)
+    buffer.start_drain(client)
+    buffer.drain_thread.join(5)
+    assert not buffer.draining
+    assert buffer.report()["pending"] == 1
+
+    buffer.start_drain(client)
+    wait_until_empty(buffer)
+    assert client.sent == [b"m0"]
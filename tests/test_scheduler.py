@@ -0,0 +1,116 @@
+import threading
+import time
+
+import pytest
+
+from scheduler import Scheduler
+from timing import CATCH_UP, RESYNC, SKIP
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.scheduler = None
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        with self.scheduler.condition:
+            self.now += seconds
+            self.scheduler.condition.notify()
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+@pytest.fixture
+def clock():
+    clock = FakeClock()
+    clock.scheduler = Scheduler(workers=1, clock=clock)
+    yield clock
+    clock.scheduler.shutdown(timeout=1)
+
+
+def settle(job, next_run, runs):
+    # Wait for the timer to move the job to next_run and for the worker to finish its runs
+    wait_for(lambda: job.next_run == next_run and job.runs + job.overruns == runs and not job.running)
+
+
+@pytest.mark.parametrize("policy, next_run, ticks, missed", [
+    (SKIP, 3.0, 2, 1),      # One late run for the tick due at 1; the one due at 2 is dropped
+    (CATCH_UP, 3.0, 3, 0),  # The ticks due at 1 and 2 both run, back to back
+    (RESYNC, 3.5, 2, 0),    # One late run, and the grid restarts from it
+])
+def test_policy_for_ticks_the_timer_fell_behind_on(clock, policy, next_run, ticks, missed):
+    job = clock.scheduler.every(1.0, lambda: None, policy=policy)
+    settle(job, 1.0, 1)
+
+    clock.advance(2.5)
+    settle(job, next_run, ticks)
+    assert job.missed == missed
+
+
+def test_runs_stay_on_the_grid(clock):
+    ran = []
+    job = clock.scheduler.every(1.0, lambda: ran.append(clock()))
+    settle(job, 1.0, 1)
+    for tick in range(1, 4):
+        clock.advance(1.1 if tick == 1 else 1.0)  # A late first tick does not shift the later ones
+        settle(job, tick + 1.0, tick + 1)
+    assert ran == [0.0, 1.1, 2.1, 3.1]
+    assert job.missed == 0
+
+
+def test_duration_ends_the_job(clock):
+    done = threading.Event()
+    job = clock.scheduler.every(1.0, lambda: None, duration=2.0, on_done=lambda job: done.set())
+    settle(job, 1.0, 1)
+    clock.advance(1.0)
+    settle(job, 2.0, 2)
+    assert job.remaining() == 1.0
+    clock.advance(1.0)
+    assert done.wait(5)
+    assert job.runs == 2
+    assert job not in clock.scheduler.jobs()
+
+
+def test_returning_false_ends_the_job(clock):
+    job = clock.scheduler.every(1.0, lambda: False)
+    assert job.wait(5)
+    assert job.runs == 1
+
+
+def test_after_runs_once_at_its_deadline(clock):
+    ran = []
+    job = clock.scheduler.after(2.0, lambda: ran.append(clock()))
+    clock.advance(1.0)
+    time.sleep(0.05)
+    assert ran == []
+    clock.advance(1.5)
+    assert job.wait(5)
+    assert ran == [2.5]
+
+
+def test_reschedule_takes_effect_from_the_next_run(clock):
+    job = clock.scheduler.every(10.0, lambda: None)
+    settle(job, 10.0, 1)
+    job.reschedule(2.0)
+    assert job.next_run == 2.0
+    clock.advance(2.0)
+    settle(job, 4.0, 2)
+
+
+def test_overrun_skips_the_tick_instead_of_queueing_it(clock):
+    release = threading.Event()
+    job = clock.scheduler.every(1.0, lambda: release.wait(5))
+    wait_for(lambda: job.running)
+    clock.advance(1.0)
+    wait_for(lambda: job.overruns == 1)
+    release.set()
+    wait_for(lambda: not job.running)
+    assert job.runs == 1
@@ -0,0 +1,128 @@
+import time
+
+import pytest
+
+from hal import GPIO
+from steppermotor import PHASES, StepperMotor, ramp_table
+
+A_PINS = (16, 19, 20, 21)
+B_PINS = (10, 11, 12, 13)
+
+
+@pytest.fixture
+def motor():
+    GPIO.reset()
+    motor = StepperMotor(start_speed=200, max_speed=5000, accel=20000, profile="none")
+    yield motor
+    motor.stop(immediate=True)
+
+
+def record_steps(motor, axes):
+    # Each step rewrites exactly two coils of one axis, in one GPIO.output call per tick
+    writes = []
+    for name, pins in axes.items():
+        motor.axis(pins)
+        for pin in pins:
+            GPIO.on_output(pin, lambda level, t_ns, name=name: writes.append(name))
+    return writes
+
+
+def coils(pins):
+    return tuple(GPIO.level(pin) for pin in pins)
+
+
+def test_bresenham_interleaves_a_three_to_one_move(motor):
+    writes = record_steps(motor, {"A": A_PINS, "B": B_PINS})
+    motion = motor.move_many([(A_PINS, 300, "clockwise"), (B_PINS, 100, "counterclockwise")])
+    assert motion.wait(5)
+
+    steps = writes[::2]
+    assert steps.count("A") == 300 and steps.count("B") == 100
+    b_steps = [i for i, name in enumerate(steps) if name == "B"]
+    # Three A steps between consecutive B steps, and B centred on its first and last share of the line
+    assert all(later - earlier == 4 for earlier, later in zip(b_steps, b_steps[1:]))
+    assert b_steps[0] <= 2 and len(steps) - 1 - b_steps[-1] <= 2
+    assert motion.describe()["motors"] == [
+        {"pins": list(A_PINS), "position": 300, "steps": 300},
+        {"pins": list(B_PINS), "position": -100, "steps": 100},
+    ]
+    assert coils(A_PINS) == PHASES[300 % 4]
+    assert coils(B_PINS) == PHASES[-100 % 4]
+
+
+def test_goto_returns_to_an_absolute_position(motor):
+    motor.move(A_PINS, 37, "clockwise").wait(5)
+    motor.move(A_PINS, 50, "counterclockwise").wait(5)
+    assert motor.position(A_PINS) == -13
+
+    motion = motor.goto(A_PINS, 5)
+    assert motion.wait(5)
+    assert motion.describe()["motors"][0]["steps"] == 18
+    assert motor.position(A_PINS) == 5
+    assert coils(A_PINS) == PHASES[5 % 4]
+
+
+def test_stopping_one_axis_stops_the_coordinated_move(motor):
+    motion = motor.move_many([(A_PINS, 100000, "clockwise"), (B_PINS, 50000, "clockwise")], speed=2000)
+    time.sleep(0.05)
+    motor.stop(B_PINS, immediate=True)
+    assert not motion.is_active()
+    a, b = (motor["steps"] for motor in motion.describe()["motors"])
+    assert 0 < a < 100000
+    assert abs(a - 2 * b) <= 1
+
+
+def test_stop_decelerates_along_the_ramp():
+    GPIO.reset()
+    motor = StepperMotor(start_speed=200, max_speed=2000, accel=20000, profile="trapezoid")
+    ramp = ramp_table("trapezoid", 200, 2000, 20000)
+    motion = motor.jog(A_PINS)
+    time.sleep(0.2)  # Past the ramp, at cruise speed
+    at_stop = motor.position(A_PINS)
+    motor.stop(A_PINS)
+
+    # The motor keeps stepping through the ramp backwards before it stops
+    assert abs(motor.position(A_PINS) - at_stop - len(ramp)) <= 2
+    assert motion.error is None
+
+
+def test_immediate_stop_skips_the_deceleration():
+    GPIO.reset()
+    motor = StepperMotor(start_speed=200, max_speed=2000, accel=20000, profile="trapezoid")
+    motor.jog(A_PINS)
+    time.sleep(0.2)
+    at_stop = motor.position(A_PINS)
+    motor.stop(A_PINS, immediate=True)
+    assert motor.position(A_PINS) - at_stop <= 2
+
+
+def test_short_move_ramps_down_from_wherever_it_got_to():
+    GPIO.reset()
+    # 20 steps is far shorter than the ramp: accelerate for half of them and decelerate for the rest
+    motion = StepperMotor(start_speed=200, max_speed=2000, accel=2000, profile="trapezoid").move(A_PINS, 20)
+    assert motion.wait(5)
+    assert motion.describe()["motors"][0]["steps"] == 20
+
+
+@pytest.mark.parametrize("profile", ["trapezoid", "scurve"])
+def test_ramp_table_accelerates_to_cruise(profile):
+    ramp = ramp_table(profile, 200, 1000, 2000)
+    assert all(a >= b for a, b in zip(ramp, ramp[1:]))  # Intervals only shrink
+    assert ramp[0] < 1 / 200
+    assert ramp[-1] >= 1 / 1000 - 1e-9
+    # The trapezoid reaches cruise in (1000 - 200) / 2000 s; the S-curve, with the same peak, takes 1.5 times as long
+    expected = 0.4 if profile == "trapezoid" else 0.6
+    assert sum(ramp) == pytest.approx(expected, rel=0.05)
+
+
+def test_scurve_starts_gentler_than_the_trapezoid():
+    trapezoid = ramp_table("trapezoid", 200, 1000, 2000)
+    scurve = ramp_table("scurve", 200, 1000, 2000)
+    assert scurve[1] > trapezoid[1]
+    assert len(scurve) > len(trapezoid)
+
+
+def test_no_ramp_when_not_needed():
+    assert ramp_table("none", 200, 1000, 2000) == ()
+    assert ramp_table("trapezoid", 200, 200, 2000) == ()
+    assert ramp_table("trapezoid", 200, 1000, 0) == ()
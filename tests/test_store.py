@@ -0,0 +1,38 @@
+import os
+import time
+
+from store import TimeSeriesStore
+
+
+def fill(store, rows, ts):
+    for i in range(rows):
+        store.record("DHT11", 4, {"temperature": 20.0 + i % 10, "humidity": 40.0}, ts=ts + i)
+    store.flush()
+
+
+def test_prune_shrinks_the_database_file(tmp_path):
+    path = str(tmp_path / "ts.db")
+    store = TimeSeriesStore(path, batch_size=1000, max_bytes=256 * 1024)
+    fill(store, 20000, time.time() - 20000)
+    store._checkpoint()
+    before = os.path.getsize(path)
+    assert before > store.max_bytes
+
+    assert store.prune() > 0
+    assert os.path.getsize(path) < before
+    assert store.size() <= store.max_bytes
+    assert store.db.execute("PRAGMA freelist_count").fetchone()[0] == 0
+    store.close()
+
+
+def test_prune_by_age(tmp_path):
+    store = TimeSeriesStore(str(tmp_path / "ts.db"), max_age=60)
+    now = time.time()
+    store.record("DHT11", 4, {"temperature": 20.0}, ts=now - 120)
+    store.record("DHT11", 4, {"temperature": 21.0}, ts=now)
+    store.flush()
+
+    assert store.prune() == 1
+    series = store.query("DHT11", seconds=3600, bucket=3600, end=now + 1)["series"]
+    assert [samples[3] for samples in series[0]["samples"]][0] == 21.0
+    store.close()
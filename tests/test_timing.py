@@ -0,0 +1,70 @@
+import pytest
+
+import timing
+from timing import CATCH_UP, RESYNC, SKIP, Ticker, next_deadline
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(timing.time, "sleep", clock.sleep)
+    return clock
+
+
+@pytest.mark.parametrize("policy, expected", [
+    (CATCH_UP, (1.0, 0)),
+    (SKIP, (4.0, 3)),
+    (RESYNC, (3.5, 0)),
+])
+def test_next_deadline_when_behind(policy, expected):
+    assert next_deadline(0.0, 1.0, 3.5, policy) == expected
+
+
+@pytest.mark.parametrize("policy", [CATCH_UP, SKIP, RESYNC])
+def test_next_deadline_on_time(policy):
+    assert next_deadline(0.0, 1.0, 0.5, policy) == (1.0, 0)
+
+
+def test_ticker_sleeps_to_absolute_deadlines(clock):
+    ticker = Ticker(1.0, clock=clock)
+    for tick in range(1, 4):
+        clock.now += 0.3  # The loop's own work does not shift the grid
+        assert ticker.wait() == 0
+        assert clock.now == tick
+    assert ticker.report() == {"ticks": 3, "late": 0, "missed": 0, "max_lag_ms": 0.0}
+
+
+def test_ticker_skip_drops_missed_ticks(clock):
+    ticker = Ticker(1.0, policy=SKIP, clock=clock)
+    clock.now = 3.5
+    assert ticker.wait() == 0  # Waits for the next deadline on the grid
+    assert clock.now == 4.0
+    assert (ticker.missed, ticker.late) == (3, 1)
+
+
+def test_ticker_catch_up_runs_missed_ticks_back_to_back(clock):
+    ticker = Ticker(1.0, policy=CATCH_UP, clock=clock)
+    clock.now = 3.5
+    lags = [ticker.wait() for _ in range(4)]
+    assert lags == [2.5, 1.5, 0.5, 0]
+    assert (ticker.missed, ticker.late) == (0, 3)
+
+
+def test_ticker_resync_restarts_the_grid_and_reports_the_lateness(clock):
+    ticker = Ticker(1.0, policy=RESYNC, clock=clock)
+    clock.now = 3.5
+    assert ticker.wait() == 2.5  # Late against the old grid, even though it runs at once
+    assert ticker.wait() == 0
+    assert clock.now == 4.5
+    assert ticker.max_lag == 2.5
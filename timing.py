@@ -0,0 +1,130 @@
+import math
+import time
+
+# What to do with ticks whose deadline has already passed
+CATCH_UP = "catch_up"  # Run them back to back until the loop is back on its grid
+SKIP = "skip"          # Drop them and wait for the next deadline on the grid
+RESYNC = "resync"      # Run once now and restart the grid from here (no burst, no dropped ticks)
+POLICIES = (CATCH_UP, SKIP, RESYNC)
+
+# Histogram bounds for tick lateness: finer than request latencies, down to 10 us
+JITTER_BUCKETS_MS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000)
+
+
+def sleep_until(deadline, spin=0.0, clock=time.perf_counter):
+    """
+    Sleep until an absolute deadline. time.sleep() can overshoot by a scheduler quantum, so the
+    last `spin` seconds are busy-waited instead.
+
+    Args:
+        deadline (float): Deadline on the clock's timescale.
+        spin (float): Seconds before the deadline to stop sleeping and spin.
+        clock (callable): Monotonic clock the deadline refers to.
+
+    Returns:
+        float: Seconds past the deadline on return (0 or more).
+    """
+    remaining = deadline - clock()
+    if remaining > spin:
+        time.sleep(remaining - spin)
+    now = clock()
+    while now < deadline:
+        now = clock()
+    return now - deadline
+
+
+def next_deadline(deadline, interval, now, policy=SKIP):
+    """
+    Return the deadline following one, applying a policy when the loop has fallen behind.
+
+    Args:
+        deadline (float): Deadline of the tick that has just run.
+        interval (float): Period (in seconds).
+        now (float): Current time, on the same clock.
+        policy (str): CATCH_UP, SKIP or RESYNC.
+
+    Returns:
+        tuple: The next deadline and the number of ticks skipped to reach it.
+    """
+    following = deadline + interval
+    if following > now or policy == CATCH_UP or interval <= 0:
+        return following, 0
+    if policy == RESYNC:
+        return now, 0
+    missed = math.floor((now - following) / interval) + 1
+    return following + missed * interval, missed
+
+
+class Ticker:
+    def __init__(self, interval, policy=SKIP, spin=0.0, jitter=None, clock=time.perf_counter):
+        """
+        Pace a loop on absolute deadlines, so the period does not drift by the loop's own work time.
+
+            ticker = Ticker(0.01)
+            while running:
+                ticker.wait()
+                ...
+
+        Args:
+            interval (float): Default period (in seconds). wait() can override it per tick.
+            policy (str): What to do when a tick's deadline has passed (CATCH_UP, SKIP or RESYNC).
+            spin (float): Seconds of busy-waiting before each deadline, for sub-millisecond accuracy.
+            jitter (Histogram): Records each tick's lateness in milliseconds. None skips it.
+            clock (callable): Monotonic clock.
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown timing policy: {policy}")
+        self.interval = interval
+        self.policy = policy
+        self.spin = spin
+        self.jitter = jitter
+        self.clock = clock
+        self.deadline = clock()
+        self.ticks = 0
+        self.late = 0  # Ticks whose deadline had passed before wait() was called
+        self.missed = 0  # Ticks dropped by SKIP
+        self.max_lag = 0.0
+
+    def wait(self, interval=None):
+        """
+        Block until the next tick is due.
+
+        Args:
+            interval (float): Time (in seconds) from the previous deadline to this one. Defaults to the ticker's.
+
+        Returns:
+            float: Seconds the tick started after its deadline.
+        """
+        interval = self.interval if interval is None else interval
+        due = self.deadline + interval
+        now = self.clock()
+        deadline, missed = next_deadline(self.deadline, interval, now, self.policy)
+        if missed:
+            self.missed += missed
+        lag = sleep_until(deadline, self.spin, self.clock)
+        if self.policy == RESYNC:
+            lag += deadline - due  # The grid moved to now; the tick is still late against the old one
+        self.deadline = deadline
+        self.ticks += 1
+        if now > due:
+            self.late += 1
+        self.max_lag = max(self.max_lag, lag)
+        if self.jitter is not None:
+            self.jitter.observe(lag * 1000)
+        return lag
+
+    def reset(self):
+        """
+        Restart the grid from now.
+        """
+        self.deadline = self.clock()
+
+    def report(self):
+        """
+        Return the ticker's timing statistics.
+
+        Returns:
+            dict: Ticks, late ticks, skipped ticks and worst lag in milliseconds.
+        """
+        return {"ticks": self.ticks, "late": self.late, "missed": self.missed,
+                "max_lag_ms": round(self.max_lag * 1000, 3)}
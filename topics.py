@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TopicLayout:
+    def __init__(self, base, subtopics=None):
+        """
+        Build the per-asset topic layout under a base topic.
+
+        Args:
+            base (str): Asset base topic (e.g. 'a/raspberry_1699360539765').
+            subtopics (dict): Names of the 'cmd', 'telemetry', 'status', 'schema', 'alerts' and 'metrics' subtopics.
+        """
+        subtopics = subtopics or {}
+        self.base = base.rstrip("/")
+        self.cmd = f"{self.base}/{subtopics.get('cmd', 'cmd')}"
+        self.telemetry = f"{self.base}/{subtopics.get('telemetry', 'telemetry')}"
+        self.status = f"{self.base}/{subtopics.get('status', 'status')}"
+        self.schema = f"{self.base}/{subtopics.get('schema', 'schema')}"  # Retained encoding descriptors
+        self.alerts = f"{self.base}/{subtopics.get('alerts', 'alerts')}"  # Anomalies, published as they are detected
+        self.metrics = f"{self.base}/{subtopics.get('metrics', 'metrics')}"  # Periodic metrics snapshots
+
+    def is_command(self, topic):
+        """
+        Check whether a topic is this asset's command topic.
+
+        Args:
+            topic (str): Topic of a received message.
+
+        Returns:
+            bool: True if the topic carries commands for this asset.
+        """
+        return topic == self.cmd
+
+
+class EchoSuppressor:
+    def __init__(self, max_entries=1024, ttl=30):
+        """
+        Remember recently published messages so their echoes can be dropped.
+
+        Args:
+            max_entries (int): Maximum number of remembered messages.
+            ttl (float): Time (in seconds) a published message is remembered.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.recent = OrderedDict()  # (topic, payload hash) -> [expiry, outstanding count]
+        self.lock = threading.Lock()
+        self.suppressed = 0
+
+    @staticmethod
+    def _key(topic, payload):
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        return topic, hash(payload)
+
+    def record(self, topic, payload):
+        """
+        Remember a message this device is about to publish.
+
+        Args:
+            topic (str): Topic the message is published to.
+            payload (str or bytes): Message payload.
+        """
+        key = self._key(topic, payload)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.recent.pop(key, None)
+            count = entry[1] + 1 if entry else 1
+            self.recent[key] = [now + self.ttl, count]
+            while len(self.recent) > self.max_entries:
+                self.recent.popitem(last=False)
+
+    def is_echo(self, topic, payload):
+        """
+        Check (and consume) whether a received message was published by this device.
+
+        Args:
+            topic (str): Topic of the received message.
+            payload (bytes): Payload of the received message.
+
+        Returns:
+            bool: True if the message is an echo of our own publish.
+        """
+        key = self._key(topic, payload)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.recent.get(key)
+            if entry is None:
+                return False
+            if entry[0] < now:
+                del self.recent[key]
+                return False
+            entry[1] -= 1
+            if entry[1] <= 0:
+                del self.recent[key]
+            self.suppressed += 1
+            return True
+
+
+class TrackedClient:
+    def __init__(self, client, suppressor, metrics=None):
+        """
+        Wrap an MQTT client so every publish is recorded for echo suppression.
+
+        Args:
+            client (mqtt.Client): Underlying MQTT client.
+            suppressor (EchoSuppressor): Suppressor that remembers outgoing messages.
+            metrics (MetricsRegistry): Registry counting publishes per topic and result. None disables counting.
+        """
+        self._client = client
+        self._suppressor = suppressor
+        self._metrics = metrics
+        self._counters = {}  # Topic -> (published, failed) counters
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        """
+        Record and publish a message.
+
+        Args:
+            topic (str): Topic to publish to.
+            payload (str or bytes): Message payload.
+            qos (int): MQTT quality of service.
+            retain (bool): Whether the broker should retain the message.
+        """
+        if payload is not None:
+            self._suppressor.record(topic, payload)
+        if self._metrics is None:
+            return self._client.publish(topic, payload, qos=qos, retain=retain)
+        counters = self._counters.get(topic)
+        if counters is None:
+            counters = self._counters[topic] = (
+                self._metrics.counter("mqtt_publish_total", "Messages handed to the MQTT client", topic=topic, result="ok"),
+                self._metrics.counter("mqtt_publish_total", topic=topic, result="failed"),
+            )
+        try:
+            result = self._client.publish(topic, payload, qos=qos, retain=retain)
+        except Exception:
+            counters[1].inc()
+            raise
+        counters[getattr(result, "rc", 0) != 0].inc()
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
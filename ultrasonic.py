@@ -67,27 +67,162 @@
 #         self.threshold_dist = threshold
 
 
-# import RPi.GPIO as GPIO
+from hal import GPIO
 import time
-import random
+import statistics
 import paho.mqtt.client as mqtt
 import json
 import logging
+from scheduler import get_default_scheduler
+from timing import Ticker, RESYNC
+
+ECHO_RISE_TIMEOUT_NS = 5_000_000  # The echo line rises well under 1 ms after the trigger; give up after 5 ms
+TRIGGER_PULSE = 0.00001  # 10 us trigger pulse
+
+
+class UltrasonicRanger:
+    def __init__(self, trig_pin, echo_pin, max_range_cm=400, pings=5, ping_gap=0.06,
+                 aggregate="median", trim=0.2, outlier_k=3.0, min_valid=None, temperature_c=20.0):
+        """
+        Bounded HC-SR04 style ranging: every wait is timed with a nanosecond monotonic clock and capped,
+        and each sample is aggregated from a burst of pings.
+
+        Args:
+            trig_pin (int): GPIO pin number for the trigger pin.
+            echo_pin (int): GPIO pin number for the echo pin.
+            max_range_cm (float): Farthest distance measured; sets the per-ping echo timeout.
+            pings (int): Pings per sample.
+            ping_gap (float): Pause (in seconds) between pings so old echoes die out.
+            aggregate (str): 'median' or 'trimmed_mean'.
+            trim (float): Fraction cut from each end for 'trimmed_mean'.
+            outlier_k (float): Reject pings more than k scaled median absolute deviations from the median.
+            min_valid (int): Valid pings needed for a sample. Defaults to a majority of the burst.
+            temperature_c (float): Air temperature used for the speed of sound.
+        """
+        if aggregate not in ("median", "trimmed_mean"):
+            raise ValueError(f"Unknown aggregation: {aggregate}")
+        self.trig_pin = trig_pin
+        self.echo_pin = echo_pin
+        self.max_range_cm = max_range_cm
+        self.pings = pings
+        self.ping_gap = ping_gap
+        self.aggregate = aggregate
+        self.trim = trim
+        self.outlier_k = outlier_k
+        self.min_valid = min_valid if min_valid is not None else pings // 2 + 1
+        self.set_temperature(temperature_c)
+        self.logger = logging.getLogger(__name__)
+
+    def set_temperature(self, temperature_c):
+        """
+        Update the speed of sound (and the echo timeout) for the current air temperature.
+
+        Args:
+            temperature_c (float): Air temperature in °C.
+        """
+        self.speed_cm_per_ns = (331.3 + 0.606 * temperature_c) * 100 / 1e9
+        # Round trip to max range, plus 10% for sensor latency
+        self.echo_timeout_ns = int(2 * self.max_range_cm / self.speed_cm_per_ns * 1.1)
+
+    def _wait_for(self, level, deadline_ns):
+        # Spin until the echo pin reaches level; returns the time it did, or None at the deadline
+        now = time.perf_counter_ns()
+        while GPIO.input(self.echo_pin) != level:
+            now = time.perf_counter_ns()
+            if now > deadline_ns:
+                return None
+        return now
+
+    def ping(self):
+        """
+        Send one ping and time its echo.
+
+        Returns:
+            float: Distance in centimeters, or None if the echo was missing or beyond max range.
+        """
+        start = time.perf_counter_ns()
+        # A previous echo still high would be mistaken for this one
+        if self._wait_for(GPIO.LOW, start + self.echo_timeout_ns) is None:
+            return None
+        GPIO.output(self.trig_pin, True)
+        time.sleep(TRIGGER_PULSE)
+        GPIO.output(self.trig_pin, False)
+
+        rise = self._wait_for(GPIO.HIGH, time.perf_counter_ns() + ECHO_RISE_TIMEOUT_NS)
+        if rise is None:
+            return None
+        fall = self._wait_for(GPIO.LOW, rise + self.echo_timeout_ns)
+        if fall is None:
+            return None  # No echo within max range
+        return (fall - rise) * self.speed_cm_per_ns / 2
+
+    def sample(self):
+        """
+        Take a burst of pings and aggregate them into one reading.
+
+        Returns:
+            dict: 'distance' (cm, None if too few valid pings), 'valid' (pings kept), 'pings',
+            'rejected' (outliers dropped), 'spread' (cm between the kept extremes) and 'elapsed_ms'.
+        """
+        start = time.perf_counter_ns()
+        readings = []
+        # Pings start ping_gap apart however long each echo took; a late one pushes the rest back
+        ticker = Ticker(self.ping_gap, RESYNC)
+        for i in range(self.pings):
+            if i:
+                ticker.wait()
+            distance = self.ping()
+            if distance is not None:
+                readings.append(distance)
+
+        kept = readings
+        if len(readings) >= 3:
+            median = statistics.median(readings)
+            mad = statistics.median(abs(r - median) for r in readings)
+            if mad > 0:
+                kept = [r for r in readings if abs(r - median) <= self.outlier_k * 1.4826 * mad]
+
+        distance = None
+        if len(kept) >= self.min_valid:
+            distance = round(self._aggregate(sorted(kept)), 2)
+        return {
+            "distance": distance,
+            "valid": len(kept),
+            "pings": self.pings,
+            "rejected": len(readings) - len(kept),
+            "spread": round(max(kept) - min(kept), 2) if kept else None,
+            "elapsed_ms": round((time.perf_counter_ns() - start) / 1e6, 2),
+        }
+
+    def _aggregate(self, values):
+        if self.aggregate == "median":
+            return statistics.median(values)
+        cut = int(len(values) * self.trim)
+        trimmed = values[cut:len(values) - cut] or values
+        return sum(trimmed) / len(trimmed)
+
 
 class UltrasonicSensor:
-    def __init__(self, client: mqtt.Client, topic: str):
+    def __init__(self, client: mqtt.Client, topic: str, telemetry=None, scheduler=None, ranging=None):
         """
         Initialize the ultrasonic sensor with an MQTT client and topic.
         
         Args:
             client (mqtt.Client): MQTT client for publishing sensor data.
             topic (str): MQTT topic to publish sensor data to.
+            telemetry (TelemetryPublisher): Shared batching publisher. If None, each reading is published directly.
+            scheduler (Scheduler): Scheduler running the periodic readings. Defaults to the shared scheduler.
+            ranging (dict): UltrasonicRanger settings (max range, burst size, aggregation).
         """
         self.client = client
         self.topic = topic  # Store the MQTT topic
+        self.telemetry = telemetry
+        self.scheduler = scheduler or get_default_scheduler()
         self.trig_pin = None
         self.echo_pin = None
-        self.monitoring_active = False  # Flag to control monitoring loop
+        self.ranging = ranging or {}
+        self.ranger = None
+        self.job = None  # Scheduled monitoring job
         self.logger = logging.getLogger(__name__)
 
     def setup(self, trig_pin, echo_pin):
@@ -102,9 +237,11 @@ class UltrasonicSensor:
             self.trig_pin = trig_pin
             self.echo_pin = echo_pin
 
-            # GPIO.setmode(GPIO.BCM)
-            # GPIO.setup(self.trig_pin, GPIO.OUT)
-            # GPIO.setup(self.echo_pin, GPIO.IN)
+            GPIO.setmode(GPIO.BCM)
+            GPIO.setup(self.trig_pin, GPIO.OUT)
+            GPIO.setup(self.echo_pin, GPIO.IN)
+            GPIO.output(self.trig_pin, False)
+            self.ranger = UltrasonicRanger(trig_pin, echo_pin, **self.ranging)
             self.logger.info(f"Ultrasonic sensor setup on trig_pin {trig_pin} and echo_pin {echo_pin}")
         except Exception as e:
             self.logger.error(f"Failed to setup ultrasonic sensor: {e}")
@@ -115,73 +252,75 @@ class UltrasonicSensor:
         Measure distance using the ultrasonic sensor.
         
         Returns:
-            float: Distance in centimeters.
+            float: Distance in centimeters, or None if the burst had too few valid pings.
         """
         try:
-            GPIO.output(self.trig_pin, True)
-            time.sleep(0.00001)
-            GPIO.output(self.trig_pin, False)
-
-            pulse_start = time.time()
-            while GPIO.input(self.echo_pin) == 0:
-                pulse_start = time.time()
-
-            pulse_end = time.time()
-            while GPIO.input(self.echo_pin) == 1:
-                pulse_end = time.time()
-
-            pulse_duration = pulse_end - pulse_start
-            distance = pulse_duration * 17150  # Speed of sound in cm/s
-            return round(distance, 2)
+            return self.ranger.sample()["distance"]
         except Exception as e:
             self.logger.error(f"Error measuring distance: {e}")
             return None
 
     def publish_distance(self):
         """
-        Publish the measured distance to the MQTT broker.
+        Measure a burst and publish the distance with its quality to the MQTT broker.
         """
         try:
-            # dist = self.distance()
-            dist = round(random.uniform(10, 200), 2)
-            if dist is not None:
+            sample = self.ranger.sample()
+            dist = sample["distance"]
+            if dist is None:
+                self.logger.warning(f"Only {sample['valid']}/{sample['pings']} valid pings. Skipping publish.")
+                if self.telemetry is not None:
+                    # Not published, but recorded so history shows the gap and dropout detection sees it
+                    self.telemetry.observe("Ultrasonic sensor", {"distance": None, "valid": sample["valid"],
+                                                                 "spread": sample["spread"]}, key=self.trig_pin)
+            elif self.telemetry is not None:
+                self.telemetry.submit("Ultrasonic sensor", {"distance": dist, "valid": sample["valid"],
+                                                            "spread": sample["spread"]}, key=self.trig_pin)
+                self.logger.debug(f"Queued distance: {dist} cm ({sample})")
+            else:
                 payload = {
                     "component": "Ultrasonic sensor",
                     "data": {
-                        "distance": dist
+                        "distance": dist,
+                        "valid": sample["valid"],
+                        "pings": sample["pings"],
+                        "spread": sample["spread"]
                     }
                 }
                 self.client.publish(self.topic, json.dumps(payload))
-                self.logger.info(f"Published distance: {dist} cm")
-            else:
-                self.logger.warning("Failed to measure distance. Skipping publish.")
+                self.logger.info(f"Published distance: {dist} cm ({sample['valid']}/{sample['pings']} pings, spread {sample['spread']} cm)")
         except Exception as e:
             self.logger.error(f"Failed to publish distance: {e}")
 
     def monitor(self, interval=1, duration=10):
         """
-        Monitor the ultrasonic sensor and publish data for the given duration.
+        Schedule periodic distance readings for the given duration. Returns immediately;
+        a monitoring job already running on this sensor is replaced.
         
         Args:
             interval (int): Time interval (in seconds) between readings. Default is 1 second.
             duration (int): Total duration (in seconds) to monitor the sensor. Default is 10 seconds.
+
+        Returns:
+            Job: The scheduled monitoring job, or None if the sensor is not set up.
         """
         if not self.trig_pin or not self.echo_pin:
             self.logger.error("Ultrasonic sensor not setup. Call setup() first.")
-            return
-
-        self.monitoring_active = True
-        start_time = time.time()
+            return None
 
-        while self.monitoring_active and (time.time() - start_time < duration):
-            self.publish_distance()
-            time.sleep(interval)
+        if self.job is not None:
+            self.job.cancel()
+        self.job = self.scheduler.every(interval, self.publish_distance, duration=duration,
+                                        name=f"Ultrasonic-{self.trig_pin}", on_done=self._monitoring_done)
+        return self.job
 
+    def _monitoring_done(self, job):
         self.logger.info("Ultrasonic sensor monitoring completed.")
 
     def stop_monitoring(self):
         """
-        Stop the monitoring loop for the ultrasonic sensor.
+        Stop the monitoring job for the ultrasonic sensor.
         """
-        self.monitoring_active = False
+        if self.job is not None:
+            self.job.cancel()
         self.logger.info("Ultrasonic sensor monitoring stopped.")
\ No newline at end of file